@@ -0,0 +1,466 @@
+# benchmark.py
+"""
+Ende-til-ende benchmark av pipelinen på syntetiske kalendere.
+
+Hver scenario genererer et syntetisk datasett (antall events, antall dager,
+lange titler, mange tags, andel flerdags-events) og kjører stegene
+
+  fetch           initial_fetch_all() mot et fixture-arkiv (kun med --fixtures)
+  normalize       Google-items -> events (_append_gcal_items + enrich_events_with_tags)
+  render          layout_renderer.render_calendar
+  quantize        main.finalize_image_for_inky
+  spritesheet     main.save_spritesheet_from_quant
+
+og rapporterer veggklokketid (beste av --repeat kjøringer) og peak-minne
+(tracemalloc, egen kjøring) per steg som JSON. Mikrobenchmarks (--micro)
+måler enkeltfunksjoner isolert, f.eks. met_parser: den kolonnebaserte
+MET-parseren mot den gamle rad-for-rad-parseren på syntetiske timeserier, og
+mapping_matcher: lineær gjennomgang av 1000/3000 syntetiske EVENT_MAPPINGS-regler
+mot den forhåndskompilerte matcheren. Med --baseline sammenlignes
+resultatet mot en lagret kjøring, og steg som er tregere enn --threshold
+ganger baseline flagges (exit code 1).
+
+Bruk:
+  python benchmark.py                               # alle scenarier, JSON til stdout
+  python benchmark.py --quick --out bench.json
+  python benchmark.py --baseline bench_base.json    # sammenlign
+  python benchmark.py --save-baseline bench_base.json
+  python benchmark.py --fixtures http_fixtures.json # inkluder fetch-steget (replay)
+  python benchmark.py --micro met_parser            # kun mikrobenchmarken
+  python benchmark.py --micro mapping_matcher
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+from datetime import datetime, timedelta, timezone
+
+# --- scenarios -----------------------------------------------------------
+SCENARIOS = {
+    "tiny":         {"events": 10,   "days": 7,  "long_titles": False, "tags": 0, "multiday": 0.0},
+    "week":         {"events": 60,   "days": 7,  "long_titles": False, "tags": 1, "multiday": 0.1},
+    "fortnight":    {"events": 200,  "days": 14, "long_titles": False, "tags": 1, "multiday": 0.1},
+    "long_titles":  {"events": 200,  "days": 14, "long_titles": True,  "tags": 1, "multiday": 0.1},
+    "many_tags":    {"events": 200,  "days": 14, "long_titles": False, "tags": 4, "multiday": 0.1},
+    "multiday":     {"events": 300,  "days": 30, "long_titles": False, "tags": 1, "multiday": 0.6},
+    "busy_2months": {"events": 2000, "days": 60, "long_titles": True,  "tags": 2, "multiday": 0.2},
+}
+QUICK_SCENARIOS = ("tiny", "fortnight", "many_tags")
+
+_TAG_KEYWORDS = ["Middag:", "Husk:", "G16 IK", "Oslo", "Amalie", "Sigrid", "Peter", "Ingun", "Christian", "Leire", "Skole", "Istrening"]
+_WORDS = ["trening", "foreldremøte", "tannlege", "bursdagsfeiring", "henting", "levering", "kino", "middag",
+          "hytte", "konsert", "dugnad", "svømming", "møte", "lege", "frisør", "vaksine", "bibliotek", "turnering"]
+
+
+def generate_gcal_items(n_events, days, long_titles=False, tags=1, multiday=0.0, seed=1234, start=None):
+    """
+    Generate `n_events` Google Calendar style items ({summary, start, end})
+    spread over `days` days from `start` (default: today).
+
+    - long_titles: 6-12 word titles instead of 1-3
+    - tags: number of mapping keywords mixed into each title
+    - multiday: fraction of all-day events spanning 2-6 days
+    """
+    rnd = random.Random(seed)
+    start = start or datetime.now().date()
+    items = []
+    for i in range(n_events):
+        day = start + timedelta(days=rnd.randrange(max(1, days)))
+        n_words = rnd.randint(6, 12) if long_titles else rnd.randint(1, 3)
+        words = [rnd.choice(_WORDS) for _ in range(n_words)]
+        kws = rnd.sample(_TAG_KEYWORDS, min(tags, len(_TAG_KEYWORDS))) if tags else []
+        summary = " ".join(kws[:1] + words + kws[1:]).strip()
+        if rnd.random() < multiday:
+            end = day + timedelta(days=rnd.randint(2, 6))
+            items.append({"summary": summary, "start": {"date": day.isoformat()}, "end": {"date": end.isoformat()}})
+        elif rnd.random() < 0.25:
+            items.append({"summary": summary, "start": {"date": day.isoformat()},
+                          "end": {"date": (day + timedelta(days=1)).isoformat()}})
+        else:
+            h = rnd.randint(7, 21)
+            m = rnd.choice((0, 15, 30, 45))
+            st = f"{day.isoformat()}T{h:02d}:{m:02d}:00+02:00"
+            en = f"{day.isoformat()}T{min(h + 1, 23):02d}:{m:02d}:00+02:00"
+            items.append({"summary": summary, "start": {"dateTime": st}, "end": {"dateTime": en}})
+    return items
+
+
+def generate_weather(days, seed=1234, start=None):
+    """Generate `days` daily weather entries in the shape initial_fetch_all returns."""
+    rnd = random.Random(seed)
+    start = start or datetime.now().date()
+    conds = ["Klarvær", "Delvis skyet", "Skyet", "Regn", "Snø"]
+    out = []
+    for i in range(days):
+        t = rnd.uniform(-5, 15)
+        out.append({
+            "date": (start + timedelta(days=i)).isoformat(),
+            "condition": rnd.choice(conds),
+            "temp_max": round(t + rnd.uniform(1, 6), 1),
+            "temp_min": round(t, 1),
+            "precip": round(rnd.uniform(0, 8), 1),
+            "wind_max": round(rnd.uniform(0, 12), 1),
+            "wind_dir_deg": rnd.randrange(360),
+            "source": "synthetic",
+        })
+    return out
+
+
+def generate_met_timeseries(rows, seed=1234, start=None):
+    """
+    Generate a MET locationforecast compact payload with `rows` timeseries
+    entries: hourly for the first 60 rows, 6-hourly after that (like MET).
+    """
+    rnd = random.Random(seed)
+    start = start or datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    symbols = ["clearsky_day", "fair_day", "partlycloudy_day", "cloudy", "lightrain", "rain", "lightsnow", "fog"]
+    ts = []
+    t = start
+    for i in range(rows):
+        data = {"instant": {"details": {
+            "air_temperature": round(rnd.uniform(-10, 20), 1),
+            "wind_speed": round(rnd.uniform(0, 15), 1),
+            "wind_from_direction": round(rnd.uniform(0, 360), 1),
+        }}}
+        periods = ("next_1_hours", "next_6_hours", "next_12_hours") if i < 60 else ("next_6_hours", "next_12_hours")
+        for period in periods:
+            entry = {"summary": {"symbol_code": rnd.choice(symbols)}}
+            if period != "next_12_hours":
+                entry["details"] = {"precipitation_amount": round(rnd.uniform(0, 3), 1)}
+            data[period] = entry
+        ts.append({"time": t.strftime("%Y-%m-%dT%H:%M:%SZ"), "data": data})
+        t += timedelta(hours=1 if i < 60 else 6)
+    return {"type": "Feature", "properties": {"timeseries": ts}}
+
+
+# --- measurement ---------------------------------------------------------
+@contextlib.contextmanager
+def _quiet(enabled=True):
+    """Swallow the pipeline's print() chatter while measuring."""
+    if not enabled:
+        yield
+        return
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        yield
+
+
+def _measure(fn, repeat=3, quiet=True):
+    """Return (result, best wall seconds, peak KiB). Peak memory comes from one extra traced run."""
+    best = None
+    result = None
+    for _ in range(max(1, repeat)):
+        with _quiet(quiet):
+            t0 = time.perf_counter()
+            result = fn()
+            dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    tracemalloc.start()
+    try:
+        with _quiet(quiet):
+            fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, best, peak / 1024.0
+
+
+def _reset_memos():
+    # every measured run starts cold unless --warm is given
+    try:
+        import mappings
+        mappings.clear_event_mapping_cache()
+    except Exception:
+        pass
+
+
+def run_scenario(name, params, repeat=3, fixtures=None, tmpdir=None, warm=False, quiet=True):
+    """Run all stages for one scenario; returns {"params":..., "stages": {stage: {...}}}."""
+    import data_provider as dp
+    import layout_renderer as lr
+    import main as main_mod
+    from event_store import EventStore
+
+    tmpdir = tmpdir or tempfile.mkdtemp(prefix="inky_bench_")
+    stages = {}
+    today = dp.now_local().date()
+    items = generate_gcal_items(params["events"], params["days"], params["long_titles"],
+                                params["tags"], params["multiday"], start=today)
+    weather = generate_weather(params["days"], start=today)
+
+    if fixtures:
+        import http_fixtures
+        http_fixtures.install("replay", path=fixtures, simulate_timing=False)
+        try:
+            def _fetch():
+                if not warm:
+                    _reset_memos()
+                return dp.initial_fetch_all(days=params["days"])
+            _, wall, peak = _measure(_fetch, repeat, quiet)
+            stages["fetch"] = {"wall_s": round(wall, 5), "peak_kib": round(peak, 1)}
+        finally:
+            http_fixtures.uninstall()
+
+    start_local_dt = datetime(today.year, today.month, today.day, tzinfo=dp.TZ) if dp.TZ else datetime(today.year, today.month, today.day)
+
+    def _normalize():
+        if not warm:
+            _reset_memos()
+        store = EventStore()
+        dp._append_gcal_items(items, start_local_dt, store)
+        em = getattr(dp.mappings_module, "EVENT_MAPPINGS", None) if dp.mappings_module else None
+        return dp.enrich_events_with_tags(store.to_list(), EVENT_MAPPINGS=em, prefer_mapping_module=True)
+    events, wall, peak = _measure(_normalize, repeat, quiet)
+    stages["normalize"] = {"wall_s": round(wall, 5), "peak_kib": round(peak, 1), "events_out": len(events)}
+
+    render_opts = dict(main_mod.opts)
+    render_opts["days"] = params["days"]
+
+    def _render():
+        if not warm:
+            _reset_memos()
+        data = {"events": list(events), "weather": weather, "hourly_today": [], "meta": {}}
+        return lr.render_calendar(data, 800, 480, params["days"], render_opts)
+    img, wall, peak = _measure(_render, repeat, quiet)
+    stages["render"] = {"wall_s": round(wall, 5), "peak_kib": round(peak, 1)}
+
+    png = os.path.join(tmpdir, f"{name}_inky.png")
+    quant, wall, peak = _measure(lambda: main_mod.finalize_image_for_inky(img, out_png=png), repeat, quiet)
+    stages["quantize"] = {"wall_s": round(wall, 5), "peak_kib": round(peak, 1)}
+
+    binp = os.path.join(tmpdir, f"{name}.bin")
+    _, wall, peak = _measure(lambda: main_mod.save_spritesheet_from_quant(quant, out_path=binp), repeat, quiet)
+    stages["spritesheet"] = {"wall_s": round(wall, 5), "peak_kib": round(peak, 1)}
+
+    total = sum(s["wall_s"] for s in stages.values())
+    return {"params": dict(params), "stages": stages, "total_wall_s": round(total, 5)}
+
+
+# --- micro benchmarks ----------------------------------------------------
+MET_PARSER_ROWS = (90, 1000, 10000)
+
+
+def micro_met_parser(repeat=3, quiet=True):
+    """Row-wise vs columnar MET timeseries parser on synthetic payloads of MET_PARSER_ROWS sizes."""
+    import weather_provider as wp
+
+    stages = {}
+    speedup = {}
+    identical = True
+    for rows in MET_PARSER_ROWS:
+        payload = generate_met_timeseries(rows)
+        ref, wall_ref, peak_ref = _measure(lambda: wp._parse_met_timeseries_rowwise(payload), repeat, quiet)
+        col, wall_col, peak_col = _measure(lambda: wp._parse_met_timeseries_json(payload), repeat, quiet)
+        stages[f"rowwise_{rows}"] = {"wall_s": round(wall_ref, 5), "peak_kib": round(peak_ref, 1)}
+        stages[f"columnar_{rows}"] = {"wall_s": round(wall_col, 5), "peak_kib": round(peak_col, 1)}
+        speedup[str(rows)] = round(wall_ref / wall_col, 2) if wall_col else None
+        identical = identical and ref == col
+    return {"params": {"rows": list(MET_PARSER_ROWS)}, "stages": stages, "speedup": speedup, "identical": identical}
+
+
+MAPPING_RULES = (1000, 3000)
+_MATCH_TYPES = ("prefix", "contains", "contains", "exact", "endswith", "regex")
+_MODES = ("", "add_icon", "replace_text", "replace_all", "add_tag")
+_REGEX_SUFFIX = r"\d*"
+
+
+def generate_mapping_rules(n_rules, seed=99):
+    """`n_rules` synthetic EVENT_MAPPINGS rows (mixed match types and modes, unique keywords)."""
+    rnd = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "bre", "dal", "fjel", "gran", "hus", "sk", "øy", "å"]
+    rules, seen = [], set()
+    for kw in _TAG_KEYWORDS:
+        seen.add(kw.lower())
+        rules.append({"keyword": kw, "match_type": "prefix" if kw.endswith(":") else "contains",
+                      "mode": "replace_text", "replacement": kw.strip(":"), "color": "blue"})
+    while len(rules) < n_rules:
+        kw = "".join(rnd.choice(syllables) for _ in range(rnd.randint(2, 4)))
+        if kw in seen:
+            continue
+        seen.add(kw)
+        mt = rnd.choice(_MATCH_TYPES)
+        if mt == "regex":
+            kw = kw + _REGEX_SUFFIX
+        rules.append({"keyword": kw, "match_type": mt, "mode": rnd.choice(_MODES),
+                      "replacement": kw.upper() if rnd.random() < 0.3 else "", "icon": "star" if rnd.random() < 0.2 else "",
+                      "color": rnd.choice(["", "red", "green"]), "size_px": 18})
+    rnd.shuffle(rules)
+    return rules
+
+
+def micro_mapping_matcher(repeat=3, quiet=True):
+    """Linear rule scan vs the compiled MappingMatcher (mapping_info_for_event + apply_event_mapping) at MAPPING_RULES sizes."""
+    import mappings
+
+    saved = mappings.EVENT_MAPPINGS
+    stages = {}
+    speedup = {}
+    identical = True
+    try:
+        for n in MAPPING_RULES:
+            rules = generate_mapping_rules(n)
+            rnd = random.Random(n)
+            texts = [item["summary"] for item in generate_gcal_items(150, 14, long_titles=True, tags=2, seed=n)]
+            texts += [f"{rnd.choice(rules)['keyword'].replace(_REGEX_SUFFIX, '7')} {rnd.choice(_WORDS)}" for _ in range(50)]
+            mappings.EVENT_MAPPINGS = rules
+            _, wall_build, _ = _measure(lambda: mappings.MappingMatcher(rules), 1, quiet)
+            mappings.get_mapping_matcher(rules)
+
+            # the linear reference recompiles a regex per rule and text; one timed run is plenty
+            ref_info, wall_ref_info, _ = _measure(lambda: [mappings._mapping_info_for_event_linear(t) for t in texts], 1, quiet)
+            new_info, wall_new_info, _ = _measure(lambda: [mappings.mapping_info_for_event(t) for t in texts], repeat, quiet)
+            ref_apply, wall_ref_apply, _ = _measure(
+                lambda: [mappings._apply_event_mapping_uncached(t, use_matcher=False) for t in texts], 1, quiet)
+            new_apply, wall_new_apply, _ = _measure(
+                lambda: [mappings._apply_event_mapping_uncached(t) for t in texts], repeat, quiet)
+            stages[f"build_{n}"] = {"wall_s": round(wall_build, 5)}
+            stages[f"info_linear_{n}"] = {"wall_s": round(wall_ref_info, 5)}
+            stages[f"info_matcher_{n}"] = {"wall_s": round(wall_new_info, 5)}
+            stages[f"apply_linear_{n}"] = {"wall_s": round(wall_ref_apply, 5)}
+            stages[f"apply_matcher_{n}"] = {"wall_s": round(wall_new_apply, 5)}
+            speedup[f"info_{n}"] = round(wall_ref_info / wall_new_info, 2) if wall_new_info else None
+            speedup[f"apply_{n}"] = round(wall_ref_apply / wall_new_apply, 2) if wall_new_apply else None
+            identical = identical and ref_info == new_info and ref_apply == new_apply
+    finally:
+        mappings.EVENT_MAPPINGS = saved
+    return {"params": {"rules": list(MAPPING_RULES), "texts": 200}, "stages": stages, "speedup": speedup, "identical": identical}
+
+
+MICRO_BENCHMARKS = {
+    "met_parser": micro_met_parser,
+    "mapping_matcher": micro_mapping_matcher,
+}
+
+
+def compare(result, baseline, threshold=1.2, min_delta_s=0.002):
+    """
+    Compare `result` against `baseline` (same JSON shape; scenarios and micro benchmarks).
+    Returns a list of {"scenario", "stage", "metric", "baseline", "current", "ratio", "regression"}.
+    Tiny absolute differences (< min_delta_s) never count as time regressions.
+    """
+    rows = []
+    entries = [(scen, cur, (baseline.get("scenarios") or {}).get(scen))
+               for scen, cur in (result.get("scenarios") or {}).items()]
+    entries += [(f"micro:{name}", cur, (baseline.get("micro") or {}).get(name))
+                for name, cur in (result.get("micro") or {}).items()]
+    for scen, cur, base in entries:
+        if not base:
+            continue
+        for stage, cs in cur.get("stages", {}).items():
+            bs = base.get("stages", {}).get(stage)
+            if not bs:
+                continue
+            for metric in ("wall_s", "peak_kib"):
+                b, c = bs.get(metric), cs.get(metric)
+                if not b or c is None:
+                    continue
+                ratio = c / b
+                regression = ratio > threshold
+                if metric == "wall_s" and (c - b) < min_delta_s:
+                    regression = False
+                rows.append({"scenario": scen, "stage": stage, "metric": metric, "baseline": b,
+                             "current": c, "ratio": round(ratio, 3), "regression": regression})
+    return rows
+
+
+def _git_revision():
+    try:
+        import subprocess
+        here = os.path.dirname(os.path.abspath(__file__))
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=here,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(names, repeat=3, fixtures=None, warm=False, quiet=True, micro=()):
+    with _quiet(quiet):
+        # heavy imports (and their prints) happen once, outside the measurements
+        import data_provider  # noqa: F401
+        import layout_renderer  # noqa: F401
+        import main  # noqa: F401
+    tmpdir = tempfile.mkdtemp(prefix="inky_bench_")
+    out = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "scenarios": {},
+    }
+    for name in names:
+        t0 = time.perf_counter()
+        out["scenarios"][name] = run_scenario(name, SCENARIOS[name], repeat=repeat, fixtures=fixtures,
+                                              tmpdir=tmpdir, warm=warm, quiet=quiet)
+        print(f"[benchmark] {name}: {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+    if micro:
+        out["micro"] = {}
+    for name in micro:
+        t0 = time.perf_counter()
+        out["micro"][name] = MICRO_BENCHMARKS[name](repeat=repeat, quiet=quiet)
+        print(f"[benchmark] micro {name}: {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the calendar pipeline on synthetic data")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Scenario(s) to run (default: all)")
+    parser.add_argument("--quick", action="store_true", help=f"Only run {', '.join(QUICK_SCENARIOS)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (best is reported)")
+    parser.add_argument("--fixtures", type=str, default=None, help="HTTP fixture archive to replay for the fetch stage")
+    parser.add_argument("--warm", action="store_true", help="Keep memo caches warm between runs")
+    parser.add_argument("--out", type=str, default=None, help="Write JSON result here (default: stdout)")
+    parser.add_argument("--baseline", type=str, default=None, help="Compare against this baseline JSON")
+    parser.add_argument("--save-baseline", type=str, default=None, help="Also write the result as a baseline file")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Regression ratio threshold (default 1.2)")
+    parser.add_argument("--verbose", action="store_true", help="Do not silence pipeline output")
+    parser.add_argument("--micro", action="append", choices=sorted(MICRO_BENCHMARKS),
+                        help="Micro benchmark(s) to run; without --scenario/--quick only these run")
+    args = parser.parse_args(argv)
+
+    micro = args.micro or []
+    if args.scenario or args.quick or not micro:
+        names = args.scenario or (list(QUICK_SCENARIOS) if args.quick else list(SCENARIOS))
+    else:
+        names = []
+    result = run_benchmarks(names, repeat=args.repeat, fixtures=args.fixtures, warm=args.warm,
+                            quiet=not args.verbose, micro=micro)
+
+    exit_code = 0
+    if args.baseline:
+        try:
+            with open(args.baseline, "r", encoding="utf-8") as fh:
+                baseline = json.load(fh)
+            rows = compare(result, baseline, threshold=args.threshold)
+            result["comparison"] = {"baseline": args.baseline, "baseline_revision": baseline.get("revision"),
+                                    "threshold": args.threshold, "rows": rows}
+            regressions = [r for r in rows if r["regression"]]
+            for r in regressions:
+                print(f"[benchmark] REGRESSION {r['scenario']}/{r['stage']} {r['metric']}: "
+                      f"{r['baseline']} -> {r['current']} (x{r['ratio']})", file=sys.stderr)
+            if regressions:
+                exit_code = 1
+        except Exception as ex:
+            print("[benchmark] could not compare with baseline:", ex, file=sys.stderr)
+
+    payload = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(payload)
+    else:
+        print(payload)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as fh:
+            fh.write(payload)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
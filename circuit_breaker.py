@@ -0,0 +1,218 @@
+# circuit_breaker.py
+"""
+Circuit breaker per upstream-host med adaptiv backoff.
+
+Etter CIRCUIT_FAILURE_THRESHOLD feil på rad (timeout, nettverksfeil, 5xx
+eller 429) åpnes bryteren for hosten: kall avvises umiddelbart med
+CircuitOpenError i en cool-down-periode i stedet for å vente på timeout.
+Når perioden er over slippes ett enkelt prøvekall gjennom (half-open). Lykkes
+det lukkes bryteren; feiler det åpnes den igjen med dobbelt så lang
+cool-down (opp til CIRCUIT_MAX_COOLDOWN).
+
+Tilstanden lagres i en JSON-fil, slik at cron-kjøringer (én prosess per
+syklus) også drar nytte av den. Ved lagring leses filen på nytt og bare
+hostene denne prosessen endret skrives inn (tmp-fil + os.replace), så
+samtidige prosesser ikke sletter hverandres hoster.
+
+Bryteren kobles inn via CircuitBreakerAdapter i http_client, så alle kall
+gjennom den delte sesjonen er dekket. Hosten identifiseres med
+http_client.host_name() (MET, GOOGLE, MOVAR, ...).
+
+Leser konfig fra miljøvariabler:
+  - CIRCUIT_BREAKER=0            (slå av)
+  - CIRCUIT_FAILURE_THRESHOLD    (feil på rad før den åpner, default 3)
+  - CIRCUIT_BASE_COOLDOWN        (første cool-down i sekunder, default 60)
+  - CIRCUIT_MAX_COOLDOWN         (maks cool-down i sekunder, default 3600)
+  - CIRCUIT_STATE_PATH           (default: circuit_breaker_state.json ved siden av denne filen)
+"""
+import os
+import json
+import time
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import http_fixtures
+
+CIRCUIT_BREAKER_ENABLED = os.environ.get("CIRCUIT_BREAKER", "1") != "0"
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_BASE_COOLDOWN = float(os.environ.get("CIRCUIT_BASE_COOLDOWN", "60"))
+CIRCUIT_MAX_COOLDOWN = float(os.environ.get("CIRCUIT_MAX_COOLDOWN", "3600"))
+CIRCUIT_STATE_PATH = os.environ.get("CIRCUIT_STATE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "circuit_breaker_state.json"))
+
+# a half-open probe that never reports back (crashed process) is given up after this long
+_PROBE_TIMEOUT = 120.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request while the host's breaker is open."""
+
+
+class CircuitBreaker:
+    """Per-host breaker registry with persisted state."""
+
+    def __init__(self, path=CIRCUIT_STATE_PATH, threshold=CIRCUIT_FAILURE_THRESHOLD,
+                 base_cooldown=CIRCUIT_BASE_COOLDOWN, max_cooldown=CIRCUIT_MAX_COOLDOWN):
+        self.path = path
+        self.threshold = max(1, int(threshold))
+        self.base_cooldown = float(base_cooldown)
+        self.max_cooldown = float(max_cooldown)
+        self._lock = threading.Lock()
+        self._hosts = None  # loaded lazily
+
+    # --- persistence ---
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                return json.load(fh).get("hosts", {}) or {}
+        except Exception:
+            return {}
+
+    def _load(self):
+        if self._hosts is not None:
+            return
+        self._hosts = self._read()
+
+    def _save(self, *hosts):
+        """
+        Write the entries for `hosts` (removed ones are dropped) merged into what is
+        on disk now, so concurrent processes keep each other's hosts.
+        hosts=() writes this process' full table (reset()).
+        """
+        try:
+            if hosts:
+                merged = self._read()
+                for host in hosts:
+                    if host in self._hosts:
+                        merged[host] = self._hosts[host]
+                    else:
+                        merged.pop(host, None)
+            else:
+                merged = dict(self._hosts)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump({"hosts": merged}, fh, indent=1)
+            os.replace(tmp, self.path)
+            self._hosts = merged
+        except Exception as ex:
+            print("[circuit] failed to save state:", ex)
+
+    def _entry(self, host):
+        return self._hosts.setdefault(host, {"state": CLOSED, "failures": 0, "cooldown": 0.0, "opened_at": 0.0})
+
+    # --- public API ---
+    def allow(self, host):
+        """True if a request to `host` may be sent now (may turn the breaker half-open for one probe)."""
+        with self._lock:
+            self._load()
+            e = self._hosts.get(host)
+            if not e or e["state"] == CLOSED:
+                return True
+            now = time.time()
+            if e["state"] == OPEN:
+                if now < e["opened_at"] + e["cooldown"]:
+                    return False
+                e["state"] = HALF_OPEN
+                e["probe_started"] = now
+                self._save(host)
+                print(f"[circuit] {host} half-open, sending one probe")
+                return True
+            # half-open: only the single probe is in flight
+            if now - e.get("probe_started", 0) > _PROBE_TIMEOUT:
+                e["probe_started"] = now
+                self._save(host)
+                return True
+            return False
+
+    def record_success(self, host):
+        with self._lock:
+            self._load()
+            e = self._hosts.get(host)
+            if not e or (e["state"] == CLOSED and e["failures"] == 0):
+                return
+            if e["state"] != CLOSED:
+                print(f"[circuit] {host} closed again")
+            self._hosts[host] = {"state": CLOSED, "failures": 0, "cooldown": 0.0, "opened_at": 0.0}
+            self._save(host)
+
+    def record_failure(self, host):
+        with self._lock:
+            self._load()
+            e = self._entry(host)
+            e["failures"] += 1
+            now = time.time()
+            if e["state"] == HALF_OPEN:
+                # failed probe: back off twice as long
+                e["cooldown"] = min(max(e["cooldown"], self.base_cooldown) * 2, self.max_cooldown)
+                e["state"] = OPEN
+                e["opened_at"] = now
+                print(f"[circuit] {host} probe failed, open for {int(e['cooldown'])}s")
+            elif e["state"] == CLOSED and e["failures"] >= self.threshold:
+                e["cooldown"] = min(self.base_cooldown, self.max_cooldown)
+                e["state"] = OPEN
+                e["opened_at"] = now
+                print(f"[circuit] {host} open after {e['failures']} failures, for {int(e['cooldown'])}s")
+            self._save(host)
+
+    def state(self, host):
+        """Return a copy of the stored state for `host`."""
+        with self._lock:
+            self._load()
+            return dict(self._hosts.get(host) or {"state": CLOSED, "failures": 0})
+
+    def reset(self, host=None):
+        with self._lock:
+            self._load()
+            if host is None:
+                self._hosts = {}
+                self._save()
+            else:
+                self._hosts.pop(host, None)
+                self._save(host)
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_breaker():
+    """Process-wide breaker registry."""
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker()
+    return _breaker
+
+
+def _is_failure_status(code):
+    return code == 429 or code >= 500
+
+
+class CircuitBreakerAdapter(HTTPAdapter):
+    """HTTPAdapter that consults the per-host circuit breaker around every send."""
+
+    def send(self, request, *args, **kwargs):
+        # fixture record/replay must see every request unchanged
+        if not CIRCUIT_BREAKER_ENABLED or http_fixtures.active():
+            return super().send(request, *args, **kwargs)
+        import http_client  # local import: http_client imports this module
+        host = http_client.host_name(request.url)
+        breaker = get_breaker()
+        if not breaker.allow(host):
+            raise CircuitOpenError(f"circuit open for {host}, skipping {request.method} request", request=request)
+        try:
+            resp = super().send(request, *args, **kwargs)
+        except Exception:
+            breaker.record_failure(host)
+            raise
+        if _is_failure_status(resp.status_code):
+            breaker.record_failure(host)
+        else:
+            breaker.record_success(host)
+        return resp
@@ -0,0 +1,188 @@
+# color_registry.py
+"""
+Felles fargeoppslag for mappings, data_provider og layout_renderer.
+
+Fargenavn og tupler ble tidligere tolket på nytt (ImageColor.getrgb,
+color_to_rgb, _normalize_color_input, _fg_for_bg ...) for hver tag, ikon og
+header. Her løses hver distinkte fargeinput én gang til en ColorInfo:
+
+  - rgb       (r, g, b) slik ImageColor.getrgb tolker den
+  - index     nærmeste farge i Inky-paletten (0..6, se INKY_PALETTE_INDEXED)
+  - fg_index  kontrasterende tekstfarge (WHITE eller BLACK) for fargen som bakgrunn
+
+Resultatene caches (LRU), så tegnekoden slipper å parse strenger per element.
+Tegnekoden bruker fortsatt rgb (og fg_rgb); index/palette_index er til for
+snapping (COLOR_SNAP_TO_PALETTE) og for kode som trenger palettnummeret.
+
+Leser konfig fra miljøvariabler:
+  - COLOR_SNAP_TO_PALETTE=1   (rgb snappes til nærmeste palettfarge, slik at
+                               rammen viser nøyaktig de fargene som tegnes;
+                               default av, rgb er uendret)
+  - COLOR_CACHE_SIZE          (antall distinkte fargeinput i cachen, default 512)
+
+Eksempel:
+    from color_registry import resolve_color, INKY_PALETTE_INDEXED
+    info = resolve_color("red")          # ColorInfo(rgb=(255, 0, 0), index=2, fg_index=0)
+    fill = info.rgb
+    text = INKY_PALETTE_INDEXED[info.fg_index]
+"""
+import os
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+from PIL import ImageColor
+
+COLOR_SNAP_TO_PALETTE = os.environ.get("COLOR_SNAP_TO_PALETTE", "0") == "1"
+COLOR_CACHE_SIZE = int(os.environ.get("COLOR_CACHE_SIZE", "512"))
+
+# --- Inky 7-color palette (index = value written to the spritesheet) ---
+INKY_PALETTE_INDEXED = [
+    (255, 255, 255),  # 0 = WHITE
+    (0, 0, 0),        # 1 = BLACK
+    (255, 0, 0),      # 2 = RED
+    (255, 128, 0),    # 3 = ORANGE
+    (255, 255, 0),    # 4 = YELLOW
+    (0, 128, 0),      # 5 = GREEN
+    (0, 0, 255),      # 6 = BLUE
+]
+INKY_PALETTE_NAMES = ["white", "black", "red", "orange", "yellow", "green", "blue"]
+INKY_COLORS = dict(zip(INKY_PALETTE_NAMES, INKY_PALETTE_INDEXED))
+
+WHITE = 0
+BLACK = 1
+
+
+class ColorInfo(NamedTuple):
+    rgb: Tuple[int, int, int]
+    index: int
+    fg_index: int
+
+    @property
+    def fg_rgb(self) -> Tuple[int, int, int]:
+        return INKY_PALETTE_INDEXED[self.fg_index]
+
+    @property
+    def palette_rgb(self) -> Tuple[int, int, int]:
+        return INKY_PALETTE_INDEXED[self.index]
+
+    @property
+    def luminance(self) -> float:
+        """Perceived brightness 0..1 (0.299 R + 0.587 G + 0.114 B)."""
+        r, g, b = self.rgb
+        return (0.299 * r + 0.587 * g + 0.114 * b) / 255.0
+
+
+def nearest_palette_index(rgb) -> int:
+    """Index of the palette color closest to `rgb` (squared RGB distance, like an undithered quantize)."""
+    r, g, b = rgb
+    best, best_d = 0, None
+    for i, (pr, pg, pb) in enumerate(INKY_PALETTE_INDEXED):
+        d = (r - pr) ** 2 + (g - pg) ** 2 + (b - pb) ** 2
+        if best_d is None or d < best_d:
+            best, best_d = i, d
+    return best
+
+
+def contrast_fg_index(rgb) -> int:
+    """
+    WHITE or BLACK for text on top of `rgb`. Prefers white for darker/saturated
+    backgrounds (so red tags get white text), else the higher contrast ratio.
+    """
+    def rl(c):
+        v = c / 255.0
+        return v / 12.92 if v <= 0.03928 else ((v + 0.055) / 1.055) ** 2.4
+    l_bg = 0.2126 * rl(rgb[0]) + 0.7152 * rl(rgb[1]) + 0.0722 * rl(rgb[2])
+    if l_bg < 0.45:
+        return WHITE
+    cr_white = (1.0 + 0.05) / (l_bg + 0.05)
+    cr_black = (l_bg + 0.05) / (0.0 + 0.05)
+    return WHITE if cr_white >= cr_black else BLACK
+
+
+def _parse(value) -> Optional[Tuple[int, int, int]]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        c = max(0, min(255, value))
+        return (c, c, c)
+    if isinstance(value, tuple):
+        if len(value) < 3:
+            return None
+        return (int(value[0]), int(value[1]), int(value[2]))
+    if isinstance(value, str):
+        s = value.strip()
+        if not s:
+            return None
+        rgb = ImageColor.getrgb(s)
+        return (int(rgb[0]), int(rgb[1]), int(rgb[2]))
+    return None
+
+
+@lru_cache(maxsize=COLOR_CACHE_SIZE)
+def _resolve(value, snap: bool) -> Optional[ColorInfo]:
+    try:
+        rgb = _parse(value)
+    except Exception:
+        return None
+    if rgb is None:
+        return None
+    index = nearest_palette_index(rgb)
+    if snap:
+        rgb = INKY_PALETTE_INDEXED[index]
+    return ColorInfo(rgb, index, contrast_fg_index(rgb))
+
+
+def resolve_color(value, snap: Optional[bool] = None) -> Optional[ColorInfo]:
+    """
+    ColorInfo for a color name/hex string, an (r, g, b[, a]) tuple/list or a grey
+    int, or None if it cannot be resolved. snap=None follows COLOR_SNAP_TO_PALETTE.
+    """
+    if value is None:
+        return None
+    if isinstance(value, list):
+        value = tuple(value)
+    if snap is None:
+        snap = COLOR_SNAP_TO_PALETTE
+    try:
+        return _resolve(value, bool(snap))
+    except TypeError:
+        # unhashable input (e.g. a tuple holding a list) -> not a color we know
+        return None
+
+
+def to_rgb(value, default=None):
+    """(r, g, b) of `value` via resolve_color, or `default`."""
+    info = resolve_color(value)
+    return info.rgb if info is not None else default
+
+
+def palette_index(value, default: int = BLACK) -> int:
+    """Inky palette index (0..6) of `value`, or `default`."""
+    info = resolve_color(value)
+    return info.index if info is not None else default
+
+
+def color_cache_info():
+    """functools cache statistics (hits, misses, maxsize, currsize) for the registry."""
+    return _resolve.cache_info()
+
+
+def clear_color_cache():
+    _resolve.cache_clear()
+
+
+__all__ = [
+    "INKY_PALETTE_INDEXED",
+    "INKY_PALETTE_NAMES",
+    "INKY_COLORS",
+    "WHITE",
+    "BLACK",
+    "ColorInfo",
+    "nearest_palette_index",
+    "contrast_fg_index",
+    "resolve_color",
+    "to_rgb",
+    "palette_index",
+    "color_cache_info",
+    "clear_color_cache",
+]
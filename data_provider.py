@@ -9,11 +9,15 @@ Leser konfig fra miljøvariabler:
   - LAT, LON
   - KOMMUNENR (valgfri, default 3103)
   - MOVAR_GATENAVN, MOVAR_HUSNR (valgfri)
+  - GCAL_SYNC_MODE (valgfri, "incremental" (default) eller "full")
+  - WEATHER_GRID_CELLS=1 (valgfri: vær via weather_provider.get_forecasts_for_locations,
+    delt grid-celle-cache for flere rammer på nesten samme adresse)
 
 Kjør som skript for rask feilsøking:
   python data_provider.py
 """
 import os
+import json
 import requests
 from datetime import datetime, timedelta, timezone
 try:
@@ -44,6 +48,39 @@ MOVAR_HUSNR = os.environ.get("MOVAR_HUSNR", "19")
 
 # Hvor mange dager vi viser standard
 DEFAULT_DAYS = int(os.environ.get("DEFAULT_DAYS", "14"))
+# weather through the shared grid-cell cache (weather_provider.get_forecasts_for_locations)
+WEATHER_GRID_CELLS = os.environ.get("WEATHER_GRID_CELLS", "0") == "1"
+
+# Per-kilde timeout (sekunder) for den samtidige hentingen i initial_fetch_all.
+# Global deadline styres av FETCH_DEADLINE_SECONDS (se fetch_engine.py).
+SOURCE_TIMEOUTS = {
+    "movar": float(os.environ.get("FETCH_TIMEOUT_MOVAR", "22")),
+    "gcal": float(os.environ.get("FETCH_TIMEOUT_GCAL", "12")),
+    "holidays": float(os.environ.get("FETCH_TIMEOUT_HOLIDAYS", "12")),
+    "weather": float(os.environ.get("FETCH_TIMEOUT_WEATHER", "38")),
+}
+# Latency budget for sources that have a last-good snapshot: past this the
+# snapshot is used and the fetch keeps running in the background.
+FETCH_LATENCY_BUDGET = float(os.environ.get("FETCH_LATENCY_BUDGET", "15"))
+
+# Google Calendar inkrementell synk: lagrer nextSyncToken og events lokalt og
+# henter bare endringer. "full" henter hele vinduet hver gang (gammel oppførsel).
+GCAL_SYNC_MODE = os.environ.get("GCAL_SYNC_MODE", "incremental").strip().lower()
+GCAL_SYNC_STORE_PATH = os.environ.get("GCAL_SYNC_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "gcal_sync_store.json"))
+GCAL_SYNC_HORIZON_DAYS = int(os.environ.get("GCAL_SYNC_HORIZON_DAYS", "60"))
+
+# Movar-cache: fraksjonstabellen endres nesten aldri og tommedatoer dekker
+# måneder fremover, så begge lagres lokalt og days-vinduet filtreres lokalt.
+MOVAR_CACHE_PATH = os.environ.get("MOVAR_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "movar_cache.json"))
+MOVAR_FRACTIONS_TTL_HOURS = float(os.environ.get("MOVAR_FRACTIONS_TTL_HOURS", "72"))
+MOVAR_SCHEDULE_TTL_HOURS = float(os.environ.get("MOVAR_SCHEDULE_TTL_HOURS", "168"))
+
+from fetch_engine import run_sources, missing_sources, MISSING
+from event_store import Event, EventStore
+from snapshot_store import save_snapshot, load_snapshot, snapshot_age
+from http_cache import cached_get
+from http_client import get_session, timeout_for
+import http_fixtures
 
 # Try to import mapping helpers (non-fatal)
 def parse_locationforecast_timeseries(timeseries):
@@ -134,15 +171,14 @@ def parse_locationforecast_timeseries(timeseries):
 
 try:
     import mappings as mappings_module
-    # expose common helpers if present
+    # expose common helpers if present (the table itself is read as
+    # mappings_module.EVENT_MAPPINGS at call time: a background refresh swaps it)
     mapping_info_for_event = getattr(mappings_module, "mapping_info_for_event", None)
-    EVENT_MAPPINGS = getattr(mappings_module, "EVENT_MAPPINGS", None)
     color_to_rgb = getattr(mappings_module, "color_to_rgb", None)
 except Exception:
     mappings_module = None
     mapping_info_for_event = None
     color_to_rgb = None
-    EVENT_MAPPINGS = None
 
 # Avoid duplicate zoneinfo block - we've already set TZ above, but keep a warning if not set
 try:
@@ -159,7 +195,11 @@ def now_local():
     """
     Return an AWARE datetime in Europe/Oslo if possible,
     otherwise a naive datetime in the system local time (with warning above).
+    While HTTP fixtures record/replay, the clock is frozen at the recording time.
     """
+    frozen = http_fixtures.fixture_now(TZ)
+    if frozen is not None:
+        return frozen
     if TZ:
         return datetime.now(TZ)
     return datetime.now()
@@ -176,10 +216,11 @@ def date_string_for_offset(day_index=0):
 # This file no longer contains the heavy apply_event_mapping implementation.
 # Instead we prefer mappings.apply_event_mapping when available. If it's not
 # present, we build a conservative structure from mapping_info_for_event.
-from PIL import ImageColor
 import re
 import importlib
 
+from color_registry import to_rgb
+
 
 def _safe_rgb_from_mapping_entry(entry):
     """Try to build an (r,g,b) tuple from mapping entry or None."""
@@ -194,26 +235,14 @@ def _safe_rgb_from_mapping_entry(entry):
                 pass
     for k in ("color", "tag_color_name", "icon_color_name", "color_name"):
         if entry.get(k):
-            try:
-                rgb = ImageColor.getrgb(str(entry.get(k)))
-                return (int(rgb[0]), int(rgb[1]), int(rgb[2]))
-            except Exception:
-                pass
+            rgb = to_rgb(str(entry.get(k)))
+            if rgb is not None:
+                return rgb
     return None
 
 
-def apply_event_mapping(summary: str):
-    """
-    Small shim that returns a dict with keys used by the rest of data_provider:
-      - display_text, tag_text, tag_color_name, tag_color_rgb,
-        icon, icon_size, icon_color_name, icon_color_rgb, mode, filtered_out, original_name, tags
-    Behavior:
-      - If mappings.apply_event_mapping exists, call and return its result (defensive).
-      - Else if mapping_info_for_event exists, call it and convert the single mapping into the expected structure.
-      - Else return a conservative structure (no changes).
-    """
-    original = (summary or "").strip()
-    out = {
+def _default_mapping_out(original):
+    return {
         "display_text": original,
         "tag_text": None,
         "tag_color_name": None,
@@ -228,6 +257,31 @@ def apply_event_mapping(summary: str):
         "tags": [],
     }
 
+
+def _copy_module_result(out, res):
+    # copy-over known keys
+    for k in out.keys():
+        if k in res:
+            out[k] = res.get(k)
+    # merge tags if present
+    if res.get("tags") and isinstance(res.get("tags"), list):
+        out["tags"] = res.get("tags")
+    return out
+
+
+def apply_event_mapping(summary: str):
+    """
+    Small shim that returns a dict with keys used by the rest of data_provider:
+      - display_text, tag_text, tag_color_name, tag_color_rgb,
+        icon, icon_size, icon_color_name, icon_color_rgb, mode, filtered_out, original_name, tags
+    Behavior:
+      - If mappings.apply_event_mapping exists, call and return its result (defensive).
+      - Else if mapping_info_for_event exists, call it and convert the single mapping into the expected structure.
+      - Else return a conservative structure (no changes).
+    """
+    original = (summary or "").strip()
+    out = _default_mapping_out(original)
+
     # 1) Prefer a mapping implementation in mappings module if it exists.
     try:
         if mappings_module and hasattr(mappings_module, "apply_event_mapping") and callable(getattr(mappings_module, "apply_event_mapping")):
@@ -235,14 +289,7 @@ def apply_event_mapping(summary: str):
                 res = mappings_module.apply_event_mapping(original)
                 # Expect res to be a dict in the expected shape; be defensive
                 if isinstance(res, dict):
-                    # copy-over known keys
-                    for k in out.keys():
-                        if k in res:
-                            out[k] = res.get(k)
-                    # merge tags if present
-                    if res.get("tags") and isinstance(res.get("tags"), list):
-                        out["tags"] = res.get("tags")
-                    return out
+                    return _copy_module_result(out, res)
             except Exception:
                 # fallthrough to mapping_info_for_event conversion
                 pass
@@ -313,11 +360,7 @@ def apply_event_mapping(summary: str):
                         tag_color_rgb = None
                 elif color_name:
                     tag_color_name = color_name
-                    try:
-                        tag_color_rgb = ImageColor.getrgb(color_name)
-                        tag_color_rgb = (int(tag_color_rgb[0]), int(tag_color_rgb[1]), int(tag_color_rgb[2]))
-                    except Exception:
-                        tag_color_rgb = None
+                    tag_color_rgb = to_rgb(color_name)
                 tag_entry = {"text": tag_text}
                 if tag_color_rgb is not None:
                     tag_entry["color_rgb"] = tag_color_rgb
@@ -333,11 +376,7 @@ def apply_event_mapping(summary: str):
                 except Exception:
                     icon_color_rgb = None
             elif color_name:
-                try:
-                    tmp = ImageColor.getrgb(color_name)
-                    icon_color_rgb = (int(tmp[0]), int(tmp[1]), int(tmp[2]))
-                except Exception:
-                    icon_color_rgb = None
+                icon_color_rgb = to_rgb(color_name)
 
             # If replace mode removed all text and no tags, mark filtered_out
             if (not display or display.strip() == "") and not tag_text:
@@ -366,51 +405,198 @@ def apply_event_mapping(summary: str):
     return out
 
 
+def apply_event_mapping_batch(summaries):
+    """
+    apply_event_mapping for a whole list: each distinct summary is mapped once
+    (through mappings.apply_event_mapping_batch when available) and the results
+    are aligned with `summaries`. Repeated summaries share one result dict, so
+    treat the results as read-only.
+    """
+    summaries = [(s or "").strip() for s in summaries]
+    unique = list(dict.fromkeys(summaries))
+    by_summary = {}
+    batch = getattr(mappings_module, "apply_event_mapping_batch", None) if mappings_module else None
+    if callable(batch):
+        try:
+            for s, res in zip(unique, batch(unique)):
+                if isinstance(res, dict):
+                    by_summary[s] = _copy_module_result(_default_mapping_out(s), res)
+        except Exception:
+            by_summary = {}
+    for s in unique:
+        if s not in by_summary:
+            by_summary[s] = apply_event_mapping(s)
+    return [by_summary[s] for s in summaries]
+
+
+def _event_from_mapped(mapped, date, time, original_name):
+    """
+    Event for one day of an entry, filled from an apply_event_mapping result
+    (display_text, tag_*, icon_*, mode). Keys missing from `mapped` become None.
+    """
+    return Event(
+        date=date,
+        name=mapped.get("display_text") or "",
+        display_text=mapped.get("display_text"),
+        tag_text=mapped.get("tag_text"),
+        tag_color_name=mapped.get("tag_color_name"),
+        tag_color_rgb=mapped.get("tag_color_rgb"),
+        time=time,
+        icon=mapped.get("icon"),
+        icon_size=mapped.get("icon_size"),
+        icon_color_name=mapped.get("icon_color_name"),
+        icon_color_rgb=mapped.get("icon_color_rgb"),
+        icon_mode=mapped.get("mode"),
+        original_name=original_name,
+    )
+
+
+# --------------------------------------------------------------------
+# Small JSON state files (sync stores, long-TTL caches)
+# --------------------------------------------------------------------
+def _load_json_state(path, default=None):
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except Exception:
+        return default
+
+
+def _save_json_state(path, obj):
+    """Write JSON atomically (tmp file + rename) so a crash never leaves a half-written store."""
+    try:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(obj, fh, ensure_ascii=False)
+        os.replace(tmp, path)
+    except Exception as ex:
+        print(f"[state] failed to write {path}:", ex)
+
+
 # --------------------------------------------------------------------
 # Tommekalender integration
 # --------------------------------------------------------------------
-def fetch_fraction_names(session=None):
-    session = session or requests.Session()
-    url = f"{MOVAR_BASE}/Fraksjoner"
-    headers = {"Kommunenr": KOMMUNENR, "Accept": "application/json", "User-Agent": "InkyFrameCalendar/1.0"}
-    params = {"apitoken": MOVAR_API_TOKEN} if MOVAR_API_TOKEN else {}
+def _movar_headers():
+    return {"Kommunenr": KOMMUNENR, "Accept": "application/json", "User-Agent": "InkyFrameCalendar/1.0"}
+
+
+def _movar_get_json(url, params, session):
+    """GET a Movar endpoint and return parsed JSON, or None on any failure."""
+    headers = _movar_headers()
     try:
-        r = session.get(url, headers=headers, params=params, timeout=10, verify=True)
+        r = cached_get(url, headers=headers, params=params, session=session, verify=True)
         if r.status_code == 200:
-            data = r.json()
-            return {int(item.get("id", -1)): item.get("navn", "") for item in data}
-        else:
-            if r.status_code == 401:
-                try_headers = headers.copy()
-                try_headers["apitoken"] = MOVAR_API_TOKEN
-                r2 = session.get(url, headers=try_headers, timeout=10, verify=True)
-                print("[fetch_fraction_names] retry with apitoken header status:", r2.status_code)
-            return {}
+            return r.json()
+        if r.status_code == 401 and MOVAR_API_TOKEN:
+            try_headers = headers.copy()
+            try_headers["apitoken"] = MOVAR_API_TOKEN
+            q = {k: v for k, v in (params or {}).items() if k != "apitoken"}
+            r2 = cached_get(url, headers=try_headers, params=q, session=session, verify=True)
+            print(f"[movar] retry with apitoken header status: {r2.status_code}")
+            if r2.status_code == 200:
+                return r2.json()
     except Exception as ex:
-        print("[fetch_fraction_names] exception:", ex)
-        return {}
+        print("[movar] exception:", ex)
+    return None
+
+
+def _movar_cache_entry(section, key, ttl_hours):
+    """Return (data, is_fresh) for a cached Movar entry, or (None, False)."""
+    store = _load_json_state(MOVAR_CACHE_PATH, {}) or {}
+    entry = (store.get(section) or {}).get(key)
+    if not entry or "data" not in entry:
+        return None, False
+    age = datetime.now(timezone.utc).timestamp() - float(entry.get("fetched_at", 0))
+    return entry["data"], 0 <= age < ttl_hours * 3600
+
+
+def _movar_cache_store(section, key, data):
+    store = _load_json_state(MOVAR_CACHE_PATH, {}) or {}
+    store.setdefault(section, {})[key] = {
+        "fetched_at": int(datetime.now(timezone.utc).timestamp()),
+        "data": data,
+    }
+    _save_json_state(MOVAR_CACHE_PATH, store)
+
 
+def fetch_fraction_names(session=None, use_cache=None, raise_on_error=False):
+    """
+    Return {fraksjonId: navn}. The table barely changes, so it is kept in
+    MOVAR_CACHE_PATH for MOVAR_FRACTIONS_TTL_HOURS per kommunenr; a stale copy
+    is returned if Movar can't be reached. The cache is skipped while HTTP
+    fixtures record/replay. With raise_on_error, a failure without any cached
+    copy raises instead of returning {}.
+    """
+    if use_cache is None:
+        use_cache = not http_fixtures.active()
+    key = str(KOMMUNENR)
+    cached, fresh = _movar_cache_entry("fractions", key, MOVAR_FRACTIONS_TTL_HOURS) if use_cache else (None, False)
+    if fresh:
+        return {int(k): v for k, v in cached.items()}
+
+    session = session or get_session()
+    params = {"apitoken": MOVAR_API_TOKEN} if MOVAR_API_TOKEN else {}
+    data = _movar_get_json(f"{MOVAR_BASE}/Fraksjoner", params, session)
+    if data is not None:
+        try:
+            names = {int(item.get("id", -1)): item.get("navn", "") for item in data}
+            if use_cache:
+                _movar_cache_store("fractions", key, {str(k): v for k, v in names.items()})
+            return names
+        except Exception as ex:
+            print("[fetch_fraction_names] exception:", ex)
+    if cached:
+        print("[fetch_fraction_names] using stale cached fractions")
+        return {int(k): v for k, v in cached.items()}
+    if raise_on_error:
+        raise RuntimeError("Movar Fraksjoner unavailable")
+    return {}
+
+
+def fetch_tommekalender_schedule(session=None, gatenavn=None, husnr=None, use_cache=None, raise_on_error=False):
+    """
+    Return the raw Tommekalender list ([{fraksjonId, tommedatoer: [...]}, ...]).
 
-def fetch_tommekalender_events(fraction_names, days=DEFAULT_DAYS, session=None, gatenavn=None, husnr=None):
-    session = session or requests.Session()
+    The list already holds months of future dates, so it is cached per
+    kommunenr/gatenavn/husnr for MOVAR_SCHEDULE_TTL_HOURS (refetched earlier if
+    every cached date has passed). A stale copy is returned on failure.
+    The cache is skipped while HTTP fixtures record/replay.
+    """
+    if use_cache is None:
+        use_cache = not http_fixtures.active()
     gatenavn = gatenavn or MOVAR_GATENAVN
     husnr = husnr or MOVAR_HUSNR
-    url = f"{MOVAR_BASE}/Tommekalender"
-    headers = {"Kommunenr": KOMMUNENR, "Accept": "application/json", "User-Agent": "InkyFrameCalendar/1.0"}
+    key = f"{KOMMUNENR}|{gatenavn}|{husnr}"
+    cached, fresh = _movar_cache_entry("schedules", key, MOVAR_SCHEDULE_TTL_HOURS) if use_cache else (None, False)
+    if fresh:
+        last_date = max((d[:10] for item in cached for d in (item.get("tommedatoer") or []) if d), default="")
+        if last_date >= date_string_for_offset(0):
+            return cached
+
+    session = session or get_session()
     params = {"gatenavn": gatenavn, "husnr": husnr}
     if MOVAR_API_TOKEN:
         params["apitoken"] = MOVAR_API_TOKEN
-    events = []
+    data = _movar_get_json(f"{MOVAR_BASE}/Tommekalender", params, session)
+    if isinstance(data, list):
+        if use_cache:
+            _movar_cache_store("schedules", key, data)
+        return data
+    if cached is not None:
+        print("[fetch_tommekalender_schedule] using stale cached schedule")
+        return cached
+    if raise_on_error:
+        raise RuntimeError("Movar Tommekalender unavailable")
+    return []
+
+
+def fetch_tommekalender_events(fraction_names, days=DEFAULT_DAYS, session=None, gatenavn=None, husnr=None, raise_on_error=False):
+    events = EventStore()
     try:
-        r = session.get(url, headers=headers, params=params, timeout=10, verify=True)
-        if r.status_code != 200:
-            if r.status_code == 401 and MOVAR_API_TOKEN:
-                try_headers = headers.copy()
-                try_headers["apitoken"] = MOVAR_API_TOKEN
-                r2 = session.get(url, headers=try_headers, params={"gatenavn": gatenavn, "husnr": husnr}, timeout=10, verify=True)
-            return events
-        data = r.json()
+        data = fetch_tommekalender_schedule(session=session, gatenavn=gatenavn, husnr=husnr, raise_on_error=raise_on_error)
+        # the days window is filtered locally from the (cached) full schedule
         allowed = {date_string_for_offset(i) for i in range(days)}
+        pickups = []  # (date, raw_name)
         for item in data:
             try:
                 fid = int(item.get("fraksjonId", -1))
@@ -422,30 +608,19 @@ def fetch_tommekalender_events(fraction_names, days=DEFAULT_DAYS, session=None,
                     continue
                 date_part = d_iso[:10]
                 if date_part in allowed:
-                    raw_name = "Movar: " + fraction_names.get(fid, "Ukjent")
-                    mapped = apply_event_mapping(raw_name)
-                    if mapped.get("filtered_out"):
-                        continue
-                    ev = {
-                        "date": date_part,
-                        "name": mapped.get("display_text") or "",
-                        "display_text": mapped.get("display_text"),
-                        "tag_text": mapped.get("tag_text"),
-                        "tag_color_name": mapped.get("tag_color_name"),
-                        "tag_color_rgb": mapped.get("tag_color_rgb"),
-                        "time": "",
-                        "icon": mapped.get("icon"),
-                        "icon_size": mapped.get("icon_size"),
-                        "icon_color_name": mapped.get("icon_color_name"),
-                        "icon_color_rgb": mapped.get("icon_color_rgb"),
-                        "icon_mode": mapped.get("mode"),
-                        "original_name": raw_name,
-                    }
-                    if not any(e['date'] == ev['date'] and e['name'] == ev['name'] for e in events):
-                        events.append(ev)
+                    pickups.append((date_part, "Movar: " + fraction_names.get(fid, "Ukjent")))
+        # the same few fractions recur all window long: map each name once
+        mapped_all = apply_event_mapping_batch([raw_name for _, raw_name in pickups])
+        for (date_part, raw_name), mapped in zip(pickups, mapped_all):
+            if mapped.get("filtered_out"):
+                continue
+            ev = _event_from_mapped(mapped, date_part, "", raw_name)
+            events.add(ev)
     except Exception as ex:
         print("[fetch_tommekalender_events] exception:", ex)
-    return events
+        if raise_on_error:
+            raise
+    return events.to_list()
 
 
 # --------------------------------------------------------------------
@@ -465,8 +640,99 @@ def _ensure_aware(dt):
     return dt.astimezone(timezone.utc)
 
 
-def fetch_google_calendar_events(days=DEFAULT_DAYS, session=None):
-    session = session or requests.Session()
+def _append_gcal_items(items, start_local_dt, events):
+    """
+    Normalize Google Calendar `items` (summary/start/end dicts) into event dicts
+    and add them to the EventStore `events` (deduped on date/name/time).
+    """
+    # map every distinct summary once for the whole batch (recurring events repeat it per day)
+    summaries = list(dict.fromkeys(s for s in ((it.get("summary") or "").strip() for it in items) if s))
+    mapped_by_summary = dict(zip(summaries, apply_event_mapping_batch(summaries)))
+    for it in items:
+        summary = (it.get("summary") or "").strip()
+        if not summary:
+            continue
+        # Skip titles the mapping filters out (computed once per summary above)
+        mapped = mapped_by_summary[summary]
+        if mapped.get("filtered_out"):
+            continue
+
+        start = it.get("start", {})
+        end = it.get("end", {})
+        if "date" in start:  # heldags-event
+            sdate = start["date"]
+            edate = end.get("date", sdate)
+            try:
+                sdt = datetime.strptime(sdate, "%Y-%m-%d").date()
+                edt = datetime.strptime(edate, "%Y-%m-%d").date()
+            except Exception:
+                sdt = None
+                edt = None
+
+            try:
+                query_start_date = start_local_dt.date()
+            except Exception:
+                query_start_date = now_local().date()
+
+            if sdt is None or edt is None:
+                date_str = sdate
+                try:
+                    if datetime.strptime(date_str, "%Y-%m-%d").date() < query_start_date:
+                        continue
+                except Exception:
+                    pass
+                ev = _event_from_mapped(mapped, date_str, "", summary)
+                events.add(ev)
+            else:
+                last_day = edt - timedelta(days=1)
+                day = max(sdt, query_start_date)
+                while day <= last_day:
+                    date_str = day.strftime("%Y-%m-%d")
+                    ev = _event_from_mapped(mapped, date_str, "", summary)
+                    events.add(ev)
+                    day += timedelta(days=1)
+        elif "dateTime" in start:
+            dt_start_raw = start.get("dateTime")
+            dt_end_raw = end.get("dateTime") or dt_start_raw
+
+            dt_core_start = dt_start_raw[:19]
+            dt_core_end = dt_end_raw[:19]
+            try:
+                dt_start = datetime.strptime(dt_core_start, "%Y-%m-%dT%H:%M:%S")
+                dt_end = datetime.strptime(dt_core_end, "%Y-%m-%dT%H:%M:%S")
+            except Exception:
+                try:
+                    dt = datetime.strptime(dt_core_start, "%Y-%m-%dT%H:%M:%S")
+                    date_str = dt.strftime("%Y-%m-%d")
+                    time_str = dt.strftime("%H:%M")
+                    ev = _event_from_mapped(mapped, date_str, time_str, summary)
+                    events.add(ev)
+                except Exception:
+                    pass
+                continue
+
+            sdt = dt_start.date()
+            edt = dt_end.date()
+            include_end = (dt_end.time() != datetime.min.time())
+            last_day = edt if include_end else (edt - timedelta(days=1))
+
+            try:
+                query_start_date = start_local_dt.date()
+            except Exception:
+                query_start_date = now_local().date()
+
+            day = max(sdt, query_start_date)
+            while day <= last_day:
+                date_str = day.strftime("%Y-%m-%d")
+                time_str = dt_start.strftime("%H:%M") if day == sdt else ""
+
+                ev = _event_from_mapped(mapped, date_str, time_str, summary)
+                events.add(ev)
+                day += timedelta(days=1)
+
+
+def fetch_google_calendar_events(days=DEFAULT_DAYS, session=None, incremental=None, raise_on_error=False):
+    session = session or get_session()
     today_local = now_local().date()
 
     if TZ:
@@ -487,195 +753,176 @@ def fetch_google_calendar_events(days=DEFAULT_DAYS, session=None):
         f"?timeMin={timeMin}&timeMax={timeMax}&singleEvents=true&fields=items(summary,start,end)&orderBy=startTime&key={API_KEY_GOOGLE}"
     )
 
-    events = []
+    if incremental is None:
+        # the local sync store would hide requests from fixture record/replay
+        incremental = GCAL_SYNC_MODE == "incremental" and not http_fixtures.active()
+
+    events = EventStore()
+    if incremental:
+        try:
+            items = _sync_google_calendar_items(session, CALENDAR_ID, start_utc, end_utc)
+            _append_gcal_items(items, start_local_dt, events)
+            return events.to_list()
+        except Exception as ex:
+            print("[fetch_google_calendar_events] incremental sync failed, falling back to full list:", ex)
+            events = EventStore()
+
     try:
-        r = session.get(url, timeout=10)
+        r = cached_get(url, session=session)
         if r.status_code == 200:
             data = r.json()
-            items = data.get("items", [])
-            for it in items:
-                summary = (it.get("summary") or "").strip()
-                if not summary:
-                    continue
-                # Skip titles that are only a token that would be filtered out by mapping
-                if summary and mapping_info_for_event:
-                    try:
-                        mcheck = mapping_info_for_event(summary)
-                        if mcheck and mcheck.get("remaining_text", "").strip() == "" and (mcheck.get("mode") in ("replace_icon", "replace_text", "replace_all")):
-                            applied = apply_event_mapping(summary)
-                            if applied.get("filtered_out"):
-                                continue
-                    except Exception:
-                        pass
+            _append_gcal_items(data.get("items", []), start_local_dt, events)
+        elif raise_on_error:
+            raise RuntimeError(f"Google Calendar HTTP {r.status_code}")
+    except Exception as ex:
+        print("[fetch_google_calendar_events] exception:", ex)
+        if raise_on_error:
+            raise
+    return events.to_list()
 
-                start = it.get("start", {})
-                end = it.get("end", {})
-                if "date" in start:  # heldags-event
-                    sdate = start["date"]
-                    edate = end.get("date", sdate)
-                    try:
-                        sdt = datetime.strptime(sdate, "%Y-%m-%d").date()
-                        edt = datetime.strptime(edate, "%Y-%m-%d").date()
-                    except Exception:
-                        sdt = None
-                        edt = None
 
-                    try:
-                        query_start_date = start_local_dt.date()
-                    except Exception:
-                        query_start_date = now_local().date()
+# --------------------------------------------------------------------
+# Google Calendar incremental sync (syncToken + local event store)
+# --------------------------------------------------------------------
+class _GcalSyncTokenExpired(Exception):
+    """Google answered 410 Gone: the stored syncToken is no longer valid."""
 
-                    if sdt is None or edt is None:
-                        date_str = sdate
-                        try:
-                            if datetime.strptime(date_str, "%Y-%m-%d").date() < query_start_date:
-                                continue
-                        except Exception:
-                            pass
-                        mapped = apply_event_mapping(summary)
-                        if mapped.get("filtered_out"):
-                            continue
-                        ev = {
-                            "date": date_str,
-                            "name": mapped.get("display_text") or "",
-                            "display_text": mapped.get("display_text"),
-                            "tag_text": mapped.get("tag_text"),
-                            "tag_color_name": mapped.get("tag_color_name"),
-                            "tag_color_rgb": mapped.get("tag_color_rgb"),
-                            "time": "",
-                            "icon": mapped.get("icon"),
-                            "icon_size": mapped.get("icon_size"),
-                            "icon_color_name": mapped.get("icon_color_name"),
-                            "icon_color_rgb": mapped.get("icon_color_rgb"),
-                            "icon_mode": mapped.get("mode"),
-                            "original_name": summary,
-                        }
-                        if not any(e['date'] == ev['date'] and e['name'] == ev['name'] and e.get('time','') == ev['time'] for e in events):
-                            events.append(ev)
-                    else:
-                        last_day = edt - timedelta(days=1)
-                        day = max(sdt, query_start_date)
-                        while day <= last_day:
-                            date_str = day.strftime("%Y-%m-%d")
-                            mapped = apply_event_mapping(summary)
-                            if mapped.get("filtered_out"):
-                                day += timedelta(days=1)
-                                continue
-                            ev = {
-                                "date": date_str,
-                                "name": mapped.get("display_text") or "",
-                                "display_text": mapped.get("display_text"),
-                                "tag_text": mapped.get("tag_text"),
-                                "tag_color_name": mapped.get("tag_color_name"),
-                                "tag_color_rgb": mapped.get("tag_color_rgb"),
-                                "time": "",
-                                "icon": mapped.get("icon"),
-                                "icon_size": mapped.get("icon_size"),
-                                "icon_color_name": mapped.get("icon_color_name"),
-                                "icon_color_rgb": mapped.get("icon_color_rgb"),
-                                "icon_mode": mapped.get("mode"),
-                                "original_name": summary,
-                            }
-                            if not any(e['date'] == ev['date'] and e['name'] == ev['name'] and e.get('time','') == ev['time'] for e in events):
-                                events.append(ev)
-                            day += timedelta(days=1)
-                elif "dateTime" in start:
-                    dt_start_raw = start.get("dateTime")
-                    dt_end_raw = end.get("dateTime") or dt_start_raw
-
-                    dt_core_start = dt_start_raw[:19]
-                    dt_core_end = dt_end_raw[:19]
-                    try:
-                        dt_start = datetime.strptime(dt_core_start, "%Y-%m-%dT%H:%M:%S")
-                        dt_end = datetime.strptime(dt_core_end, "%Y-%m-%dT%H:%M:%S")
-                    except Exception:
-                        try:
-                            dt = datetime.strptime(dt_core_start, "%Y-%m-%dT%H:%M:%S")
-                            date_str = dt.strftime("%Y-%m-%d")
-                            time_str = dt.strftime("%H:%M")
-                            mapped = apply_event_mapping(summary)
-                            if mapped.get("filtered_out"):
-                                continue
-                            ev = {
-                                "date": date_str,
-                                "name": mapped.get("display_text") or "",
-                                "display_text": mapped.get("display_text"),
-                                "tag_text": mapped.get("tag_text"),
-                                "tag_color_name": mapped.get("tag_color_name"),
-                                "tag_color_rgb": mapped.get("tag_color_rgb"),
-                                "time": time_str,
-                                "icon": mapped.get("icon"),
-                                "icon_size": mapped.get("icon_size"),
-                                "icon_color_name": mapped.get("icon_color_name"),
-                                "icon_color_rgb": mapped.get("icon_color_rgb"),
-                                "icon_mode": mapped.get("mode"),
-                                "original_name": summary,
-                            }
-                            if not any(e['date'] == ev['date'] and e['name'] == ev['name'] and e.get('time','') == ev['time'] for e in events):
-                                events.append(ev)
-                        except Exception:
-                            pass
-                        continue
 
-                    sdt = dt_start.date()
-                    edt = dt_end.date()
-                    include_end = (dt_end.time() != datetime.min.time())
-                    last_day = edt if include_end else (edt - timedelta(days=1))
+_GCAL_SYNC_FIELDS = "nextPageToken,nextSyncToken,items(id,status,summary,start,end)"
 
-                    try:
-                        query_start_date = start_local_dt.date()
-                    except Exception:
-                        query_start_date = now_local().date()
 
-                    day = max(sdt, query_start_date)
-                    while day <= last_day:
-                        date_str = day.strftime("%Y-%m-%d")
-                        mapped = apply_event_mapping(summary)
-                        if mapped.get("filtered_out"):
-                            day += timedelta(days=1)
-                            continue
+def _gcal_list_pages(session, calendar_id, params):
+    """
+    Page through events.list and return (items, next_sync_token).
+    Raises _GcalSyncTokenExpired on 410 and RuntimeError on other errors.
+    """
+    url = f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events"
+    items = []
+    page_token = None
+    while True:
+        q = dict(params)
+        q["key"] = API_KEY_GOOGLE
+        q["fields"] = _GCAL_SYNC_FIELDS
+        q["maxResults"] = 2500
+        if page_token:
+            q["pageToken"] = page_token
+        r = session.get(url, params=q, timeout=timeout_for(url))
+        if r.status_code == 410:
+            raise _GcalSyncTokenExpired()
+        if r.status_code != 200:
+            raise RuntimeError(f"Google Calendar HTTP {r.status_code}")
+        data = r.json()
+        items.extend(data.get("items", []) or [])
+        page_token = data.get("nextPageToken")
+        if not page_token:
+            return items, data.get("nextSyncToken")
 
-                        time_str = dt_start.strftime("%H:%M") if day == sdt else ""
-
-                        ev = {
-                            "date": date_str,
-                            "name": mapped.get("display_text") or "",
-                            "display_text": mapped.get("display_text"),
-                            "tag_text": mapped.get("tag_text"),
-                            "tag_color_name": mapped.get("tag_color_name"),
-                            "tag_color_rgb": mapped.get("tag_color_rgb"),
-                            "time": time_str,
-                            "icon": mapped.get("icon"),
-                            "icon_size": mapped.get("icon_size"),
-                            "icon_color_name": mapped.get("icon_color_name"),
-                            "icon_color_rgb": mapped.get("icon_color_rgb"),
-                            "icon_mode": mapped.get("mode"),
-                            "original_name": summary,
-                        }
-                        if not any(e['date'] == ev['date'] and e['name'] == ev['name'] and e.get('time','') == ev['time'] for e in events):
-                            events.append(ev)
-                        day += timedelta(days=1)
-    except Exception as ex:
-        print("[fetch_google_calendar_events] exception:", ex)
-    events.sort(key=lambda e: (e['date'], e.get('time', '')))
-    return events
+
+def _gcal_item_dates(it):
+    """Return (first_date_str, last_date_str) for a stored raw item (YYYY-MM-DD, inclusive-ish)."""
+    start = it.get("start", {}) or {}
+    end = it.get("end", {}) or {}
+    s = start.get("date") or (start.get("dateTime") or "")[:10]
+    e = end.get("date") or (end.get("dateTime") or "")[:10] or s
+    return s, e
+
+
+def _sync_google_calendar_items(session, calendar_id, start_utc, end_utc):
+    """
+    Return raw Google items overlapping start_utc..end_utc from the local store,
+    after applying the latest delta from Google.
+
+    The first call (or a call after 410 Gone / a window past the stored horizon)
+    does a full list over [start, start + GCAL_SYNC_HORIZON_DAYS] and stores
+    Google's nextSyncToken. Later calls only request changes with syncToken:
+    new/changed instances are upserted and cancelled ones removed, keyed by id.
+    """
+    store = _load_json_state(GCAL_SYNC_STORE_PATH, {}) or {}
+    cals = store.setdefault("calendars", {})
+    cal = cals.get(calendar_id) or {}
+
+    def iso_z(dt):
+        return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    need_full = (
+        not cal.get("sync_token")
+        or not cal.get("time_min") or cal["time_min"] > iso_z(start_utc)
+        or not cal.get("time_max") or cal["time_max"] < iso_z(end_utc)
+    )
+
+    if not need_full:
+        try:
+            changes, token = _gcal_list_pages(session, calendar_id, {"syncToken": cal["sync_token"], "singleEvents": "true"})
+            stored = cal.setdefault("events", {})
+            for it in changes:
+                ev_id = it.get("id")
+                if not ev_id:
+                    continue
+                if it.get("status") == "cancelled":
+                    stored.pop(ev_id, None)
+                else:
+                    stored[ev_id] = {"summary": it.get("summary"), "start": it.get("start"), "end": it.get("end")}
+            cal["sync_token"] = token or cal["sync_token"]
+            if changes:
+                print(f"[gcal sync] applied {len(changes)} change(s)")
+        except _GcalSyncTokenExpired:
+            print("[gcal sync] syncToken expired (410), doing full resync")
+            need_full = True
+
+    if need_full:
+        horizon_end = start_utc + timedelta(days=max(GCAL_SYNC_HORIZON_DAYS, (end_utc - start_utc).days))
+        params = {"timeMin": iso_z(start_utc), "timeMax": iso_z(horizon_end), "singleEvents": "true"}
+        items, token = _gcal_list_pages(session, calendar_id, params)
+        cal = {
+            "sync_token": token,
+            "time_min": params["timeMin"],
+            "time_max": params["timeMax"],
+            "events": {
+                it["id"]: {"summary": it.get("summary"), "start": it.get("start"), "end": it.get("end")}
+                for it in items if it.get("id") and it.get("status") != "cancelled"
+            },
+        }
+        print(f"[gcal sync] full sync: {len(cal['events'])} event(s)")
+
+    cal["synced_at"] = int(datetime.now(timezone.utc).timestamp())
+    cals[calendar_id] = cal
+    _save_json_state(GCAL_SYNC_STORE_PATH, store)
+
+    # filter the store locally to the requested window (local dates)
+    first_day = (start_utc.astimezone(TZ) if TZ else start_utc).strftime("%Y-%m-%d")
+    last_day_excl = (end_utc.astimezone(TZ) if TZ else end_utc).strftime("%Y-%m-%d")
+    window = []
+    for it in cal.get("events", {}).values():
+        s, e = _gcal_item_dates(it)
+        if not s:
+            continue
+        if s < last_day_excl and e >= first_day:
+            window.append(it)
+    window.sort(key=lambda it: ((it.get("start") or {}).get("dateTime") or (it.get("start") or {}).get("date") or ""))
+    return window
 
 
 # --------------------------------------------------------------------
 # Weather provider integration
 # --------------------------------------------------------------------
 try:
-    from weather_provider import get_forecast_json, debug_print  # may raise
+    from weather_provider import get_forecast_json, get_forecasts_for_locations, debug_print  # may raise
 except Exception:
     def get_forecast_json(*args, **kwargs):
         return {}
+    def get_forecasts_for_locations(locations, *args, **kwargs):
+        return [{} for _ in locations]
     def debug_print(*args, **kwargs):
         pass
 
 
-def fetch_weather_from_provider(lat=LAT, lon=LON, days=DEFAULT_DAYS):
+def fetch_weather_from_provider(lat=LAT, lon=LON, days=DEFAULT_DAYS, raise_on_error=False):
     try:
-        forecast = get_forecast_json(lat=lat, lon=lon, days=days, user_agent="InkyFrameCalendar/1.0 (contact: youremail@example.com)", keep_debug_hourly=True)
+        user_agent = "InkyFrameCalendar/1.0 (contact: youremail@example.com)"
+        if WEATHER_GRID_CELLS:
+            forecast = get_forecasts_for_locations([(lat, lon)], days=days, user_agent=user_agent)[0]
+        else:
+            forecast = get_forecast_json(lat=lat, lon=lon, days=days, user_agent=user_agent, keep_debug_hourly=True)
         weather_list = []
         for day in forecast.get("daily", []):
             weather_list.append({
@@ -686,11 +933,20 @@ def fetch_weather_from_provider(lat=LAT, lon=LON, days=DEFAULT_DAYS):
                 "precip": day.get("precip"),
                 "wind_max": day.get("wind_max"),
                 "wind_dir_deg": day.get("wind_dir_deg"),
-                "source": day.get("source")
+                "source": day.get("source"),
+                # precomputed morning/lunch/day/evening summaries (weather_provider.periods_by_day)
+                "periods": day.get("periods"),
             })
         hourly_today = forecast.get("hourly_today", [])
-        return weather_list, hourly_today, forecast.get("meta", {})
+        meta = forecast.get("meta", {})
+        # get_forecast_json reports provider failures in meta; with no usable day at all
+        # this counts as a failed fetch
+        if raise_on_error and not any(d.get("source") not in (None, "none") for d in weather_list):
+            raise RuntimeError(f"no weather data (met_error={meta.get('met_error')}, om_error={meta.get('om_error')})")
+        return weather_list, hourly_today, meta
     except Exception as ex:
+        if raise_on_error:
+            raise
         return [], [], {}
 
 
@@ -712,18 +968,14 @@ def _color_from_mapping_entry(entry):
                 pass
     for k in ("color", "tag_color_name", "icon_color_name", "color_name"):
         if entry.get(k):
-            try:
-                rgb = ImageColor.getrgb(str(entry.get(k)))
-                return (int(rgb[0]), int(rgb[1]), int(rgb[2]))
-            except Exception:
-                pass
+            rgb = to_rgb(str(entry.get(k)))
+            if rgb is not None:
+                return rgb
     for k, v in entry.items():
-        try:
-            if str(k).lower().endswith("color") and v:
-                rgb = ImageColor.getrgb(str(v))
-                return (int(rgb[0]), int(rgb[1]), int(rgb[2]))
-        except Exception:
-            pass
+        if str(k).lower().endswith("color") and v:
+            rgb = to_rgb(str(v))
+            if rgb is not None:
+                return rgb
     return None
 
 
@@ -776,32 +1028,56 @@ def _build_lookup_from_EVENT_MAPPINGS(event_mappings_obj):
 
 def enrich_events_with_tags(events, EVENT_MAPPINGS=None, prefer_mapping_module=True):
     """
-    Return a copy of events where each event has ev['tags'] = [{'text':.., 'color_rgb':(...)}...]
+    Return events where each event has ev['tags'] = [{'text':.., 'color_rgb':(...)}...]
+    Event records are updated in place (no per-event copy); plain dicts are
+    converted to Event.
     Behavior:
       - If event already has ev['tags'], normalize and keep them.
       - Prefer structured tags returned by mapping_func(ev_name) (if present).
       - If not present, prefer explicit ev['tag_text'] split by commas.
       - FALLBACK (conservative): scan words/tokens in event name and only accept a token
-        as a tag if it matches a key in EVENT_MAPPINGS lookup or mapping_info_for_event(token)
-        returns structured info with a color/tag. This avoids creating tags for arbitrary
-        capitalized names (which caused Geir/Wiggen/Restavfall).
+        as a tag if it is a keyword/replacement with a color in the mappings tag index
+        (mappings.get_tag_index, one dict probe per token). This avoids creating tags for
+        arbitrary capitalized names (which caused Geir/Wiggen/Restavfall).
     """
     import importlib
     mapping_func = None
+    batch_func = None
+    tag_index = None
     try:
         m = importlib.import_module("mappings")
         if hasattr(m, "apply_event_mapping") and callable(getattr(m, "apply_event_mapping")):
             mapping_func = getattr(m, "apply_event_mapping")
+        batch_func = getattr(m, "apply_event_mapping_batch", None)
+        # casefolded token -> (tag text, rgb), built once per mappings table
+        tag_index = m.get_tag_index(EVENT_MAPPINGS or None)
     except Exception:
         mapping_func = None
 
-    lookup = {}
-    if EVENT_MAPPINGS:
-        lookup = _build_lookup_from_EVENT_MAPPINGS(EVENT_MAPPINGS)
+    if tag_index is None:
+        tag_index = {}
+        for key, entry in _build_lookup_from_EVENT_MAPPINGS(EVENT_MAPPINGS).items():
+            tag_index.setdefault(key.casefold(), (key, _color_from_mapping_entry(entry)))
+
+    events = [ev if isinstance(ev, Event) else Event.from_dict(ev) for ev in events]
+    # step 2 below: map the full names of all untagged events in one batch call
+    mapped_names = [None] * len(events)
+    if mapping_func and prefer_mapping_module:
+        names = [("" if ev.get("tags") else (ev.get("name") or ev.get("display_text") or "")) for ev in events]
+        try:
+            mapped_names = batch_func(names) if callable(batch_func) else None
+        except Exception:
+            mapped_names = None
+        if mapped_names is None:
+            mapped_names = []
+            for n in names:
+                try:
+                    mapped_names.append(mapping_func(n))
+                except Exception:
+                    mapped_names.append(None)
 
     enriched = []
-    for ev in events:
-        ev_copy = dict(ev)
+    for ev_copy, mapped in zip(events, mapped_names):
 
         # 1) If ev already has structured tags, normalize them and keep
         if ev_copy.get("tags"):
@@ -817,11 +1093,9 @@ def enrich_events_with_tags(events, EVENT_MAPPINGS=None, prefer_mapping_module=T
                         except Exception:
                             pass
                     elif t.get("color_name"):
-                        try:
-                            rgb = ImageColor.getrgb(str(t.get("color_name")))
-                            te["color_rgb"] = (int(rgb[0]), int(rgb[1]), int(rgb[2]))
-                        except Exception:
-                            pass
+                        rgb = to_rgb(str(t.get("color_name")))
+                        if rgb is not None:
+                            te["color_rgb"] = rgb
                     norm.append(te)
                 if norm:
                     ev_copy["tags"] = norm
@@ -833,7 +1107,6 @@ def enrich_events_with_tags(events, EVENT_MAPPINGS=None, prefer_mapping_module=T
         # 2) Try mapping_func for full summary first (may return structured tags)
         try:
             if mapping_func and prefer_mapping_module:
-                mapped = mapping_func(ev_copy.get("name") or ev_copy.get("display_text") or "")
                 if isinstance(mapped, dict) and mapped.get("tags"):
                     out_tags = []
                     for t in mapped.get("tags"):
@@ -846,11 +1119,9 @@ def enrich_events_with_tags(events, EVENT_MAPPINGS=None, prefer_mapping_module=T
                             except Exception:
                                 pass
                         elif t.get("color_name"):
-                            try:
-                                rgb = ImageColor.getrgb(str(t.get("color_name")))
-                                te["color_rgb"] = (int(rgb[0]), int(rgb[1]), int(rgb[2]))
-                            except Exception:
-                                pass
+                            rgb = to_rgb(str(t.get("color_name")))
+                            if rgb is not None:
+                                te["color_rgb"] = rgb
                         out_tags.append(te)
                     if out_tags:
                         ev_copy["tags"] = out_tags
@@ -876,33 +1147,14 @@ def enrich_events_with_tags(events, EVENT_MAPPINGS=None, prefer_mapping_module=T
             for p in parts:
                 if not p:
                     continue
-                color_rgb = None
-                # lookup in EVENT_MAPPINGS-derived lookup
-                entry = lookup.get(p) or lookup.get(p.strip())
-                if entry:
-                    color_rgb = _color_from_mapping_entry(entry)
-                # mapping_func on token as fallback
-                if color_rgb is None and mapping_func:
-                    try:
-                        info = mapping_func(p)
-                        if isinstance(info, dict):
-                            color_rgb = _color_from_mapping_entry(info)
-                            if color_rgb is None and info.get("tags"):
-                                try:
-                                    t0 = info.get("tags")[0]
-                                    color_rgb = _color_from_mapping_entry(t0) or color_rgb
-                                except Exception:
-                                    pass
-                    except Exception:
-                        pass
+                # color of the tag in the mappings tag index
+                hit = tag_index.get(p.strip().casefold())
+                color_rgb = hit[1] if hit else None
                 # final fallback legacy
                 if color_rgb is None and legacy_rgb is not None:
                     color_rgb = legacy_rgb
                 elif color_rgb is None and legacy_name:
-                    try:
-                        color_rgb = ImageColor.getrgb(str(legacy_name))
-                    except Exception:
-                        color_rgb = None
+                    color_rgb = to_rgb(str(legacy_name))
 
                 tag_entry = {"text": str(p).strip()}
                 if color_rgb is not None:
@@ -917,43 +1169,18 @@ def enrich_events_with_tags(events, EVENT_MAPPINGS=None, prefer_mapping_module=T
                 continue
 
         # 4) CONSERVATIVE FALLBACK: scan tokens in name but only accept them
-        #    if they are present in EVENT_MAPPINGS lookup or mapping_info_for_event(token)
-        #    returns something useful. This prevents creating tags for arbitrary capitalized tokens.
+        #    if they are a keyword/replacement with a color in the tag index.
+        #    This prevents creating tags for arbitrary capitalized tokens.
         name_source = ev_copy.get("name") or ev_copy.get("original_name") or ""
         tokens = [t.strip() for t in re.split(r"[,\s\-\:]+", str(name_source)) if t.strip()]
         found = []
         for t in tokens:
-            if not t:
-                continue
             # only consider short tokens (avoid long fragments)
             if len(t) > 30 or len(t) < 2:
                 continue
-            # check direct lookup (case-insensitive)
-            entry = lookup.get(t) or lookup.get(t.lower()) or lookup.get(t.capitalize())
-            color_rgb = None
-            if entry:
-                color_rgb = _color_from_mapping_entry(entry)
-            # else ask mapping_func for the token (if available)
-            if color_rgb is None and mapping_func:
-                try:
-                    info = mapping_func(t)
-                    if isinstance(info, dict):
-                        # accept if mapping returns a replacement/tag or color
-                        color_rgb = _color_from_mapping_entry(info)
-                        # if mapping contains tags with colors, accept first
-                        if color_rgb is None and info.get("tags"):
-                            try:
-                                t0 = info.get("tags")[0]
-                                color_rgb = _color_from_mapping_entry(t0) or color_rgb
-                            except Exception:
-                                pass
-                        # only accept token if info suggests it's a tag/replacement (avoid noise)
-                        if not (info.get("replacement") or info.get("mode") or info.get("tags") or info.get("color") or info.get("color_rgb")):
-                            color_rgb = None
-                except Exception:
-                    pass
-            if color_rgb is not None:
-                found.append((t, color_rgb))
+            hit = tag_index.get(t.casefold())
+            if hit and hit[1] is not None:
+                found.append((t, hit[1]))
 
         if found:
             out_tags = []
@@ -970,6 +1197,55 @@ def enrich_events_with_tags(events, EVENT_MAPPINGS=None, prefer_mapping_module=T
         enriched.append(ev_copy)
 
     return enriched
+# --------------------------------------------------------------------
+# Last-good snapshots (see snapshot_store.py)
+# --------------------------------------------------------------------
+def _saving_snapshot(name, fn):
+    """Wrap a source callable so every successful result is stored as its snapshot."""
+    def _run():
+        value = fn()
+        save_snapshot(name, value)
+        return value
+    return _run
+
+
+def _restore_snapshot(name, value, days):
+    """Turn a stored snapshot back into the source's normal return value, limited to today..today+days."""
+    first = date_string_for_offset(0)
+    end = date_string_for_offset(days)
+    if name == "weather":
+        weather, hourly, meta = (list(value or []) + [[], [], {}])[:3]
+        weather = [w for w in (weather or []) if first <= (w.get("date") or "") < end]
+        hourly = [h for h in (hourly or []) if (h.get("time") or "")[:10] >= first]
+        return weather, hourly, dict(meta or {})
+    return [Event.from_dict(e) for e in (value or []) if isinstance(e, dict) and first <= (e.get("date") or "") < end]
+
+
+def snapshot_fallback_data(days=DEFAULT_DAYS):
+    """
+    Build initial_fetch_all-shaped data from snapshots only (no network).
+    Used by main when the whole fetch fails.
+    """
+    store = EventStore()
+    weather, hourly, meta = [], [], {}
+    stale = {}
+    for name in ("gcal", "movar", "holidays", "weather"):
+        value, age = load_snapshot(name)
+        if value is None:
+            continue
+        stale[name] = int(age)
+        restored = _restore_snapshot(name, value, days)
+        if name == "weather":
+            weather, hourly, meta = restored
+        else:
+            store.extend(restored)
+    meta = dict(meta or {})
+    meta["stale_sources"] = stale
+    missing = sorted({"gcal", "movar", "holidays", "weather"} - set(stale))
+    meta["missing_sources"] = missing
+    return {"events": store.to_list(), "weather": weather, "hourly_today": hourly, "meta": meta, "missing": missing}
+
+
 # --------------------------------------------------------------------
 # initial_fetch_all (wired to call enrichment)
 # --------------------------------------------------------------------
@@ -978,219 +1254,194 @@ def initial_fetch_all(days=DEFAULT_DAYS, session=None, gatenavn=None, husnr=None
     import os
     from datetime import datetime
 
-    s = session or requests.Session()
-    try:
-        # fetch initial data
-        fractions = fetch_fraction_names(session=s)
-        tomme = fetch_tommekalender_events(fractions, days=days, session=s, gatenavn=gatenavn, husnr=husnr)
-        gcal = fetch_google_calendar_events(days=days, session=s)
-
-        
-        # fetch public holidays (Norway calendar by default)
-        holidays = []
-        try:
-            holidays = fetch_google_holiday_events(calendar_id=HOLIDAYS_CALENDAR_ID, days=days, session=s)
-        except Exception:
-            holidays = []
-# fetch weather: (weather, hourly, meta) expected from your provider function
-        weather, hourly, meta = fetch_weather_from_provider(lat=LAT, lon=LON, days=days)
+    s = session or get_session()
+    # fetch all independent sources concurrently; tommekalender depends on
+    # the fraction names so those two run as one chained source.
+    def _movar():
+        fractions = fetch_fraction_names(session=s, raise_on_error=True)
+        return fetch_tommekalender_events(fractions, days=days, session=s, gatenavn=gatenavn, husnr=husnr, raise_on_error=True)
+
+    sources = {
+        "movar": (_movar, SOURCE_TIMEOUTS["movar"]),
+        "gcal": (lambda: fetch_google_calendar_events(days=days, session=s, raise_on_error=True), SOURCE_TIMEOUTS["gcal"]),
+        # public holidays (Norway calendar by default)
+        "holidays": (lambda: fetch_google_holiday_events(calendar_id=HOLIDAYS_CALENDAR_ID, days=days, session=s, raise_on_error=True),
+                     SOURCE_TIMEOUTS["holidays"]),
+        # weather: (weather, hourly, meta) expected from your provider function
+        "weather": (lambda: fetch_weather_from_provider(lat=LAT, lon=LON, days=days, raise_on_error=True), SOURCE_TIMEOUTS["weather"]),
+    }
+    # Every good result is saved as that source's last-good snapshot (also when the
+    # source finishes after the deadline, so a slow source refreshes in the
+    # background). Sources with a snapshot only get FETCH_LATENCY_BUDGET seconds.
+    specs = {}
+    for name, (fn, timeout) in sources.items():
+        if snapshot_age(name) is not None:
+            timeout = min(timeout, FETCH_LATENCY_BUDGET)
+        specs[name] = (_saving_snapshot(name, fn), timeout)
+
+    fetch_report = {}
+    results = run_sources(specs, report=fetch_report)
+
+    # failed / late sources -> last good snapshot, marked with its age
+    stale = {}
+    for name in missing_sources(results):
+        value, age = load_snapshot(name)
+        if value is not None:
+            results[name] = _restore_snapshot(name, value, days)
+            stale[name] = int(age)
+            print(f"[initial_fetch_all] using {name} snapshot ({int(age)}s old)")
+    missing = missing_sources(results)
+
+    tomme = results["movar"] if results["movar"] is not MISSING else []
+    gcal = results["gcal"] if results["gcal"] is not MISSING else []
+    holidays = results["holidays"] if results["holidays"] is not MISSING else []
+    if results["weather"] is not MISSING:
+        weather, hourly, meta = results["weather"]
+    else:
+        weather, hourly, meta = [], [], {}
+    meta = dict(meta or {})
+    meta["missing_sources"] = missing
+    meta["stale_sources"] = stale
+    meta["fetch_report"] = fetch_report
 
-        # --- Ensure hourly entries include 'condition' and 'precip' for renderer ---
-        try:
-            # Normalize keys and fill missing fields so renderer can map icons
-            hourly = hourly or []
-            for h in hourly:
-                # ensure precip is present (many providers use precip_mm or precipitation)
-                if h.get("precip") is None:
-                    if h.get("precip_mm") is not None:
-                        h["precip"] = h.get("precip_mm")
-                    elif h.get("precipitation") is not None:
-                        h["precip"] = h.get("precipitation")
-                    else:
-                        h["precip"] = 0.0
-
-                # ensure temperature field is normalized
-                if h.get("temp") is None:
-                    if h.get("temperature") is not None:
-                        h["temp"] = h.get("temperature")
-                    elif h.get("air_temperature") is not None:
-                        h["temp"] = h.get("air_temperature")
-
-                # ensure there's a condition string; try matching daily summary first
-                if not h.get("condition"):
-                    # try find the day summary for this hour (match by date prefix YYYY-MM-DD)
-                    t = h.get("time") or h.get("dt") or h.get("datetime")
+    # --- Ensure hourly entries include 'condition' and 'precip' for renderer ---
+    try:
+        # Normalize keys and fill missing fields so renderer can map icons
+        hourly = hourly or []
+        for h in hourly:
+            # ensure precip is present (many providers use precip_mm or precipitation)
+            if h.get("precip") is None:
+                if h.get("precip_mm") is not None:
+                    h["precip"] = h.get("precip_mm")
+                elif h.get("precipitation") is not None:
+                    h["precip"] = h.get("precipitation")
+                else:
+                    h["precip"] = 0.0
+
+            # ensure temperature field is normalized
+            if h.get("temp") is None:
+                if h.get("temperature") is not None:
+                    h["temp"] = h.get("temperature")
+                elif h.get("air_temperature") is not None:
+                    h["temp"] = h.get("air_temperature")
+
+            # ensure there's a condition string; try matching daily summary first
+            if not h.get("condition"):
+                # try find the day summary for this hour (match by date prefix YYYY-MM-DD)
+                t = h.get("time") or h.get("dt") or h.get("datetime")
+                date_str = None
+                if isinstance(t, str) and len(t) >= 10:
+                    date_str = t[:10]
+                elif isinstance(t, (int, float)):
+                    # if time is hour index or epoch, we don't try to match day summary
                     date_str = None
-                    if isinstance(t, str) and len(t) >= 10:
-                        date_str = t[:10]
-                    elif isinstance(t, (int, float)):
-                        # if time is hour index or epoch, we don't try to match day summary
-                        date_str = None
-
-                    day_entry = None
-                    if date_str and weather:
-                        for d in weather:
-                            if d.get("date") == date_str:
-                                day_entry = d
-                                break
-                    if day_entry and (day_entry.get("condition") or day_entry.get("symbol")):
-                        # prefer daily textual condition if available
-                        h["condition"] = day_entry.get("condition") or day_entry.get("symbol")
+
+                day_entry = None
+                if date_str and weather:
+                    for d in weather:
+                        if d.get("date") == date_str:
+                            day_entry = d
+                            break
+                if day_entry and (day_entry.get("condition") or day_entry.get("symbol")):
+                    # prefer daily textual condition if available
+                    h["condition"] = day_entry.get("condition") or day_entry.get("symbol")
+                else:
+                    # fallback heuristic: if temp exists and <= 0 -> 'Skyet' (or 'Snø' if heavy precip)
+                    tval = h.get("temp")
+                    pval = h.get("precip", 0.0) or 0.0
+                    if pval >= 2.5:
+                        # heavy precip — guess rain or snow depending on temp
+                        h["condition"] = "Regn" if (tval is None or tval > 1.5) else "Snø"
                     else:
-                        # fallback heuristic: if temp exists and <= 0 -> 'Skyet' (or 'Snø' if heavy precip)
-                        tval = h.get("temp")
-                        pval = h.get("precip", 0.0) or 0.0
-                        if pval >= 2.5:
-                            # heavy precip — guess rain or snow depending on temp
-                            h["condition"] = "Regn" if (tval is None or tval > 1.5) else "Snø"
+                        if tval is None:
+                            h["condition"] = "Skyet"
                         else:
-                            if tval is None:
+                            # use a slightly more descriptive guess
+                            if tval <= -1.5:
                                 h["condition"] = "Skyet"
+                            elif tval <= 0.5:
+                                h["condition"] = "Delvis skyet"
                             else:
-                                # use a slightly more descriptive guess
-                                if tval <= -1.5:
-                                    h["condition"] = "Skyet"
-                                elif tval <= 0.5:
-                                    h["condition"] = "Delvis skyet"
-                                else:
-                                    h["condition"] = "Klarvær"
-        except Exception:
-            # don't break the whole fetch if something odd happens here
-            pass
+                                h["condition"] = "Klarvær"
+    except Exception:
+        # don't break the whole fetch if something odd happens here
+        pass
 
-        # merge events (tommekalender + gcal)
-        events = []
-        for e in gcal + tomme + holidays:
-            if not any(x['date'] == e['date'] and x['name'] == e['name'] and x.get('time', '') == e.get('time', '') for x in events):
-                events.append(e)
-        events.sort(key=lambda e: (e['date'], e.get('time', '')))
+    # merge events (tommekalender + gcal)
+    store = EventStore()
+    store.extend(gcal)
+    store.extend(tomme)
+    store.extend(holidays)
+    events = store.to_list()
 
-        # ---- ENRICH events with structured tags (so renderer can color per-tag) ----
-        try:
-            # prefer EVENT_MAPPINGS from mappings module if available
-            em = EVENT_MAPPINGS if 'EVENT_MAPPINGS' in globals() else None
-            events = enrich_events_with_tags(events, EVENT_MAPPINGS=em, prefer_mapping_module=True)
-        except Exception:
-            # fail gracefully: keep original events
-            pass
+    # ---- ENRICH events with structured tags (so renderer can color per-tag) ----
+    try:
+        # prefer EVENT_MAPPINGS from mappings module if available (current table, not an import-time copy)
+        em = getattr(mappings_module, "EVENT_MAPPINGS", None) if mappings_module else None
+        events = enrich_events_with_tags(events, EVENT_MAPPINGS=em, prefer_mapping_module=True)
+    except Exception:
+        # fail gracefully: keep original events
+        pass
 
-        # DEBUG: dump first weather entry for debugging and produce hourly preview + period picks
-        try:
-            if weather:
-                print("[DEBUG weather sample] first weather entry:", weather[0])
-            else:
-                print("[DEBUG weather sample] weather list empty")
-            print("[DEBUG hourly_today sample] len:", len(hourly))
-        except Exception:
-            print("[DEBUG] failed to print weather debug")
+    # DEBUG: dump first weather entry for debugging and produce hourly preview + period picks
+    try:
+        if weather:
+            print("[DEBUG weather sample] first weather entry:", weather[0])
+        else:
+            print("[DEBUG weather sample] weather list empty")
+        print("[DEBUG hourly_today sample] len:", len(hourly))
+    except Exception:
+        print("[DEBUG] failed to print weather debug")
 
-        # --- Additional debug: write hourly payload and print a readable summary + rep-per-period ---
+    # --- Additional debug: write hourly payload and print a readable summary + rep-per-period ---
+    try:
+        # write debug file next to this module
+        module_dir = os.path.dirname(__file__)
+        debug_path = os.path.join(module_dir, "debug_hourly.json")
         try:
-            # write debug file next to this module
-            module_dir = os.path.dirname(__file__)
-            debug_path = os.path.join(module_dir, "debug_hourly.json")
-            try:
-                with open(debug_path, "w", encoding="utf-8") as fh:
-                    json.dump(hourly, fh, ensure_ascii=False, indent=2)
-                print(f"[DEBUG] Saved debug hourly to: {debug_path}")
-            except Exception as ex:
-                print("[DEBUG] failed to write debug_hourly.json:", ex)
+            with open(debug_path, "w", encoding="utf-8") as fh:
+                json.dump(hourly, fh, ensure_ascii=False, indent=2)
+            print(f"[DEBUG] Saved debug hourly to: {debug_path}")
+        except Exception as ex:
+            print("[DEBUG] failed to write debug_hourly.json:", ex)
 
-            # compact preview of first 24 entries
-            try:
-                print("[DEBUG hourly entries preview] (index, time, cond, temp, precip)")
-                for i, h in enumerate((hourly or [])[:24]):
-                    t = h.get("time") or h.get("dt") or h.get("datetime") or h.get("hour") or "<no-time>"
-                    cond = h.get("condition") or h.get("symbol") or h.get("weather") or ""
-                    temp = h.get("temp") or h.get("temperature") or None
-                    precip = h.get("precip") if h.get("precip") is not None else h.get("precip_mm", None)
-                    print(f"  {i:02d}: {t} | {cond!r:30} | temp={str(temp):>6} | precip={str(precip)}")
-            except Exception as ex:
-                print("[DEBUG] failed to print hourly summary:", ex)
-
-            # quick representative selection check (simple heuristics)
-            try:
-                def _norm_cond_key(cond):
-                    if not cond:
-                        return "cloud"
-                    c = str(cond).lower()
-                    if "rain" in c or "regn" in c or "byge" in c:
-                        return "rain"
-                    if "snow" in c or "snø" in c:
-                        return "snow"
-                    if "sun" in c or "klar" in c:
-                        return "sun"
-                    if "thun" in c or "lyn" in c:
-                        return "thunder"
-                    if "fog" in c or "tåke" in c:
-                        return "fog"
-                    if "cloud" in c or "sky" in c or "skyet" in c:
-                        return "cloud"
-                    return "cloud"
-
-                def _choose_for_period(hours):
-                    if not hours:
-                        return None
-                    rank = {"sun":0, "cloud":1, "rain":2, "snow":3, "thunder":4}
-                    best = None
-                    best_rank = -1
-                    for hh in hours:
-                        key = _norm_cond_key(hh.get("condition") or hh.get("symbol") or hh.get("weather"))
-                        r = rank.get(key, 1)
-                        precip = hh.get("precip") or hh.get("precip_mm") or 0.0
-                        if best is None or (r > best_rank) or (r == best_rank and (precip or 0) > (best.get("precip") or 0)):
-                            best_rank = r
-                            best = {"hour": hh, "key": key, "precip": precip}
-                    return best
-
-                # naive split by hour-of-day; fallback to index-based distribution if no proper time field
-                periods = {"morning":[], "lunch":[], "day":[], "evening":[]}
-                for idx, hh in enumerate(hourly or []):
-                    t = hh.get("time")
-                    hour = None
-                    if isinstance(t, str):
-                        try:
-                            hour = int(datetime.fromisoformat(t.replace("Z", "+00:00")).hour)
-                        except Exception:
-                            hour = None
-                    elif isinstance(t, (int, float)):
-                        try:
-                            hour = int(t)
-                        except Exception:
-                            hour = None
-                    if hour is None:
-                        # distribute by index along 24h
-                        pos = idx % 24
-                        hour = pos
-
-                    if 6 <= hour <= 10:
-                        periods["morning"].append(hh)
-                    elif 11 <= hour <= 13:
-                        periods["lunch"].append(hh)
-                    elif 14 <= hour <= 17:
-                        periods["day"].append(hh)
-                    else:
-                        periods["evening"].append(hh)
-
-                for name in ("morning","lunch","day","evening"):
-                    rep = _choose_for_period(periods[name])
-                    if rep:
-                        hh = rep["hour"]
-                        t = hh.get("time") or hh.get("dt") or "<no-time>"
-                        print(f"[DEBUG chosen] {name:7} -> {t} {rep['key']} precip={rep['precip']}")
-                    else:
-                        print(f"[DEBUG chosen] {name:7} -> <no data>")
-            except Exception as ex:
-                print("[DEBUG] rep selection failed:", ex)
+        # compact preview of first 24 entries
+        try:
+            print("[DEBUG hourly entries preview] (index, time, cond, temp, precip)")
+            for i, h in enumerate((hourly or [])[:24]):
+                t = h.get("time") or h.get("dt") or h.get("datetime") or h.get("hour") or "<no-time>"
+                cond = h.get("condition") or h.get("symbol") or h.get("weather") or ""
+                temp = h.get("temp") or h.get("temperature") or None
+                precip = h.get("precip") if h.get("precip") is not None else h.get("precip_mm", None)
+                print(f"  {i:02d}: {t} | {cond!r:30} | temp={str(temp):>6} | precip={str(precip)}")
+        except Exception as ex:
+            print("[DEBUG] failed to print hourly summary:", ex)
 
+        # period picks as precomputed by the weather provider (no re-derivation here)
+        try:
+            today_key = date_string_for_offset(0)
+            periods = next((w.get("periods") for w in (weather or []) if w.get("date") == today_key), None) or {}
+            for name in ("morning", "lunch", "day", "evening"):
+                rep = periods.get(name)
+                if rep:
+                    print(f"[DEBUG chosen] {name:7} -> {rep.get('time')} {rep.get('symbol_code')} "
+                          f"temp={rep.get('temp')} precip={rep.get('precip')}")
+                else:
+                    print(f"[DEBUG chosen] {name:7} -> <no data>")
         except Exception as ex:
-            print("[DEBUG] hourly debug block failed:", ex)
+            print("[DEBUG] period summary failed:", ex)
+
+    except Exception as ex:
+        print("[DEBUG] hourly debug block failed:", ex)
 
-        return {"events": events, "weather": weather, "hourly_today": hourly, "meta": meta}
+    # apply_event_mapping memo stats (hits/misses per mappings version)
+    try:
+        if mappings_module and hasattr(mappings_module, "apply_event_mapping_cache_info"):
+            meta["mapping_memo"] = mappings_module.apply_event_mapping_cache_info()
+    except Exception:
+        pass
 
-    finally:
-        if session is None:
-            s.close()
+    return {"events": events, "weather": weather, "hourly_today": hourly, "meta": meta, "missing": missing}
 
 
 # --------------------------------------------------------------------
@@ -1217,7 +1468,7 @@ if __name__ == "__main__":
         print("icon_color_rgb:", repr(e.get("icon_color_rgb")))
 
 
-def fetch_google_holiday_events(calendar_id=None, days=DEFAULT_DAYS, session=None):
+def fetch_google_holiday_events(calendar_id=None, days=DEFAULT_DAYS, session=None, raise_on_error=False):
     """
     Fetch public-holiday (all-day) events from a given Google Calendar ID.
     Returns list of normalized event dicts similar to fetch_google_calendar_events().
@@ -1228,7 +1479,7 @@ def fetch_google_holiday_events(calendar_id=None, days=DEFAULT_DAYS, session=Non
     import requests
     from datetime import datetime, timedelta
 
-    session = session or requests.Session()
+    session = session or get_session()
     cal_id = calendar_id or HOLIDAYS_CALENDAR_ID
     # ensure '#' is URL encoded for use in URL
     encoded_cal_id = cal_id.replace("#", "%23")
@@ -1252,10 +1503,12 @@ def fetch_google_holiday_events(calendar_id=None, days=DEFAULT_DAYS, session=Non
         f"?timeMin={timeMin}&timeMax={timeMax}&singleEvents=true&fields=items(summary,start,end)&orderBy=startTime&key={API_KEY_GOOGLE}"
     )
 
-    holidays = []
+    holidays = EventStore()
     try:
-        r = session.get(url, timeout=10)
+        r = cached_get(url, session=session)
         if r.status_code != 200:
+            if raise_on_error:
+                raise RuntimeError(f"Google Calendar (holidays) HTTP {r.status_code}")
             return []
         data = r.json()
         items = data.get("items", [])
@@ -1269,6 +1522,7 @@ def fetch_google_holiday_events(calendar_id=None, days=DEFAULT_DAYS, session=Non
             summary = (it.get("summary") or "").strip()
             if not summary:
                 continue
+            holiday = {"display_text": summary, "tag_text": "Offentlig Fridag:"}
             start = it.get("start", {})
             end = it.get("end", {})
 
@@ -1291,46 +1545,16 @@ def fetch_google_holiday_events(calendar_id=None, days=DEFAULT_DAYS, session=Non
                             continue
                     except Exception:
                         pass
-                    ev = {
-                        "date": date_str,
-                        "name": summary,
-                        "display_text": summary,
-                        "tag_text": "Offentlig Fridag:",
-                        "tag_color_name": None,
-                        "tag_color_rgb": None,
-                        "time": "",
-                        "icon": None,
-                        "icon_size": None,
-                        "icon_color_name": None,
-                        "icon_color_rgb": None,
-                        "icon_mode": None,
-                        "original_name": summary,
-                    }
-                    if not any(e['date'] == ev['date'] and e['name'] == ev['name'] and e.get('time','') == ev['time'] for e in holidays):
-                        holidays.append(ev)
+                    ev = _event_from_mapped(holiday, date_str, "", summary)
+                    holidays.add(ev)
                 else:
                     # Google calendar all-day events use exclusive end date, so last_day = edt - 1
                     last_day = edt - timedelta(days=1)
                     day = max(sdt, query_start_date)
                     while day <= last_day:
                         date_str = day.strftime("%Y-%m-%d")
-                        ev = {
-                            "date": date_str,
-                            "name": summary,
-                            "display_text": summary,
-                            "tag_text": "Offentlig Fridag:",
-                            "tag_color_name": None,
-                            "tag_color_rgb": None,
-                            "time": "",
-                            "icon": None,
-                            "icon_size": None,
-                            "icon_color_name": None,
-                            "icon_color_rgb": None,
-                            "icon_mode": None,
-                            "original_name": summary,
-                        }
-                        if not any(e['date'] == ev['date'] and e['name'] == ev['name'] and e.get('time','') == ev['time'] for e in holidays):
-                            holidays.append(ev)
+                        ev = _event_from_mapped(holiday, date_str, "", summary)
+                        holidays.add(ev)
                         day += timedelta(days=1)
             elif "dateTime" in start:
                 # Uncommon for a holiday calendar, but handle gracefully:
@@ -1340,25 +1564,11 @@ def fetch_google_holiday_events(calendar_id=None, days=DEFAULT_DAYS, session=Non
                 except Exception:
                     date_str = None
                 if date_str:
-                    ev = {
-                        "date": date_str,
-                        "name": summary,
-                        "display_text": summary,
-                        "tag_text": "Offentlig Fridag:",
-                        "tag_color_name": None,
-                        "tag_color_rgb": None,
-                        "time": "",
-                        "icon": None,
-                        "icon_size": None,
-                        "icon_color_name": None,
-                        "icon_color_rgb": None,
-                        "icon_mode": None,
-                        "original_name": summary,
-                    }
-                    if not any(e['date'] == ev['date'] and e['name'] == ev['name'] and e.get('time','') == ev['time'] for e in holidays):
-                        holidays.append(ev)
-        holidays.sort(key=lambda e: (e['date'], e.get('time', '')))
-        return holidays
+                    ev = _event_from_mapped(holiday, date_str, "", summary)
+                    holidays.add(ev)
+        return holidays.to_list()
     except Exception as ex:
         print("[fetch_google_holiday_events] exception:", ex)
+        if raise_on_error:
+            raise
         return []
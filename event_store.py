@@ -0,0 +1,253 @@
+# event_store.py
+"""
+Samling av events med hash-indeks på (date, name, time).
+
+Erstatter mønsteret
+
+    if not any(e['date'] == ev['date'] and e['name'] == ev['name'] and ... for e in events):
+        events.append(ev)
+
+som er O(n²) over hele hentingen. EventStore.add() er O(1) insert-or-skip
+(første event med en gitt nøkkel vinner, som før), og iterasjon gir eventene
+sortert på (date, time) – stabilt, så innsettingsrekkefølgen beholdes for like
+tidspunkt.
+
+Event er en kompakt post med __slots__ for de ~14 feltene et normalisert event
+har. Farger (RGB-tupler) og korte strengfelt (dato, tid, ikon, fargenavn)
+interneres, så tusenvis av events deler de samme objektene. Event oppfører
+seg som en dict (get, [], in, keys, items, copy, update), så layout_renderer
+og annen kode som forventer dicts fungerer uendret. Ukjente nøkler havner i
+en liten ekstra-dict.
+
+Eksempel:
+    store = EventStore()
+    for ev in fetched:
+        store.add(ev)
+    events = store.to_list()
+"""
+import sys
+
+
+_UNSET = object()
+
+# Fields stored in slots; everything else goes to Event._extra
+EVENT_FIELDS = (
+    "date", "name", "display_text", "time",
+    "tag_text", "tag_color_name", "tag_color_rgb",
+    "icon", "icon_size", "icon_color_name", "icon_color_rgb", "icon_mode",
+    "original_name", "tags",
+)
+_FIELD_SET = frozenset(EVENT_FIELDS)
+_INTERN_STR_FIELDS = frozenset(("date", "time", "tag_text", "tag_color_name", "icon", "icon_color_name", "icon_mode"))
+_INTERN_RGB_FIELDS = frozenset(("tag_color_rgb", "icon_color_rgb"))
+_RGB_INTERN = {}
+
+
+def intern_rgb(value):
+    """Return a shared (r, g, b) tuple for an RGB sequence; other values are returned unchanged."""
+    if value is None or isinstance(value, str):
+        return value
+    try:
+        key = (int(value[0]), int(value[1]), int(value[2]))
+    except Exception:
+        return value
+    return _RGB_INTERN.setdefault(key, key)
+
+
+def _intern_field(name, value):
+    if name in _INTERN_RGB_FIELDS:
+        return intern_rgb(value)
+    if name in _INTERN_STR_FIELDS and type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+class Event:
+    """
+    Compact normalized event with a dict-compatible API.
+
+    Only fields that have been set count as keys, so `"tags" in ev` and
+    ev.get("tags") behave exactly like they did for the old dicts.
+    """
+
+    __slots__ = EVENT_FIELDS + ("_extra",)
+
+    def __init__(self, **fields):
+        self._extra = None
+        for k, v in fields.items():
+            self[k] = v
+
+    @classmethod
+    def from_dict(cls, d):
+        """Build an Event from a mapping (an existing Event is copied)."""
+        ev = cls()
+        for k, v in d.items():
+            ev[k] = v
+        return ev
+
+    def as_dict(self):
+        """Return a plain dict copy (for JSON dumps etc)."""
+        return dict(self.items())
+
+    # --- dict-compatible API ---
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            v = getattr(self, key, _UNSET)
+            if v is not _UNSET:
+                return v
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            object.__setattr__(self, key, _intern_field(key, value))
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _FIELD_SET and getattr(self, key, _UNSET) is not _UNSET:
+            object.__delattr__(self, key)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in _FIELD_SET:
+            return getattr(self, key, _UNSET) is not _UNSET
+        return self._extra is not None and key in self._extra
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        try:
+            v = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return v
+
+    def keys(self):
+        out = [k for k in EVENT_FIELDS if getattr(self, k, _UNSET) is not _UNSET]
+        if self._extra:
+            out.extend(self._extra.keys())
+        return out
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def values(self):
+        return [self[k] for k in self.keys()]
+
+    def update(self, other=(), **kw):
+        if hasattr(other, "keys"):
+            for k in other.keys():
+                self[k] = other[k]
+        else:
+            for k, v in other:
+                self[k] = v
+        for k, v in kw.items():
+            self[k] = v
+
+    def copy(self):
+        return Event.from_dict(self)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (Event, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Event({self.as_dict()!r})"
+
+
+def event_key(ev):
+    """Default dedup key: (date, name, time)."""
+    return (ev.get("date"), ev.get("name"), ev.get("time", ""))
+
+
+def _chrono_key(ev):
+    return (ev.get("date") or "", ev.get("time", "") or "")
+
+
+class EventStore:
+    """Insert-or-skip event collection with stable chronological iteration."""
+
+    __slots__ = ("_events", "_index", "_key", "_sorted")
+
+    def __init__(self, events=None, key=event_key):
+        self._events = []
+        self._index = set()
+        self._key = key
+        self._sorted = True
+        if events:
+            self.extend(events)
+
+    def add(self, ev):
+        """Insert `ev` unless an event with the same key exists. Returns True if inserted."""
+        k = self._key(ev)
+        if k in self._index:
+            return False
+        self._index.add(k)
+        if self._sorted and self._events and _chrono_key(ev) < _chrono_key(self._events[-1]):
+            self._sorted = False
+        self._events.append(ev)
+        return True
+
+    def extend(self, events):
+        """Add every event in `events`; returns the number actually inserted."""
+        added = 0
+        for ev in events:
+            if self.add(ev):
+                added += 1
+        return added
+
+    def __contains__(self, ev):
+        return self._key(ev) in self._index
+
+    def __len__(self):
+        return len(self._events)
+
+    def __bool__(self):
+        return bool(self._events)
+
+    def _ensure_sorted(self):
+        if not self._sorted:
+            # list.sort is stable, so ties keep insertion order
+            self._events.sort(key=_chrono_key)
+            self._sorted = True
+
+    def __iter__(self):
+        self._ensure_sorted()
+        return iter(self._events)
+
+    def to_list(self):
+        """Return a new list of the events in chronological order."""
+        self._ensure_sorted()
+        return list(self._events)
+
+    def __repr__(self):
+        return f"EventStore({len(self._events)} events)"
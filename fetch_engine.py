@@ -0,0 +1,160 @@
+# fetch_engine.py
+"""
+Kjører uavhengige datakilder samtidig i en begrenset tråd-pool.
+
+Hver kilde får sin egen timeout, og hele kjøringen har én global deadline.
+Kilder som ikke blir ferdige i tide (eller som kaster exception) får verdien
+MISSING i resultat-dicten, mens resten av dataene returneres som vanlig.
+
+Leser konfig fra miljøvariabler:
+  - FETCH_MAX_WORKERS        (default 4)
+  - FETCH_DEADLINE_SECONDS   (global deadline, default 40)
+
+Eksempel:
+    results = run_sources({
+        "gcal": (lambda: fetch_google_calendar_events(days=7), 10),
+        "weather": (lambda: fetch_weather_from_provider(days=7), 20),
+    })
+    if results["gcal"] is MISSING: ...
+"""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+FETCH_MAX_WORKERS = int(os.environ.get("FETCH_MAX_WORKERS", "4"))
+FETCH_DEADLINE_SECONDS = float(os.environ.get("FETCH_DEADLINE_SECONDS", "40"))
+
+
+class _Missing:
+    """Sentinel for a source that missed its deadline or failed."""
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __repr__(self):
+        return "MISSING"
+
+    def __bool__(self):
+        return False
+
+
+MISSING = _Missing()
+
+
+def run_sources(sources, max_workers=None, deadline=None, report=None, grace=None, grace_only=None):
+    """
+    Run `sources` concurrently and return {name: value or MISSING}.
+
+    - sources: dict name -> (callable, timeout_seconds) or name -> callable
+      (callable without timeout only gets the global deadline).
+    - max_workers: pool size (default FETCH_MAX_WORKERS).
+    - deadline: global deadline in seconds for the whole run (default FETCH_DEADLINE_SECONDS).
+    - report: optional dict that is filled with per-source status:
+        {name: {"status": "ok"|"timeout"|"error", "elapsed": float, "error": str}}
+    - grace: hedging; once the first source has succeeded, the others get at
+      most `grace` more seconds (None = wait for all as usual). A dict
+      {name: seconds} gives each source its own grace; names not in it are
+      not capped.
+    - grace_only: names a single `grace` applies to (None = all); the other
+      sources keep their own timeout and the global deadline.
+
+    A source's own timeout counts from when a worker actually starts it, so a
+    source waiting for a free worker is only bound by the global deadline.
+    Threads that miss their deadline are left to finish in the background; their
+    results are discarded.
+    """
+    max_workers = max(1, int(max_workers or FETCH_MAX_WORKERS))
+    deadline = FETCH_DEADLINE_SECONDS if deadline is None else float(deadline)
+    report = report if report is not None else {}
+
+    t0 = time.monotonic()
+    global_end = t0 + deadline
+    first_ok = None  # set when the first source succeeds (with grace)
+    if grace is None or isinstance(grace, dict):
+        graces = grace
+    else:
+        graces = {name: float(grace) for name in sources if grace_only is None or name in grace_only}
+
+    def _end_for(name, st):
+        end = global_end
+        if st is not None and timeouts[name] is not None:
+            end = min(end, st + timeouts[name])
+        if first_ok is not None and graces.get(name) is not None:
+            end = min(end, first_ok + float(graces[name]))
+        return end
+    started_at = {}
+    lock = threading.Lock()
+
+    def _wrap(name, fn):
+        def _run():
+            with lock:
+                started_at[name] = time.monotonic()
+            return fn()
+        return _run
+
+    results = {}
+    pending = {}
+    timeouts = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+    try:
+        for name, spec in sources.items():
+            if isinstance(spec, (tuple, list)):
+                fn, timeout = spec[0], (spec[1] if len(spec) > 1 else None)
+            else:
+                fn, timeout = spec, None
+            timeouts[name] = float(timeout) if timeout is not None else None
+            fut = executor.submit(_wrap(name, fn))
+            pending[fut] = name
+
+        while pending:
+            now = time.monotonic()
+            # expire sources that passed their own (or the global) deadline
+            for fut, name in list(pending.items()):
+                with lock:
+                    st = started_at.get(name)
+                end = _end_for(name, st)
+                if now >= end and not fut.done():
+                    fut.cancel()
+                    results[name] = MISSING
+                    report[name] = {"status": "timeout", "elapsed": round(now - (st or t0), 3)}
+                    print(f"[fetch_engine] {name} missed its deadline")
+                    del pending[fut]
+            if not pending:
+                break
+
+            # sleep until the nearest deadline or until something finishes
+            nearest = global_end
+            with lock:
+                for name in pending.values():
+                    nearest = min(nearest, _end_for(name, started_at.get(name)))
+            # re-check at least every 0.25 s so newly started sources get their own timeout
+            wait_for = max(0.0, min(nearest - time.monotonic(), 0.25))
+            done, _ = wait(list(pending.keys()), timeout=wait_for, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = pending.pop(fut)
+                with lock:
+                    st = started_at.get(name, t0)
+                elapsed = round(time.monotonic() - st, 3)
+                try:
+                    results[name] = fut.result()
+                    report[name] = {"status": "ok", "elapsed": elapsed}
+                    if graces is not None and first_ok is None:
+                        first_ok = time.monotonic()
+                except Exception as ex:
+                    results[name] = MISSING
+                    report[name] = {"status": "error", "elapsed": elapsed, "error": str(ex)}
+                    print(f"[fetch_engine] {name} failed:", ex)
+    finally:
+        # never block on stragglers; they finish (and are discarded) in the background
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
+
+def missing_sources(results):
+    """Return sorted list of source names whose slot is MISSING."""
+    return sorted(name for name, value in results.items() if value is MISSING)
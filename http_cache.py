@@ -0,0 +1,380 @@
+# http_cache.py
+"""
+Persistent HTTP cache with conditional requests (Expires / ETag / Last-Modified).
+
+Lagrer respons-body og validatorer på disk. Så lenge `Expires` (eller
+`Cache-Control: max-age`) ligger frem i tid svares det direkte fra disk uten
+nettverk. Ellers sendes `If-None-Match` / `If-Modified-Since`, og et 304-svar
+gjenbruker body fra disk. Med cached_get_parsed() lagres også det parsede
+resultatet, slik at et 304 hopper over både nedlasting og re-parsing.
+
+Leser konfig fra miljøvariabler:
+  - HTTP_CACHE_DIR   (default: .http_cache ved siden av denne filen)
+  - HTTP_CACHE=0     (slå av cachen helt; alle kall går rett til nettverket)
+
+Cachen omgås automatisk mens HTTP-fixtures (http_fixtures.py) tar opp eller
+spiller av, slik at alle kall havner i / hentes fra fixture-arkivet.
+
+Kjør som skript for en selvtest mot en lokal stand-in HTTP-server:
+  python http_cache.py
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from email.utils import parsedate_to_datetime
+
+try:
+    import requests
+except Exception:
+    requests = None
+
+import http_fixtures
+try:
+    import http_client
+except Exception:
+    http_client = None
+
+HTTP_CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".http_cache"))
+HTTP_CACHE_ENABLED = os.environ.get("HTTP_CACHE", "1") != "0"
+
+# request headers that never change the response body and should not split the cache key
+_KEY_IGNORED_HEADERS = {"user-agent", "if-none-match", "if-modified-since"}
+
+_write_lock = threading.Lock()
+
+
+def _cache_enabled():
+    # record/replay must see every request, so fixtures bypass the disk cache
+    return HTTP_CACHE_ENABLED and not http_fixtures.active()
+
+
+class CachedResponse:
+    """
+    Minimal response object compatible with the parts of requests.Response we use.
+
+    - from_cache: True when served from disk without any network traffic
+    - revalidated: True when the server answered 304 and the body came from disk
+    """
+
+    def __init__(self, status_code, content, headers=None, url=None, from_cache=False, revalidated=False):
+        self.status_code = int(status_code)
+        self.content = content or b""
+        self.headers = dict(headers or {})
+        self.url = url
+        self.from_cache = from_cache
+        self.revalidated = revalidated
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 400
+
+    @property
+    def text(self):
+        ctype = ""
+        for k, v in self.headers.items():
+            if k.lower() == "content-type":
+                ctype = v or ""
+        encoding = "utf-8"
+        if "charset=" in ctype:
+            encoding = ctype.split("charset=", 1)[1].split(";")[0].strip() or "utf-8"
+        try:
+            return self.content.decode(encoding, errors="replace")
+        except LookupError:
+            return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            if requests is not None:
+                raise requests.HTTPError(f"HTTP {self.status_code} for url: {self.url}")
+            raise RuntimeError(f"HTTP {self.status_code} for url: {self.url}")
+
+
+# --- key / paths -----------------------------------------------------
+def cache_key(url, params=None, headers=None):
+    """Stable key from url + sorted params + body-relevant request headers."""
+    parts = [str(url)]
+    for k, v in sorted((params or {}).items(), key=lambda kv: str(kv[0])):
+        parts.append(f"p:{k}={v}")
+    for k, v in sorted((headers or {}).items(), key=lambda kv: str(kv[0]).lower()):
+        if str(k).lower() in _KEY_IGNORED_HEADERS:
+            continue
+        parts.append(f"h:{str(k).lower()}={v}")
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def _paths(key):
+    base = os.path.join(HTTP_CACHE_DIR, key)
+    return base + ".meta.json", base + ".body", base + ".parsed.json"
+
+
+def _write_atomic(path, data, mode="wb"):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, mode) as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _load_entry(key):
+    meta_path, body_path, _ = _paths(key)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            body = f.read()
+        return meta, body
+    except Exception:
+        return None, None
+
+
+# --- freshness helpers -------------------------------------------------
+def _header(headers, name):
+    for k, v in (headers or {}).items():
+        if str(k).lower() == name:
+            return v
+    return None
+
+
+def _parse_http_date(value):
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except Exception:
+        return None
+
+
+def _expires_at(headers, now=None):
+    """
+    Return epoch seconds until which the response is fresh (0 = must revalidate),
+    or None if the response must not be stored (no-store).
+    """
+    now = time.time() if now is None else now
+    cc = (_header(headers, "cache-control") or "").lower()
+    directives = [d.strip() for d in cc.split(",") if d.strip()]
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+    for d in directives:
+        if d.startswith("max-age="):
+            try:
+                max_age = int(d.split("=", 1)[1])
+            except Exception:
+                continue
+            date = _parse_http_date(_header(headers, "date")) or now
+            return date + max_age
+    exp = _parse_http_date(_header(headers, "expires"))
+    if exp is not None:
+        return exp
+    return 0
+
+
+def _store(key, url, resp_headers, body, expires_at):
+    meta_path, body_path, _ = _paths(key)
+    meta = {
+        "url": url,
+        "stored_at": time.time(),
+        "expires_at": expires_at,
+        "etag": _header(resp_headers, "etag"),
+        "last_modified": _header(resp_headers, "last-modified"),
+        "content_type": _header(resp_headers, "content-type"),
+        "body_sha256": hashlib.sha256(body).hexdigest(),
+    }
+    try:
+        with _write_lock:
+            os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+            _write_atomic(body_path, body)
+            _write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+    except Exception as ex:
+        print("[http_cache] failed to store entry:", ex)
+    return meta
+
+
+def _touch_meta(key, meta, resp_headers):
+    """Refresh expiry (and validators if changed) after a 304."""
+    meta_path, _, _ = _paths(key)
+    exp = _expires_at(resp_headers)
+    meta["expires_at"] = exp if exp is not None else 0
+    meta["stored_at"] = time.time()
+    meta["etag"] = _header(resp_headers, "etag") or meta.get("etag")
+    meta["last_modified"] = _header(resp_headers, "last-modified") or meta.get("last_modified")
+    try:
+        with _write_lock:
+            _write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+    except Exception as ex:
+        print("[http_cache] failed to update entry:", ex)
+    return meta
+
+
+def _cached_response(meta, body, url, from_cache=False, revalidated=False):
+    headers = {}
+    if meta.get("content_type"):
+        headers["Content-Type"] = meta["content_type"]
+    if meta.get("etag"):
+        headers["ETag"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["Last-Modified"] = meta["last_modified"]
+    return CachedResponse(200, body, headers=headers, url=url, from_cache=from_cache, revalidated=revalidated)
+
+
+# --- public API --------------------------------------------------------
+def cached_get(url, params=None, headers=None, timeout=None, session=None, **kwargs):
+    """
+    GET `url` through the on-disk cache. Returns a CachedResponse.
+
+    Only 200 responses are stored. Other statuses are passed through as-is
+    (wrapped in CachedResponse) so callers can keep their own status handling.
+    Without `session` the shared http_client session is used; timeout=None
+    means the configured timeout for the host (http_client.timeout_for).
+    """
+    if session is None and http_client is not None:
+        session = http_client.get_session()
+    getter = session.get if session is not None else (requests.get if requests is not None else None)
+    if getter is None:
+        raise RuntimeError("Python package 'requests' is not installed. Run: pip install requests")
+    if timeout is None:
+        timeout = http_client.timeout_for(url) if http_client is not None else 10
+
+    if not _cache_enabled():
+        r = getter(url, params=params, headers=headers, timeout=timeout, **kwargs)
+        return CachedResponse(r.status_code, r.content, headers=r.headers, url=getattr(r, "url", url))
+
+    key = cache_key(url, params, headers)
+    meta, body = _load_entry(key)
+    now = time.time()
+    if meta is not None and body is not None and (meta.get("expires_at") or 0) > now:
+        return _cached_response(meta, body, url, from_cache=True)
+
+    req_headers = dict(headers or {})
+    if meta is not None and body is not None:
+        if meta.get("etag"):
+            req_headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            req_headers["If-Modified-Since"] = meta["last_modified"]
+
+    r = getter(url, params=params, headers=req_headers, timeout=timeout, **kwargs)
+    if r.status_code == 304 and meta is not None and body is not None:
+        meta = _touch_meta(key, meta, r.headers)
+        return _cached_response(meta, body, url, revalidated=True)
+
+    content = r.content
+    if r.status_code == 200:
+        exp = _expires_at(r.headers, now=now)
+        has_validator = bool(_header(r.headers, "etag") or _header(r.headers, "last-modified"))
+        if exp is not None and (exp > now or has_validator):
+            _store(key, url, r.headers, content, exp)
+    return CachedResponse(r.status_code, content, headers=r.headers, url=getattr(r, "url", url))
+
+
+def cached_get_parsed(url, parse, parser_id, params=None, headers=None, timeout=None, session=None, **kwargs):
+    """
+    Like cached_get, but also caches `parse(response)` on disk.
+
+    Returns (parsed_value, response). `parse` is only called for 200 responses
+    whose body changed (or whose stored parse is missing / from another
+    parser_id); for non-200 responses parsed_value is None. The parsed value
+    must be JSON-serializable to be stored (tuples come back as lists).
+    """
+    r = cached_get(url, params=params, headers=headers, timeout=timeout, session=session, **kwargs)
+    if r.status_code != 200:
+        return None, r
+
+    body_sha = hashlib.sha256(r.content).hexdigest()
+    key = cache_key(url, params, headers)
+    _, _, parsed_path = _paths(key)
+    if _cache_enabled() and (r.from_cache or r.revalidated):
+        try:
+            with open(parsed_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get("parser_id") == parser_id and stored.get("body_sha256") == body_sha:
+                return stored.get("value"), r
+        except Exception:
+            pass
+
+    value = parse(r)
+    if _cache_enabled() and os.path.exists(_paths(key)[0]):
+        try:
+            payload = json.dumps({"parser_id": parser_id, "body_sha256": body_sha, "value": value}, ensure_ascii=False)
+            with _write_lock:
+                _write_atomic(parsed_path, payload.encode("utf-8"))
+        except Exception as ex:
+            print("[http_cache] failed to store parsed value:", ex)
+    return value, r
+
+
+def clear_cache():
+    """Remove all cached entries."""
+    if not os.path.isdir(HTTP_CACHE_DIR):
+        return
+    for fn in os.listdir(HTTP_CACHE_DIR):
+        try:
+            os.remove(os.path.join(HTTP_CACHE_DIR, fn))
+        except Exception:
+            pass
+
+
+# ---------------- selftest mot lokal stand-in server ------------------------
+if __name__ == "__main__":
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from email.utils import formatdate
+
+    hits = {"full": 0, "not_modified": 0}
+    parses = {"n": 0}
+
+    class _StandIn(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            etag = '"v1"'
+            if self.path.startswith("/fresh"):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Expires", formatdate(time.time() + 60, usegmt=True))
+                self.end_headers()
+                self.wfile.write(b'{"fresh": true}')
+                hits["full"] += 1
+                return
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                hits["not_modified"] += 1
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(b'{"payload": [1, 2, 3]}')
+            hits["full"] += 1
+
+    server = HTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    HTTP_CACHE_DIR = tempfile.mkdtemp(prefix="http_cache_selftest_")
+
+    def _parse(resp):
+        parses["n"] += 1
+        return resp.json()
+
+    v1, r1 = cached_get_parsed(base + "/etag", _parse, "selftest-v1")
+    v2, r2 = cached_get_parsed(base + "/etag", _parse, "selftest-v1")
+    assert v1 == v2 == {"payload": [1, 2, 3]}, (v1, v2)
+    assert r2.revalidated and parses["n"] == 1, (r2.revalidated, parses)
+    assert hits == {"full": 1, "not_modified": 1}, hits
+
+    f1 = cached_get(base + "/fresh")
+    f2 = cached_get(base + "/fresh")
+    assert f1.json() == f2.json() == {"fresh": True}
+    assert f2.from_cache and hits["full"] == 2, (f2.from_cache, hits)
+
+    server.shutdown()
+    clear_cache()
+    print("[http_cache] selftest OK:", hits, "parses:", parses["n"])
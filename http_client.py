@@ -0,0 +1,164 @@
+# http_client.py
+"""
+Felles HTTP-klient for hele prosessen.
+
+Én requests.Session deles av alle moduler (data_provider, weather_provider,
+mappings, render_traffic_map via http_cache), slik at TCP/TLS-forbindelser
+gjenbrukes (keep-alive) i stedet for et nytt håndtrykk per kall. Sesjonen har
+connection-pool per host, begrensede retries med jittered exponential backoff
+på 429/5xx (Retry-After respekteres, men kappes), en circuit breaker per host
+(circuit_breaker.py), og timeouts konfigureres ett sted.
+
+Leser konfig fra miljøvariabler:
+  - HTTP_TIMEOUT            (default timeout i sekunder, 10)
+  - HTTP_TIMEOUT_<NAVN>     (per host, f.eks. HTTP_TIMEOUT_MET=20; navn fra HOST_NAMES,
+                             ellers hostnavnet i store bokstaver med _ for . og -)
+  - HTTP_RETRIES            (maks antall retries, default 3)
+  - HTTP_BACKOFF_FACTOR     (default 0.5 -> 0.5s, 1s, 2s ...)
+  - HTTP_BACKOFF_JITTER     (tilfeldig tillegg 0..N sekunder, default 0.3)
+  - HTTP_MAX_RETRY_AFTER    (lengste Retry-After vi sover på før retry, sekunder, default 30)
+  - HTTP_POOL_CONNECTIONS   (antall host-pools, default 10)
+  - HTTP_POOL_MAXSIZE       (forbindelser per host, default 4)
+
+Eksempel:
+    from http_client import get_session, timeout_for
+    s = get_session()
+    r = s.get(url, timeout=timeout_for(url))
+"""
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from urllib3.util.retry import Retry
+
+from circuit_breaker import CircuitBreakerAdapter
+
+DEFAULT_USER_AGENT = os.environ.get("HTTP_USER_AGENT", "InkyFrameCalendar/1.0")
+
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "10"))
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.environ.get("HTTP_BACKOFF_FACTOR", "0.5"))
+HTTP_BACKOFF_JITTER = float(os.environ.get("HTTP_BACKOFF_JITTER", "0.3"))
+HTTP_MAX_RETRY_AFTER = float(os.environ.get("HTTP_MAX_RETRY_AFTER", "30"))
+HTTP_POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "4"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# short names for the hosts we talk to (used for HTTP_TIMEOUT_<NAME>)
+HOST_NAMES = {
+    "api.met.no": "MET",
+    "api.open-meteo.com": "OPEN_METEO",
+    "www.googleapis.com": "GOOGLE",
+    "maps.googleapis.com": "GOOGLE_MAPS",
+    "docs.google.com": "SHEETS",
+    "mdt-proxy.movar.no": "MOVAR",
+}
+
+# default per-host timeouts (seconds); env HTTP_TIMEOUT_<NAME> wins
+DEFAULT_TIMEOUTS = {
+    "MET": 20.0,
+    "OPEN_METEO": 15.0,
+    "SHEETS": 15.0,
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def host_name(url):
+    """Return the short config name for the host of `url` (MET, GOOGLE, ...)."""
+    host = (urlsplit(url).hostname or "").lower()
+    if host in HOST_NAMES:
+        return HOST_NAMES[host]
+    return re.sub(r"[^A-Z0-9]+", "_", host.upper()).strip("_") or "DEFAULT"
+
+
+def timeout_for(url):
+    """Timeout (seconds) for a request to `url`: HTTP_TIMEOUT_<NAME>, built-in default, or HTTP_TIMEOUT."""
+    name = host_name(url)
+    env = os.environ.get(f"HTTP_TIMEOUT_{name}")
+    if env:
+        try:
+            return float(env)
+        except ValueError:
+            pass
+    return DEFAULT_TIMEOUTS.get(name, HTTP_TIMEOUT)
+
+
+class CappedRetry(Retry):
+    """
+    Retry that honours Retry-After but never sleeps longer than max_retry_after
+    seconds, so a server sending "Retry-After: 3600" cannot stall the render.
+    """
+    max_retry_after = HTTP_MAX_RETRY_AFTER
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.max_retry_after)
+
+
+def make_retry():
+    """Retry policy: bounded, jittered exponential backoff on 429/5xx for idempotent methods."""
+    kwargs = dict(
+        total=HTTP_RETRIES,
+        connect=1,  # one quick retry for a dropped connection; DNS/offline fails fast
+        read=1,
+        status=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,  # hand the last 429/5xx response back to the caller
+    )
+    try:
+        return CappedRetry(backoff_jitter=HTTP_BACKOFF_JITTER, **kwargs)
+    except TypeError:
+        # urllib3 < 2 has no backoff_jitter
+        return CappedRetry(**kwargs)
+
+
+def make_adapter():
+    return CircuitBreakerAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=make_retry())
+
+
+def new_session():
+    """Create a configured Session (pooled adapters, retries, default User-Agent)."""
+    s = requests.Session()
+    adapter = make_adapter()
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers["User-Agent"] = DEFAULT_USER_AGENT
+    return s
+
+
+def get_session():
+    """Return the process-wide shared Session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = new_session()
+    return _session
+
+
+def get(url, params=None, headers=None, timeout=None, session=None, **kwargs):
+    """GET through the shared session with the configured timeout for the host."""
+    s = session or get_session()
+    return s.get(url, params=params, headers=headers,
+                 timeout=timeout if timeout is not None else timeout_for(url), **kwargs)
+
+
+def close_session():
+    """Close the shared session (e.g. at process exit); a new one is created on next use."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            try:
+                _session.close()
+            except Exception:
+                pass
+            _session = None
@@ -0,0 +1,266 @@
+# http_fixtures.py
+"""
+Record/replay av alle HTTP-kall (requests) til/fra et fixture-arkiv.
+
+Med HTTP_FIXTURES_MODE=record samles hver request/respons (status, headere,
+body og tidsbruk) i minnet og skrives til arkivet én gang ved uninstall(),
+flush() eller prosessslutt (atexit). Med HTTP_FIXTURES_MODE=replay svares alle kall fra
+arkivet uten nettverk; et kall som ikke finnes i arkivet feiler som om nettet
+var nede. Klokken fryses samtidig til tidspunktet opptaket startet
+(se fixture_now()), slik at datoavhengige URL-er og "i dag" blir like – en
+kjøring kan dermed gjenskapes byte for byte på en maskin uten nett.
+
+Hooken sitter på requests.adapters.HTTPAdapter.send, så både requests.get()
+og Session.get() (data_provider, weather_provider, mappings,
+render_traffic_map) fanges opp. HTTP-cachen og de lokale synk-/cache-filene
+i data_provider omgås mens fixtures er aktive, slik at opptak og avspilling
+ser de samme kallene.
+
+Leser konfig fra miljøvariabler:
+  - HTTP_FIXTURES_MODE            ("record" | "replay", tom = av)
+  - HTTP_FIXTURES_PATH            (default: http_fixtures.json ved siden av denne filen)
+  - HTTP_FIXTURES_SIMULATE_TIMING (1 = vent like lenge som det opprinnelige kallet tok i replay)
+
+Eksempel:
+  HTTP_FIXTURES_MODE=record python main.py
+  HTTP_FIXTURES_MODE=replay HTTP_FIXTURES_SIMULATE_TIMING=1 python main.py
+"""
+import os
+import json
+import atexit
+import time
+import base64
+import threading
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from requests.models import Response
+    from requests.structures import CaseInsensitiveDict
+except Exception:
+    requests = None
+
+HTTP_FIXTURES_MODE = os.environ.get("HTTP_FIXTURES_MODE", "").strip().lower()
+HTTP_FIXTURES_PATH = os.environ.get("HTTP_FIXTURES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "http_fixtures.json"))
+HTTP_FIXTURES_SIMULATE_TIMING = os.environ.get("HTTP_FIXTURES_SIMULATE_TIMING", "0") == "1"
+
+# credentials never take part in matching (and are scrubbed from the archive)
+_SECRET_PARAMS = {"key", "apitoken", "api_key", "token"}
+_SECRET_HEADERS = {"apitoken", "authorization"}
+# date window parameters; used for a relaxed second-chance match
+_VOLATILE_PARAMS = {"timeMin", "timeMax"}
+
+_lock = threading.Lock()
+_state = {
+    "mode": None,          # "record" | "replay" | None
+    "path": None,
+    "simulate_timing": False,
+    "archive": None,       # {"recorded_at": iso, "exchanges": [...]}
+    "cursor": {},          # match key -> next index into its exchange list
+    "index": {},           # match key -> [exchange, ...]
+    "relaxed_index": {},
+    "original_send": None,
+    "dirty": False,        # recorded exchanges not yet written to the archive file
+    "atexit": False,
+}
+
+
+def _split_query(url, drop=()):
+    parts = urlsplit(url)
+    q = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in drop]
+    return parts, sorted(q)
+
+
+def _scrub_url(url):
+    parts, q = _split_query(url, drop=_SECRET_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(q), ""))
+
+
+def _match_key(method, url, relaxed=False):
+    drop = _SECRET_PARAMS | (_VOLATILE_PARAMS if relaxed else set())
+    parts, q = _split_query(url, drop=drop)
+    return f"{(method or 'GET').upper()} {parts.netloc}{parts.path}?{urlencode(q)}"
+
+
+def _index_archive(archive):
+    index, relaxed = {}, {}
+    for ex in archive.get("exchanges", []):
+        index.setdefault(_match_key(ex["method"], ex["url"]), []).append(ex)
+        relaxed.setdefault(_match_key(ex["method"], ex["url"], relaxed=True), []).append(ex)
+    return index, relaxed
+
+
+def _load_archive(path):
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except Exception:
+        return None
+
+
+def _save_archive():
+    path = _state["path"]
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(_state["archive"], fh, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+    _state["dirty"] = False
+
+
+def flush():
+    """Write recorded exchanges to the archive file (no-op unless recording with unsaved exchanges)."""
+    with _lock:
+        if _state["mode"] == "record" and _state["dirty"]:
+            try:
+                _save_archive()
+            except Exception as e:
+                print("[http_fixtures] failed to write archive:", e)
+
+
+def _next_exchange(method, url):
+    """Pick the next recorded exchange for this request (repeats the last one when exhausted)."""
+    for index, relaxed in ((_state["index"], False), (_state["relaxed_index"], True)):
+        key = _match_key(method, url, relaxed=relaxed)
+        lst = index.get(key)
+        if lst:
+            ckey = (relaxed, key)
+            i = _state["cursor"].get(ckey, 0)
+            _state["cursor"][ckey] = i + 1
+            return lst[min(i, len(lst) - 1)]
+    return None
+
+
+def _build_response(ex, request, adapter):
+    r = Response()
+    r.status_code = int(ex["status"])
+    r.reason = ex.get("reason") or ""
+    r.headers = CaseInsensitiveDict(ex.get("headers") or {})
+    r._content = base64.b64decode(ex.get("body_b64") or "")
+    r._content_consumed = True
+    r.url = request.url
+    r.request = request
+    r.connection = adapter
+    r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+    r.elapsed = timedelta(seconds=float(ex.get("elapsed") or 0.0))
+    return r
+
+
+def _patched_send(adapter, request, *args, **kwargs):
+    mode = _state["mode"]
+    if mode == "replay":
+        with _lock:
+            ex = _next_exchange(request.method, request.url)
+        if ex is None:
+            raise requests.exceptions.ConnectionError(f"[http_fixtures] no fixture for {request.method} {_scrub_url(request.url)}")
+        if _state["simulate_timing"] and ex.get("elapsed"):
+            time.sleep(float(ex["elapsed"]))
+        return _build_response(ex, request, adapter)
+
+    t0 = time.monotonic()
+    resp = _state["original_send"](adapter, request, *args, **kwargs)
+    if mode == "record":
+        try:
+            body = resp.content  # reads the body; it stays available on resp
+            ex = {
+                "method": (request.method or "GET").upper(),
+                "url": _scrub_url(request.url),
+                "status": resp.status_code,
+                "reason": resp.reason,
+                "headers": {k: v for k, v in resp.headers.items() if k.lower() not in _SECRET_HEADERS},
+                "body_b64": base64.b64encode(body or b"").decode("ascii"),
+                "elapsed": round(time.monotonic() - t0, 4),
+            }
+            with _lock:
+                _state["archive"]["exchanges"].append(ex)
+                _state["dirty"] = True
+        except Exception as e:
+            print("[http_fixtures] failed to record exchange:", e)
+    return resp
+
+
+def install(mode, path=None, simulate_timing=None):
+    """
+    Activate fixtures. mode: "record" or "replay" (anything else uninstalls).
+    Recording starts a new archive; replay loads an existing one.
+    """
+    if requests is None:
+        print("[http_fixtures] requests not available; fixtures disabled")
+        return False
+    mode = (mode or "").strip().lower()
+    if mode not in ("record", "replay"):
+        uninstall()
+        return False
+    path = path or HTTP_FIXTURES_PATH
+    flush()  # a running recording is written before it is replaced
+    with _lock:
+        if mode == "replay":
+            archive = _load_archive(path)
+            if archive is None:
+                raise RuntimeError(f"[http_fixtures] cannot read fixture archive {path}")
+        else:
+            archive = {"recorded_at": datetime.now(timezone.utc).isoformat(), "exchanges": []}
+        _state.update({
+            "mode": mode,
+            "path": path,
+            "simulate_timing": HTTP_FIXTURES_SIMULATE_TIMING if simulate_timing is None else bool(simulate_timing),
+            "archive": archive,
+            "cursor": {},
+        })
+        _state["index"], _state["relaxed_index"] = _index_archive(archive)
+        if _state["original_send"] is None:
+            _state["original_send"] = HTTPAdapter.send
+            HTTPAdapter.send = _patched_send
+        if mode == "record":
+            _save_archive()
+            if not _state["atexit"]:
+                atexit.register(flush)
+                _state["atexit"] = True
+    print(f"[http_fixtures] {mode} mode, archive: {path} ({len(archive.get('exchanges', []))} exchanges)")
+    return True
+
+
+def uninstall():
+    """Write a pending recording and restore the original HTTPAdapter.send."""
+    flush()
+    with _lock:
+        if _state["original_send"] is not None:
+            HTTPAdapter.send = _state["original_send"]
+            _state["original_send"] = None
+        _state["mode"] = None
+
+
+def install_from_env():
+    """Install according to HTTP_FIXTURES_MODE (no-op when unset or already installed)."""
+    if HTTP_FIXTURES_MODE and _state["mode"] is None:
+        return install(HTTP_FIXTURES_MODE)
+    return _state["mode"] is not None
+
+
+def active():
+    """True while record or replay mode is installed."""
+    return _state["mode"] is not None
+
+
+def mode():
+    return _state["mode"]
+
+
+def fixture_now(tz=None):
+    """
+    The frozen "now" while fixtures are active (the archive's recorded_at),
+    converted to `tz` (naive local time if tz is None). Returns None otherwise.
+    """
+    if _state["mode"] is None or not _state["archive"]:
+        return None
+    try:
+        dt = datetime.fromisoformat(_state["archive"]["recorded_at"])
+    except Exception:
+        return None
+    if tz is not None:
+        return dt.astimezone(tz)
+    return dt.astimezone().replace(tzinfo=None)
+
+
+install_from_env()
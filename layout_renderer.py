@@ -28,15 +28,20 @@ Renderer for Inky Frame Calendar Project.
 - Optionally tints event icons per-event using event['color'] when opts["tint_event_icons"]=True.
 - Reserves fixed icon slot so times align.
 - Robust ellipsize/text metrics, dotted separators, auto-sized boxes.
+- Text measurements are cached per (font, text) for the whole process (env TEXT_MEASURE_CACHE_SIZE).
 - Supports multi-line event titles (configurable max_event_lines; default 2).
 - Per-tag color support (expects event['tags'] = [{"text","color_rgb"/"color_name"},...]).
 """
-from PIL import Image, ImageDraw, ImageFont, ImageOps, ImageColor
+from PIL import Image, ImageDraw, ImageFont, ImageOps
 import os
 import re
+import threading
+from collections import OrderedDict
 from typing import List, Tuple, Union, Dict
 from datetime import datetime
-from mappings import mapping_info_for_event, color_to_rgb
+from mappings import mapping_info_for_event, color_to_rgb, lookup_tag
+from color_registry import resolve_color, to_rgb
+from event_store import Event
 ASSETS_DIR = os.path.join(os.path.dirname(__file__), "assets")
 FONTS_DIR = os.path.join(ASSETS_DIR, "fonts")
 ICONS_DIR = os.path.join(ASSETS_DIR, "icons")
@@ -44,6 +49,9 @@ ICONS_DIR = os.path.join(ASSETS_DIR, "icons")
 DEFAULT_FONT = os.path.join(FONTS_DIR, "NotoSans-Bold.ttf")
 DEFAULT_BOLD_FONT = os.path.join(FONTS_DIR, "NotoSans-Bold.ttf")
 
+# max distinct (font, text) measurements kept across frames (0 = no cache)
+TEXT_MEASURE_CACHE_SIZE = int(os.environ.get("TEXT_MEASURE_CACHE_SIZE", "8192"))
+
 ICON_NAME_MAP = {
     "clearsky_day": "sun",
     "clearsky_night": "moon",
@@ -172,19 +180,40 @@ def choose_representative_for_period(hourly_entries: list):
     return {"icon_key": best["icon_key"], "label": label, "temp": best["temp"], "source_hour": best["hour"]}
 
 
+def _period_rep_from_summary(summary: dict):
+    """Representative in choose_representative_for_period's shape from a precomputed period summary."""
+    if not summary:
+        return {"icon_key": "cloud", "label": "", "temp": None, "source_hour": None}
+    temp = summary.get("temp")
+    label = ""
+    if temp is not None:
+        try:
+            label = f"{int(round(float(temp)))}°"
+        except Exception:
+            label = ""
+    return {"icon_key": _symbol_code_to_icon_key(summary.get("symbol_code")) or "cloud",
+            "label": label, "temp": temp, "source_hour": summary.get("time")}
+
+
 def draw_period_weather_row(image: Image.Image, x: int, y: int, width: int, hourly_list: list,
-                            icon_manager=None, icon_size=20, gap=8, font_small=None):
-    """Draw four period icons (Morn/Noon/Day/Eve) within (x,y,width). Returns bottom y used."""
+                            icon_manager=None, icon_size=20, gap=8, font_small=None, periods: dict = None):
+    """
+    Draw four period icons (Morn/Noon/Day/Eve) within (x,y,width). Returns bottom y used.
+    With `periods` (weather entry "periods" from weather_provider) the precomputed
+    summaries are used and hourly_list is not split again.
+    """
     draw = ImageDraw.Draw(image)
-    per = split_hours_to_periods(hourly_list)
+    per = None if periods is not None else split_hours_to_periods(hourly_list)
     order = [("morning", "Morn"), ("lunch", "Noon"), ("day", "Day"), ("evening", "Eve")]
     total = len(order)
     slot_w = (width - (total - 1) * gap) // total
     for i, (key, label_text) in enumerate(order):
         slot_x0 = x + i * (slot_w + gap)
         slot_cx = slot_x0 + slot_w // 2
-        entries = per.get(key, [])
-        rep = choose_representative_for_period(entries)
+        if per is None:
+            rep = _period_rep_from_summary(periods.get(key))
+        else:
+            rep = choose_representative_for_period(per.get(key, []))
         icon_key = rep.get("icon_key", "cloud")
         temp_label = rep.get("label", "")
         # attempt to load icon
@@ -268,10 +297,76 @@ def _measure_box_height_for_date(events: list,
 
     return max(min_box_height, total)
 
+# ---------------- Text measurement cache ------------------------------------
+# draw.textbbox((0, 0), ...) results keyed by (font path, size, index, layout
+# engine, draw.fontmode, text). The cache is module-level, so a long-running
+# process measures each string once across frames; _measure_row_height and
+# render_events_section share entries, and _ellipsize/_wrap_text_to_lines
+# prefixes are measured once. Fonts without a file path (bitmap fallback,
+# fonts loaded from bytes) are measured directly.
+_TEXT_BBOX_CACHE = OrderedDict()
+_TEXT_BBOX_LOCK = threading.Lock()
+_TEXT_BBOX_STATS = {"hits": 0, "misses": 0}
+
+
+def _font_key(font):
+    path = getattr(font, "path", None)
+    if not isinstance(path, (str, bytes, os.PathLike)):
+        return None
+    return (os.fspath(path), getattr(font, "size", None), getattr(font, "index", 0),
+            getattr(font, "layout_engine", None))
+
+
+def _text_bbox(draw, text, font):
+    """draw.textbbox((0, 0), text, font=font), memoized per font and text. Raises like textbbox."""
+    fk = _font_key(font) if TEXT_MEASURE_CACHE_SIZE > 0 else None
+    if fk is None:
+        return draw.textbbox((0, 0), text, font=font)
+    key = (fk, getattr(draw, "fontmode", None), text)
+    with _TEXT_BBOX_LOCK:
+        bbox = _TEXT_BBOX_CACHE.get(key)
+        if bbox is not None:
+            _TEXT_BBOX_CACHE.move_to_end(key)
+            _TEXT_BBOX_STATS["hits"] += 1
+            return bbox
+        _TEXT_BBOX_STATS["misses"] += 1
+    bbox = tuple(draw.textbbox((0, 0), text, font=font))
+    with _TEXT_BBOX_LOCK:
+        _TEXT_BBOX_CACHE[key] = bbox
+        while len(_TEXT_BBOX_CACHE) > TEXT_MEASURE_CACHE_SIZE:
+            _TEXT_BBOX_CACHE.popitem(last=False)
+    return bbox
+
+
+def text_metrics(draw, text, font) -> Tuple[int, int, int]:
+    """(width, height, baseline offset) of `text` in `font`; the offset is bbox top at origin (0, 0)."""
+    bbox = _text_bbox(draw, text, font)
+    return (bbox[2] - bbox[0], bbox[3] - bbox[1], bbox[1])
+
+
+def text_measure_cache_info() -> Dict[str, float]:
+    """Measurement cache stats: hits, misses, size, maxsize, hit_ratio."""
+    with _TEXT_BBOX_LOCK:
+        hits, misses = _TEXT_BBOX_STATS["hits"], _TEXT_BBOX_STATS["misses"]
+        return {
+            "hits": hits,
+            "misses": misses,
+            "size": len(_TEXT_BBOX_CACHE),
+            "maxsize": TEXT_MEASURE_CACHE_SIZE,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
+
+
+def clear_text_measure_cache():
+    """Drop all cached measurements (stats are kept)."""
+    with _TEXT_BBOX_LOCK:
+        _TEXT_BBOX_CACHE.clear()
+
+
 def _measure_text(draw, text, font):
     """Return (width, height) for text using textbbox, with sensible fallbacks."""
     try:
-        bbox = draw.textbbox((0, 0), text, font=font)
+        bbox = _text_bbox(draw, text, font)
         return (bbox[2] - bbox[0], bbox[3] - bbox[1])
     except Exception:
         try:
@@ -310,7 +405,7 @@ def _text_width(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.ImageFont)
     if text is None:
         text = ""
     try:
-        bbox = draw.textbbox((0, 0), text, font=font)
+        bbox = _text_bbox(draw, text, font)
         return bbox[2] - bbox[0]
     except Exception:
         pass
@@ -384,23 +479,10 @@ def _normalize_color_input(col):
     - None -> (0,0,0)
     - int -> greyscale
     - tuple/list -> first 3 items
-    - string -> ImageColor.getrgb
-    Returns (r,g,b)
+    - string -> color name / hex (ImageColor semantics)
+    Returns (r,g,b), resolved once per distinct input by color_registry.
     """
-    try:
-        if col is None:
-            return (0, 0, 0)
-        if isinstance(col, int):
-            c = max(0, min(255, col))
-            return (c, c, c)
-        if isinstance(col, (tuple, list)):
-            return (col[0], col[1], col[2])
-        if isinstance(col, str):
-            return ImageColor.getrgb(col)
-    except Exception:
-        pass
-    return (0, 0, 0)
-
+    return to_rgb(col, (0, 0, 0))
 
 def _tint_icon_to_color(icon_im: Image.Image, color) -> Image.Image:
     """
@@ -443,42 +525,19 @@ def _resize_to_height_and_pad(icon_im: Image.Image, height: int, pad_square: boo
 
 
 def _normalize_bg(bg: Union[int, Tuple, list, str]) -> Tuple[int, int, int, int]:
-    # extend support for strings via ImageColor.getrgb
-    try:
-        if isinstance(bg, (tuple, list)):
-            if len(bg) == 3:
-                return (bg[0], bg[1], bg[2], 255)
-            if len(bg) == 4:
-                return tuple(bg)
-        if isinstance(bg, int):
-            return (bg, bg, bg, 255)
-        if isinstance(bg, str):
-            rgb = ImageColor.getrgb(bg)
-            return (rgb[0], rgb[1], rgb[2], 255)
-    except Exception:
-        pass
-    return (255, 255, 255, 255)
+    # an explicit RGBA tuple keeps its alpha, everything else is opaque
+    if isinstance(bg, (tuple, list)) and len(bg) == 4:
+        return tuple(bg)
+    info = resolve_color(bg)
+    if info is None:
+        return (255, 255, 255, 255)
+    r, g, b = info.rgb
+    return (r, g, b, 255)
 
 
 def _luminance_from_color(col: Union[int, Tuple, list, str]) -> float:
-    try:
-        if isinstance(col, int):
-            return col / 255.0
-        if isinstance(col, (tuple, list)):
-            r = col[0] / 255.0
-            g = col[1] / 255.0
-            b = col[2] / 255.0
-            return 0.299 * r + 0.587 * g + 0.114 * b
-        if isinstance(col, str):
-            rgb = ImageColor.getrgb(col)
-            r = rgb[0] / 255.0
-            g = rgb[1] / 255.0
-            b = rgb[2] / 255.0
-            return 0.299 * r + 0.587 * g + 0.114 * b
-    except Exception:
-        pass
-    return 1.0
-
+    info = resolve_color(col)
+    return info.luminance if info is not None else 1.0
 
 def _group_events_by_date(events: List[dict]) -> Dict[str, List[dict]]:
     groups = {}
@@ -539,63 +598,29 @@ def _wrap_text_to_lines(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.Im
 
 # ---------- Tag-drawing helper (IMPROVED) ----------------------------------
 
-def _relative_luminance(rgb):
-    # rgb is (r,g,b) 0..255
-    def _lin(c):
-        c = c / 255.0
-        return c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4
-    r, g, b = rgb
-    return 0.2126 * _lin(r) + 0.7152 * _lin(g) + 0.0722 * _lin(b)
-
-
-def _contrast_ratio(l1, l2):
-    a = max(l1, l2)
-    b = min(l1, l2)
-    return (a + 0.05) / (b + 0.05)
-
-
-
-def _fg_for_bg(rgb):
+def _legacy_tags_from_text(ev, raw, caps_fallback=False):
     """
-    Choose white or black for text on top of rgb background.
-    Prefer white for darker/saturated backgrounds (so red tags get white text).
+    Tags from a legacy comma-joined tag_text. Each part gets its color from the
+    mappings tag index when it is a known tag, else the event's tag_color_rgb /
+    tag_color_name. With caps_fallback, text without commas is split into
+    capitalized words (only if there are at least two).
     """
-    try:
-        if rgb is None:
-            return (0, 0, 0)
-        # accept tuples, hex strings, or color names already normalized elsewhere
-        if isinstance(rgb, str):
-            # try hex like "#rrggbb"
-            s = rgb.strip()
-            if s.startswith("#") and len(s) in (7, 4):
-                if len(s) == 7:
-                    r = int(s[1:3], 16); g = int(s[3:5], 16); b = int(s[5:7], 16)
-                else:
-                    r = int(s[1]*2, 16); g = int(s[2]*2, 16); b = int(s[3]*2, 16)
-                bg = (r, g, b)
-            else:
-                # unknown string, fall back
-                return (0,0,0)
+    rawt = (raw or "").strip()
+    parts = [p.strip() for p in rawt.split(",") if p.strip()]
+    if not parts and caps_fallback:
+        caps = re.findall(r"\b[A-ZÆØÅ][a-zæøåA-ZÆØÅ\-']+\b", rawt)
+        if len(caps) >= 2:
+            parts = caps
+    legacy_rgb = ev.get("tag_color_rgb")
+    legacy_name = ev.get("tag_color_name")
+    tags = []
+    for p in parts:
+        hit = lookup_tag(p)
+        if hit and hit[1] is not None:
+            tags.append({"text": p, "color_rgb": hit[1], "color_name": None})
         else:
-            bg = (int(rgb[0]), int(rgb[1]), int(rgb[2]))
-        def rl(c):
-            v = c / 255.0
-            return v/12.92 if v <= 0.03928 else ((v+0.055)/1.055) ** 2.4
-        l_bg = 0.2126*rl(bg[0]) + 0.7152*rl(bg[1]) + 0.0722*rl(bg[2])
-        # prefer white for darker or saturated colors (like pure red)
-        if l_bg < 0.45:
-            return (255,255,255)
-        # fallback to contrast ratio
-        def contrast(l1,l2):
-            L1 = max(l1,l2); L2 = min(l1,l2)
-            return (L1+0.05)/(L2+0.05)
-        l_white = 1.0
-        l_black = 0.0
-        cr_white = contrast(l_bg, l_white)
-        cr_black = contrast(l_bg, l_black)
-        return (255,255,255) if cr_white >= cr_black else (0,0,0)
-    except Exception:
-        return (0,0,0)
+            tags.append({"text": p, "color_rgb": legacy_rgb, "color_name": legacy_name})
+    return tags
 
 
 def draw_event_tags(draw: ImageDraw.ImageDraw, start_x: int, top_y: int, ev: dict,
@@ -612,57 +637,34 @@ def draw_event_tags(draw: ImageDraw.ImageDraw, start_x: int, top_y: int, ev: dic
     tags = ev.get("tags") or []
     # Legacy fallback: split comma-joined tag_text into multiple tags (trim whitespace)
     if not tags and ev.get("tag_text"):
-        raw = (ev.get("tag_text") or "").strip()
-        parts = [p.strip() for p in raw.split(",") if p.strip()]
-        if parts:
-            legacy_rgb = ev.get("tag_color_rgb")
-            legacy_name = ev.get("tag_color_name")
-            tags = [{"text": p, "color_rgb": legacy_rgb, "color_name": legacy_name} for p in parts]
+        tags = _legacy_tags_from_text(ev, ev.get("tag_text"))
 
     for tag in tags:
         text = (tag.get("text") or "").strip()
         if not text:
             continue
 
-        # determine bg color rgb (normalized)
-        bg = None
+        # chip color: tag color, else the event's tag/color fields, else grey
+        chip = None
         if tag.get("color_rgb") is not None:
-            try:
-                bg = tuple(tag["color_rgb"])
-            except Exception:
-                bg = None
-
+            chip = resolve_color(tag["color_rgb"])
         elif tag.get("color_name"):
-
-            try:
-
-                bg = _normalize_color_input(tag["color_name"])
-
-            except Exception:
-
-                bg = None
-
-
-        if bg is None:
-# fallback: try event color fields, then grey
-            ev_color = None
+            # an unknown name draws black, like _normalize_color_input
+            chip = resolve_color(tag["color_name"]) or resolve_color(0)
+        if chip is None:
             if ev.get("tag_color_rgb") is not None:
-                ev_color = tuple(ev.get("tag_color_rgb"))
+                chip = resolve_color(ev.get("tag_color_rgb"))
             elif ev.get("tag_color_name"):
-                try:
-                    ev_color = _normalize_color_input(ev.get("tag_color_name"))
-                except Exception:
-                    ev_color = None
+                chip = resolve_color(ev.get("tag_color_name")) or resolve_color(0)
             elif ev.get("color") is not None:
-                ev_color = _normalize_color_input(ev.get("color"))
-            if ev_color is not None:
-                bg = ev_color
-            else:
-                bg = (200, 200, 200)
+                chip = resolve_color(ev.get("color")) or resolve_color(0)
+        if chip is None:
+            chip = resolve_color((200, 200, 200))
+        bg = chip.rgb
 
         # precise text bbox measurement (handles baseline offsets)
         try:
-            bbox = draw.textbbox((0, 0), text, font=tag_font)
+            bbox = _text_bbox(draw, text, tag_font)
             text_w = bbox[2] - bbox[0]
             text_h = bbox[3] - bbox[1]
             baseline_top = bbox[1]
@@ -689,7 +691,7 @@ def draw_event_tags(draw: ImageDraw.ImageDraw, start_x: int, top_y: int, ev: dic
         except Exception:
             draw.rectangle([(left, top), (right, bottom)], fill=bg)
 
-        fg = _fg_for_bg(bg)
+        fg = chip.fg_rgb
 
         # compute exact text position using baseline/top correction
         text_x = left + padding_x
@@ -741,17 +743,8 @@ def _measure_row_height(event: dict,
     tags_for_measure = event.get("tags") or []
     tag_text = event.get("tag_text") or event.get("tag") or None
     if not tags_for_measure and tag_text:
-        rawt = (tag_text or "").strip()
-        parts = [p.strip() for p in rawt.split(",") if p.strip()]
-        if not parts:
-            # fallback heuristic: capture capitalized words as separate tags
-            caps = re.findall(r"\b[A-ZÆØÅ][a-zæøåA-ZÆØÅ\-']+\b", rawt)
-            if len(caps) >= 2:
-                parts = caps
-        if parts:
-            legacy_rgb = event.get("tag_color_rgb")
-            legacy_name = event.get("tag_color_name")
-            tags_for_measure = [{"text": p, "color_rgb": legacy_rgb, "color_name": legacy_name} for p in parts]
+        # fallback heuristic: capture capitalized words as separate tags
+        tags_for_measure = _legacy_tags_from_text(event, tag_text, caps_fallback=True)
 
     # chip geometry heuristics (must match render_event_tags behavior)
     tag_padding_x = 8
@@ -766,7 +759,7 @@ def _measure_row_height(event: dict,
         if not txt:
             continue
         try:
-            bbox = draw.textbbox((0, 0), txt, font=small_font)
+            bbox = _text_bbox(draw, txt, small_font)
             tw = bbox[2] - bbox[0]
         except Exception:
             tw = _text_width(draw, txt, small_font)
@@ -816,7 +809,7 @@ def _measure_row_height(event: dict,
     line_heights = []
     for ln in lines:
         try:
-            bbox = draw.textbbox((0, 0), ln if ln else "X", font=font)
+            bbox = _text_bbox(draw, ln if ln else "X", font)
             line_h = bbox[3] - bbox[1]
         except Exception:
             line_h = getattr(font, "size", 12)
@@ -831,7 +824,7 @@ def _measure_row_height(event: dict,
 
     # estimate chip height for vertical accommodation
     try:
-        chip_bbox = draw.textbbox((0, 0), "X", font=small_font)
+        chip_bbox = _text_bbox(draw, "X", small_font)
         chip_text_h = chip_bbox[3] - chip_bbox[1]
     except Exception:
         chip_text_h = getattr(small_font, "size", 12)
@@ -846,6 +839,7 @@ def _measure_row_height(event: dict,
 
 # Defensive import for apply_event_mapping (optional)
 apply_event_mapping = None
+apply_event_mapping_batch = None
 try:
     from mappings import apply_event_mapping  # try direct import first
 except Exception:
@@ -854,6 +848,71 @@ except Exception:
         apply_event_mapping = getattr(_m, "apply_event_mapping", None)
     except Exception:
         apply_event_mapping = None
+try:
+    from mappings import apply_event_mapping_batch
+except Exception:
+    apply_event_mapping_batch = None
+
+
+def _header_weather_texts(entry: dict) -> dict:
+    """
+    Texts the day-box header draws for a weather entry:
+    {"temp": "12° / 4°", "precip": "1.2 mm", "wind": "3.4 m/s SV"} (None = not drawn).
+    render_fingerprint uses the same values.
+    """
+    def _safe_float_str(v, fmt="{:.1f}"):
+        try:
+            return fmt.format(float(v))
+        except Exception:
+            try:
+                return str(v)
+            except Exception:
+                return ""
+
+    # gather values safely from provider dict
+    temp_max = entry.get("temp_max") or entry.get("tempMax") or entry.get("max_temp")
+    temp_min = entry.get("temp_min") or entry.get("tempMin") or entry.get("min_temp")
+    precip = entry.get("precip") if "precip" in entry else (entry.get("rain") or entry.get("precipitation"))
+    wind_val = None
+    for k in ("wind_max", "wind_speed", "wind"):
+        if k in entry and entry.get(k) is not None:
+            wind_val = entry.get(k)
+            break
+    wind_dir = None
+    for k in ("wind_dir_deg", "wind_dir", "wind_deg"):
+        if k in entry and entry.get(k) is not None:
+            wind_dir = entry.get(k)
+            break
+
+    temp_text = None
+    if temp_max is not None or temp_min is not None:
+        try:
+            tmax = int(round(float(temp_max))) if temp_max is not None else ""
+            tmin = int(round(float(temp_min))) if temp_min is not None else ""
+            temp_text = f"{tmax}° / {tmin}°"
+        except Exception:
+            temp_text = f"{temp_max}° / {temp_min}°"
+
+    precip_text = None
+    if precip is not None:
+        try:
+            precip_text = f"{float(precip):.1f} mm"
+        except Exception:
+            precip_text = str(precip)
+
+    wind_text = None
+    if wind_val is not None:
+        wind_text = f"{_safe_float_str(wind_val, '{:.1f}')} m/s"
+        # append direction short label if available
+        try:
+            if wind_dir is not None:
+                dir_short = _deg_to_cardinal(float(wind_dir))
+                if dir_short:
+                    wind_text = f"{wind_text} {dir_short}"
+        except Exception:
+            pass
+
+    return {"temp": temp_text, "precip": precip_text, "wind": wind_text}
 
 
 def _gather_weather_values(entry: dict):
@@ -1074,16 +1133,7 @@ def render_events_section(image: Image.Image, x: int, y: int, width: int, events
         # ----------------- MEASURE TAGS to reserve first-line space -----------------
         tags_for_measure = ev.get("tags") or []
         if not tags_for_measure and tag_text:
-            rawt = (tag_text or "").strip()
-            parts = [p.strip() for p in rawt.split(",") if p.strip()]
-            if not parts:
-                caps = re.findall(r"\b[A-ZÆØÅ][a-zæøåA-ZÆØÅ\-']+\b", rawt)
-                if len(caps) >= 2:
-                    parts = caps
-            if parts:
-                legacy_rgb = ev.get("tag_color_rgb")
-                legacy_name = ev.get("tag_color_name")
-                tags_for_measure = [{"text": p, "color_rgb": legacy_rgb, "color_name": legacy_name} for p in parts]
+            tags_for_measure = _legacy_tags_from_text(ev, tag_text, caps_fallback=True)
 
         # compute pixel width of chips we prefer to show on the first line
         tag_padding_x = 8
@@ -1096,7 +1146,7 @@ def render_events_section(image: Image.Image, x: int, y: int, width: int, events
             if not txt:
                 continue
             try:
-                bbox = draw.textbbox((0, 0), txt, font=small_font)
+                bbox = _text_bbox(draw, txt, small_font)
                 tw = bbox[2] - bbox[0]
             except Exception:
                 tw = _text_width(draw, txt, small_font)
@@ -1148,14 +1198,14 @@ def render_events_section(image: Image.Image, x: int, y: int, width: int, events
         line_heights = []
         total_text_h = 0
         try:
-            bbox_X = draw.textbbox((0, 0), "X", font=font)
+            bbox_X = _text_bbox(draw, "X", font)
             spacing_px = max(2, int((bbox_X[3] - bbox_X[1]) * 0.12))
         except Exception:
             spacing_px = max(2, int(getattr(font, "size", 12) * 0.12))
 
         for ln in lines:
             try:
-                bbox = draw.textbbox((0, 0), ln if ln else "X", font=font)
+                bbox = _text_bbox(draw, ln if ln else "X", font)
                 h = bbox[3] - bbox[1]
             except Exception:
                 h = getattr(font, "size", 12)
@@ -1166,7 +1216,7 @@ def render_events_section(image: Image.Image, x: int, y: int, width: int, events
 
         # estimate chip height for centering
         try:
-            chip_bbox = draw.textbbox((0, 0), "X", font=small_font)
+            chip_bbox = _text_bbox(draw, "X", small_font)
             chip_text_h = chip_bbox[3] - chip_bbox[1]
         except Exception:
             chip_text_h = getattr(small_font, "size", 12)
@@ -1245,6 +1295,9 @@ def render_calendar(data: dict, width: int, height: int, days: int = 8, renderer
     top_padding = int(opts.get("box_top_padding", 8))
     bottom_padding = int(opts.get("box_bottom_padding", 8))
     weather_debug = bool(opts.get("weather_debug", False))
+    # Morn/Noon/Day/Eve icons under the header, from the provider's precomputed period summaries
+    show_period_weather = bool(opts.get("show_period_weather", False))
+    period_icon_size = int(opts.get("period_icon_size", 18))
 
     # event icon slot width (pixels)
     event_icon_slot = int(opts.get("event_icon_slot", 20))
@@ -1333,15 +1386,26 @@ def render_calendar(data: dict, width: int, height: int, days: int = 8, renderer
 
     # Optionally apply mapping if available and event lacks structured 'tags'
     if callable(apply_event_mapping):
+        # Event records are updated in place; plain dicts are copied as before
+        events = [ev if isinstance(ev, Event) else dict(ev) for ev in events]
+        # If mapping hasn't been applied (no 'tags' key), map: all such names in one batch call
+        untagged = {i: (ev.get("name", "") if ev.get("name") is not None else "")
+                    for i, ev in enumerate(events) if not ev.get("tags")}
+        mapped_by_index = {}
+        try:
+            if callable(apply_event_mapping_batch):
+                mapped_by_index = dict(zip(untagged, apply_event_mapping_batch(list(untagged.values()))))
+        except Exception:
+            mapped_by_index = {}
         mapped_events = []
-        for ev in events:
-            ev_copy = dict(ev)
-            # If mapping hasn't been applied (no 'tags' key), call mapping.
-            if not ev_copy.get("tags"):
-                try:
-                    mapped = apply_event_mapping(ev_copy.get("name", "") if ev_copy.get("name") is not None else "")
-                except Exception:
-                    mapped = {}
+        for i, ev_copy in enumerate(events):
+            if i in untagged:
+                mapped = mapped_by_index.get(i)
+                if mapped is None:
+                    try:
+                        mapped = apply_event_mapping(untagged[i])
+                    except Exception:
+                        mapped = {}
                 # Only update fields that mapping returns (preserve existing structured fields)
                 for k in ("display_text", "tags", "tag_text", "tag_color_name", "tag_color_rgb",
                         "icon", "icon_size", "icon_color_name", "icon_color_rgb", "mode", "original_name"):
@@ -1359,6 +1423,11 @@ def render_calendar(data: dict, width: int, height: int, days: int = 8, renderer
     gap = grid_gap
     box_w = (width - margin_x * 2 - (columns - 1) * gap) // columns
 
+    weather_by_date = {}
+    for w in data.get("weather", []):
+        weather_by_date.setdefault(w.get("date"), w)
+    period_row_h = period_icon_size + 1 + getattr(small_font, "size", 10) + 4
+
     date_heights = {}
     # inner width for text area inside a box (used by measurement)
     inner_w = box_w - 16
@@ -1368,6 +1437,8 @@ def render_calendar(data: dict, width: int, height: int, days: int = 8, renderer
                                         draw, font, small_font, inner_w, event_icon_slot, icon_gap,
                                         top_padding=top_padding, bottom_padding=bottom_padding,
                                         min_box_height=min_box_height, max_event_lines=max_event_lines)
+        if show_period_weather and (weather_by_date.get(d) or {}).get("periods"):
+            h += period_row_h
         date_heights[d] = h
 
     placements = {}
@@ -1468,11 +1539,7 @@ def render_calendar(data: dict, width: int, height: int, days: int = 8, renderer
         draw.text((x + box_header_padding, y + 3), pretty, font=bold_font, fill=header_text_rgb)
 
         # weather (tinted icons)
-        weather_entry = None
-        for w in data.get("weather", []):
-            if w.get("date") == date_key:
-                weather_entry = w
-                break
+        weather_entry = weather_by_date.get(date_key)
 
         if weather_entry:
             w_icon, temp_text, precip_text, wind_text = _gather_weather_values(weather_entry)
@@ -1492,50 +1559,11 @@ def render_calendar(data: dict, width: int, height: int, days: int = 8, renderer
                     return "weather-windy"
                 return None
 
-            def _safe_float_str(v, fmt="{:.1f}"):
-                try:
-                    return fmt.format(float(v))
-                except Exception:
-                    try:
-                        return str(v)
-                    except Exception:
-                        return ""
-
-            # gather values safely from provider dict (weather_entry)
-            temp_max = weather_entry.get("temp_max") or weather_entry.get("tempMax") or weather_entry.get("max_temp")
-            temp_min = weather_entry.get("temp_min") or weather_entry.get("tempMin") or weather_entry.get("min_temp")
-            precip = weather_entry.get("precip") if "precip" in weather_entry else (weather_entry.get("rain") or weather_entry.get("precipitation"))
-            wind_val = None
-            for k in ("wind_max", "wind_speed", "wind"):
-                if k in weather_entry and weather_entry.get(k) is not None:
-                    wind_val = weather_entry.get(k)
-                    break
-            wind_dir = None
-            for k in ("wind_dir_deg", "wind_dir", "wind_deg"):
-                if k in weather_entry and weather_entry.get(k) is not None:
-                    wind_dir = weather_entry.get(k)
-                    break
-
-            # build texts
-            temp_text = None
-            if temp_max is not None or temp_min is not None:
-                try:
-                    tmax = int(round(float(temp_max))) if temp_max is not None else ""
-                    tmin = int(round(float(temp_min))) if temp_min is not None else ""
-                    temp_text = f"{tmax}° / {tmin}°"
-                except Exception:
-                    temp_text = f"{temp_max}° / {temp_min}°"
-
-            precip_text = None
-            if precip is not None:
-                try:
-                    precip_text = f"{float(precip):.1f} mm"
-                except Exception:
-                    precip_text = str(precip)
-
-            wind_text = None
-            if wind_val is not None:
-                wind_text = f"{_safe_float_str(wind_val, '{:.1f}')} m/s"
+            # header texts (shared with render_fingerprint, so the fingerprint sees what is drawn)
+            header_texts = _header_weather_texts(weather_entry)
+            temp_text = header_texts["temp"]
+            precip_text = header_texts["precip"]
+            wind_text = header_texts["wind"]
 
             # helper to draw icon+text right-aligned, returns new right_x
             def _draw_icon_and_text_right(icon_name, text, right_x, y_top, icon_h, font_for_text):
@@ -1591,15 +1619,7 @@ def render_calendar(data: dict, width: int, height: int, days: int = 8, renderer
                 right_x = _draw_icon_and_text_right(pref, precip_text, right_x, y, small_icon_size, small_font)
 
             if wind_text:
-                # append direction short label if available
                 wd_label = wind_text
-                try:
-                    if wind_dir is not None:
-                        dir_short = _deg_to_cardinal(float(wind_dir))
-                        if dir_short:
-                            wd_label = f"{wd_label} {dir_short}"
-                except Exception:
-                    pass
                 # choose icon name (prefer 'wind' file)
                 wind_icon_name = _get_icon_name_for_wind(opts.get("icon_manager") if opts else None)
                 if wind_icon_name:
@@ -1627,6 +1647,10 @@ def render_calendar(data: dict, width: int, height: int, days: int = 8, renderer
             pass
 
         cur_y = inner_y
+        if show_period_weather and weather_entry and weather_entry.get("periods"):
+            cur_y = draw_period_weather_row(base, inner_x, cur_y, inner_w, None,
+                                            icon_manager=opts.get("icon_manager"), icon_size=period_icon_size,
+                                            font_small=small_font, periods=weather_entry["periods"]) + 4
         if evs:
             cur_y = render_events_section(base, inner_x, cur_y, inner_w, evs, font,
                                         small_font=small_font, icon_manager=opts.get("icon_manager"),
@@ -8,25 +8,17 @@ Krev: pip install pillow requests
 import argparse
 from pathlib import Path
 
-from data_provider import initial_fetch_all
-from layout_renderer import render_calendar, make_mockup_with_bezel
+from data_provider import initial_fetch_all, snapshot_fallback_data
+from layout_renderer import render_calendar, make_mockup_with_bezel, text_measure_cache_info
 from inky_adapter import display_on_inky_if_available, save_png
 from inky_icons_package import IconManager
-from mappings import EVENT_MAPPINGS
+import mappings
+from render_fingerprint import fingerprint, frame_unchanged, save_fingerprint
+from color_registry import INKY_PALETTE_INDEXED
 
 from PIL import Image
 
 # --- Inky palette quantize helpers ---
-INKY_PALETTE_INDEXED = [
-    (255, 255, 255),  # 0 = WHITE
-    (0, 0, 0),        # 1 = BLACK
-    (255, 0, 0),      # 2 = RED
-    (255, 128, 0),    # 3 = ORANGE
-    (255, 255, 0),    # 4 = YELLOW
-    (0, 128, 0),      # 5 = GREEN
-    (0, 0, 255),      # 6 = BLUE
-]
-
 def _make_palette_image_from_indexed(indexed_palette):
     flat = []
     # Build a 256-entry palette; ensure deterministic mapping
@@ -89,6 +81,8 @@ opts = {
     "min_box_height": 48,
     "show_more_text": True,
     "weather_debug": True,
+    "show_period_weather": False,   # Morn/Noon/Day/Eve weather icons in each day box
+    "period_icon_size": 18,
     "tag_font": "Roboto-Bold.ttf",   # filename in assets/fonts OR full path
     "tag_font_size": 16,  
     "weather_tag_font": "Roboto-Regular.ttf",   # filename in assets/fonts or full path
@@ -98,7 +92,6 @@ opts = {
 }
 
 opts["icon_manager"] = IconManager()
-opts["event_mappings"] = EVENT_MAPPINGS
 opts["tint_event_icons"] = True
 
 
@@ -169,8 +162,13 @@ def main(argv=None):
     parser.add_argument("--out-bin", type=str, default="output.bin", help="Output spritesheet binary path")
     parser.add_argument("--debug-bezel", action="store_true", help="Also create mockup with bezel")
     parser.add_argument("--no-inky", action="store_true", help="Do not attempt to display on Inky even if available")
+    parser.add_argument("--force", action="store_true", help="Render and publish even if nothing visible changed")
     args = parser.parse_args(argv)
 
+    # give the mappings CSV refresh started on import a moment, so one table is used for the whole run
+    if not mappings.wait_for_refresh(mappings.MAPPINGS_REFRESH_WAIT):
+        print(f"[mappings] refresh still running, using {mappings.EVENT_MAPPINGS_SOURCE} table")
+
     # Fetch data
     try:
         print(f"Fetching data for {args.days} days...")
@@ -180,17 +178,34 @@ def main(argv=None):
         data = initial_fetch_all(args.days)
     except Exception as e:
         print("Data fetch failed:", e)
-        data = {}  # fallback to empty
+        # fall back to the last good snapshots (empty if there are none)
+        try:
+            data = snapshot_fallback_data(days=args.days)
+        except Exception as e2:
+            print("Snapshot fallback failed:", e2)
+            data = {}
 
     # attach options
     render_opts = dict(opts)  # copy global opts
     render_opts["days"] = args.days
+    render_opts["event_mappings"] = mappings.EVENT_MAPPINGS
+
+    # Skip render/encode/publish when the visible frame is the same as last time
+    fp = None
+    try:
+        fp = fingerprint(data, args.days, render_opts)
+        if not args.force and frame_unchanged(fp, outputs=[args.out_jpg]):
+            print(f"[fingerprint] frame unchanged ({fp[:12]}), skipping render and publish")
+            return
+    except Exception as e:
+        print("[fingerprint] failed, rendering anyway:", e)
 
     # Render calendar image
     try:
         img = _try_render_calendar(data, render_opts, width=800, height=480, days=args.days)
     except Exception as e:
         print("Primary render failed, attempting fallback empty render:", e)
+        fp = None  # the empty fallback frame is not what the fingerprint describes
         try:
             img = _try_render_calendar({}, render_opts, width=800, height=480, days=args.days)
         except Exception as e2:
@@ -210,16 +225,24 @@ def main(argv=None):
         else:
             raise RuntimeError("render_calendar did not return an image")
 
+    tm = text_measure_cache_info()
+    print(f"[render] text measure cache: {tm['hits']} hits, {tm['misses']} misses ({tm['hit_ratio']:.0%})")
+
     # Produce JPEG (fast)
+    published = False
     try:
         save_jpeg_fast(img, out_path=args.out_jpg)
+        published = True
     except Exception as e:
         print("save_jpeg_fast failed:", e)
         try:
             img.convert("RGB").save(args.out_jpg, quality=95)
             print("Saved JPG via PIL fallback:", args.out_jpg)
+            published = True
         except Exception as e2:
             print("Failed to save JPG fallback:", e2)
+    if published:
+        save_fingerprint(fp, outputs=[args.out_jpg])
 
 
 if __name__ == "__main__":
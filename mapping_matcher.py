@@ -0,0 +1,196 @@
+# mapping_matcher.py
+"""
+Forhåndskompilert matcher for EVENT_MAPPINGS.
+
+mapping_info_for_event og apply_event_mapping gikk tidligere gjennom alle
+regler for hver tekst, og _match_text bygget og kompilerte et nytt regex per
+kall. Her kompileres reglene én gang per tabell:
+
+  - en Aho–Corasick-automat over alle nøkkelord finner i ett pass over teksten
+    hvilke regler som i det hele tatt kan treffe (contains/prefix/exact/
+    startswith/endswith, og regex-regler sitt literal i apply_event_mapping)
+  - hver regel har sitt ferdigkompilerte mønster (samme semantikk som
+    mappings._match_text), regex-regler sjekkes alltid
+
+Automaten er bare et filter: kandidatene sjekkes fortsatt i regelrekkefølge,
+så "første treff" og rekkefølgesemantikken er uendret.
+
+Eksempel:
+    matcher = MappingMatcher(EVENT_MAPPINGS)
+    idx, m = matcher.first_match("Middag: pasta")     # mapping_info_for_event
+    ids = matcher.contains_ids("middag: pasta")       # apply_event_mapping (lowercase tekst)
+"""
+import re
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class AhoCorasick:
+    """Multi-pattern substring search; search() returns the keys of all patterns found in a text."""
+
+    def __init__(self, patterns: Iterable[Tuple[Any, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[tuple] = [()]
+        for key, pat in patterns:
+            if not pat:
+                continue
+            node = 0
+            for ch in pat:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                    self._goto[node][ch] = nxt
+                node = nxt
+            self._out[node] = self._out[node] + (key,)
+        self._build_fail_links()
+
+    def _build_fail_links(self):
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            u = queue.popleft()
+            for ch, v in goto[u].items():
+                queue.append(v)
+                f = fail[u]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fv = goto[f].get(ch, 0)
+                fail[v] = fv if fv != v else 0
+                if out[fail[v]]:
+                    out[v] = out[v] + out[fail[v]]
+
+    def search(self, text: str) -> set:
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+def _ignorecase_classes() -> Dict[int, str]:
+    """
+    Map every character in one of re's extra IGNORECASE classes (i/ı, s/ſ, σ/ς,
+    µ/μ, ...) to one representative of its class.
+    """
+    try:
+        from re._casefix import _EXTRA_CASES          # Python 3.11+
+    except ImportError:
+        try:
+            from sre_compile import _ignorecase_fixes as _EXTRA_CASES
+        except ImportError:
+            _EXTRA_CASES = {0x69: (0x131,), 0x131: (0x69,), 0x73: (0x17F,), 0x17F: (0x73,)}
+    rep = {}
+    for cp, others in _EXTRA_CASES.items():
+        members = (cp,) + tuple(others)
+        low = min(rep.get(c, c) for c in members)
+        for c in members:
+            rep[c] = low
+    return {c: chr(r) for c, r in rep.items()}
+
+# İ is the only character whose str.lower() (full mapping, "i̇") differs from the
+# simple lowercase mapping re uses ("i")
+_FOLD_PRE = {0x130: "i"}
+_FOLD_CLASSES = _ignorecase_classes()
+
+
+def fold(text: str) -> str:
+    """
+    Case key for the prefilter, one character per character: two characters that
+    re.IGNORECASE treats as equal always fold to the same character.
+    """
+    return text.translate(_FOLD_PRE).lower().translate(_FOLD_CLASSES)
+
+
+def compile_rule_pattern(keyword: str, match_type: str):
+    """Compiled regex with the exact semantics of mappings._match_text (match or search, see returned flag)."""
+    mt = (match_type or "prefix").strip().lower()
+    esc = re.escape(keyword)
+    if mt in ("prefix", "startswith"):
+        return re.compile(r"^\s*" + esc + r"(?::|\b)?\s*", re.IGNORECASE), True
+    if mt == "exact":
+        return re.compile(r"^\s*" + esc + r"\s*$", re.IGNORECASE), True
+    if mt == "regex":
+        try:
+            return re.compile(keyword, re.IGNORECASE), False
+        except re.error:
+            return re.compile(esc, re.IGNORECASE), False
+    if mt == "endswith":
+        return re.compile(esc + r"\s*$", re.IGNORECASE), False
+    return re.compile(esc, re.IGNORECASE), False
+
+
+class MappingMatcher:
+    """All rules of one EVENT_MAPPINGS table, compiled once."""
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        self.size = len(rules)
+        self._patterns: List[Optional[tuple]] = []
+        folded, lowered, always = [], [], []
+        for i, m in enumerate(rules):
+            try:
+                kw = (m.get("keyword") or "").strip()
+                mt = (m.get("match_type") or "prefix").strip().lower()
+            except Exception:
+                kw, mt = "", ""
+            if not kw:
+                self._patterns.append(None)
+                continue
+            self._patterns.append(compile_rule_pattern(kw, mt))
+            # apply_event_mapping treats every keyword as a literal (kw.lower() in text.lower())
+            lowered.append((i, kw.lower()))
+            if mt == "regex":
+                always.append(i)
+            else:
+                # IGNORECASE matching is prefiltered on fold()ed text, confirmed by the regex
+                folded.append((i, fold(kw)))
+        self._literal = AhoCorasick(lowered)
+        self._folded = AhoCorasick(folded)
+        self._always = frozenset(always)
+
+    def contains_ids(self, lowered_text: str) -> List[int]:
+        """Rule indices (sorted) whose lowercased keyword occurs in `lowered_text`."""
+        return sorted(self._literal.search(lowered_text))
+
+    def candidates(self, text: str) -> List[int]:
+        """Rule indices (sorted) that may match `text` under their match_type."""
+        ids = self._folded.search(fold(text))
+        if self._always:
+            ids |= self._always
+        return sorted(ids)
+
+    def match_rule(self, index: int, text: str):
+        """re.Match for rule `index` against `text`, like mappings._match_text, or None."""
+        compiled = self._patterns[index]
+        if compiled is None:
+            return None
+        pattern, anchored = compiled
+        return pattern.match(text) if anchored else pattern.search(text)
+
+    def first_match(self, text: str, profiler=None) -> Tuple[Optional[int], Optional[re.Match]]:
+        """
+        (rule index, match) of the first rule in table order that matches `text`.
+        With a profiler (mapping_profiler.RuleProfiler), every evaluated rule is timed.
+        """
+        if profiler is None:
+            for i in self.candidates(text):
+                mm = self.match_rule(i, text)
+                if mm:
+                    return i, mm
+            return None, None
+        for i in self.candidates(text):
+            t0 = time.perf_counter()
+            mm = self.match_rule(i, text)
+            profiler.record(i, time.perf_counter() - t0, mm is not None, text)
+            if mm:
+                return i, mm
+        return None, None
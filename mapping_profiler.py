@@ -0,0 +1,257 @@
+# mapping_profiler.py
+"""
+Profilering av EVENT_MAPPINGS-regler.
+
+Mapping-arket redigeres av ikke-utviklere, og en regel med match_type "regex"
+kjøres med re.search(IGNORECASE) mot hver tekst. RuleProfiler teller per regel
+hvor mange ganger den ble evaluert og traff, og samlet tid, separat for de to
+veiene gjennom tabellen:
+
+  - "first_match": mapping_info_for_event (MappingMatcher.first_match, regler
+                   sjekkes med match_type, første treff vinner)
+  - "apply":       apply_event_mapping (hver regel med keyword som literal i
+                   teksten brukes, add_* samler, replace_* fjerner tekst)
+
+Rapporten gir per vei trege regler og regler som aldri traff, og to statiske
+analyser:
+
+  - shadowed:          regelen brukes aldri av apply_event_mapping fordi en
+                       tidligere replace_all-regel alltid fjerner nøkkelordet
+  - never_first_match: en tidligere regel treffer alltid når denne gjør det,
+                       så den vinner aldri i mapping_info_for_event (men kan
+                       fortsatt bidra i apply_event_mapping; ikke slett den
+                       på grunnlag av dette alene)
+
+Tidsvakten er alltid på: en enkelt evaluering over slow_ms gir én advarsel
+per regel og tabell ("[mappings] slow rule ..."), så et patologisk regex ikke
+kan legge sekunder til hver render uten at det synes. Tellerne samles bare når
+profilering er slått på (mappings leser MAPPINGS_PROFILE).
+
+Regler som Aho–Corasick-filteret i mapping_matcher sorterer bort for en tekst
+regnes ikke som evaluert (de koster ingenting). apply_event_mapping er memoisert;
+et memo-treff teller de samme evalueringene/treffene som første kjøring, uten
+tid (record_memo_hit), så tellerne er per kall og ikke per unik tekst.
+
+Eksempel:
+    prof = RuleProfiler(EVENT_MAPPINGS, collect=True)
+    idx, mm = matcher.first_match(text, prof)
+    print(format_report(prof.report()))
+"""
+import threading
+from typing import Any, Dict, List, Optional
+
+from mapping_matcher import fold
+
+_TEXT_PREVIEW = 60
+_MATCH_TYPES = ("prefix", "startswith", "exact", "regex", "endswith", "contains")
+
+
+FIRST_MATCH = "first_match"
+APPLY = "apply"
+PATHS = (FIRST_MATCH, APPLY)
+
+
+class _PathCounters:
+    def __init__(self, size):
+        self.evaluated = [0] * size
+        self.matched = [0] * size
+        self.total_s = [0.0] * size
+        self.max_s = [0.0] * size
+        self.memo_hits = 0
+
+
+class RuleProfiler:
+    """Per-rule evaluation/match counters and timings for one EVENT_MAPPINGS table, per path."""
+
+    def __init__(self, rules: List[Dict[str, Any]], collect: bool = False, slow_ms: float = 50.0):
+        self.rules = rules
+        self.size = len(rules)
+        self.collect = collect
+        self.slow_s = max(0.0, float(slow_ms)) / 1000.0
+        self.paths = {path: _PathCounters(self.size) for path in PATHS}
+        self._warned = set()
+        self._lock = threading.Lock()
+
+    def record(self, index: int, seconds: float, matched: bool, text: str = "", path: str = FIRST_MATCH):
+        if self.slow_s and seconds >= self.slow_s and index not in self._warned:
+            self._warned.add(index)
+            self._warn_slow(index, seconds, text, path)
+        if not self.collect:
+            return
+        c = self.paths[path]
+        with self._lock:
+            c.evaluated[index] += 1
+            if matched:
+                c.matched[index] += 1
+            c.total_s[index] += seconds
+            if seconds > c.max_s[index]:
+                c.max_s[index] = seconds
+
+    def record_memo_hit(self, evaluations, path: str = APPLY):
+        """Count the (index, matched) evaluations of a memoized result again, without time."""
+        if not self.collect:
+            return
+        c = self.paths[path]
+        with self._lock:
+            c.memo_hits += 1
+            for index, matched in evaluations:
+                c.evaluated[index] += 1
+                if matched:
+                    c.matched[index] += 1
+
+    def _warn_slow(self, index, seconds, text, path):
+        m = self.rules[index] if index < self.size else {}
+        preview = (text or "")[:_TEXT_PREVIEW]
+        print(f"[mappings] slow rule #{index} {m.get('keyword')!r} ({m.get('match_type') or 'prefix'}, {path}): "
+              f"{seconds * 1000:.0f} ms on {preview!r}")
+
+    def rule_stats(self, path: str = FIRST_MATCH) -> List[Dict[str, Any]]:
+        c = self.paths[path]
+        stats = []
+        for i, m in enumerate(self.rules):
+            stats.append({
+                "index": i,
+                "keyword": m.get("keyword"),
+                "match_type": (m.get("match_type") or "prefix").strip().lower(),
+                "evaluated": c.evaluated[i],
+                "matched": c.matched[i],
+                "total_ms": round(c.total_s[i] * 1000, 3),
+                "max_ms": round(c.max_s[i] * 1000, 3),
+            })
+        return stats
+
+    def path_report(self, path: str, top: int = 10) -> Dict[str, Any]:
+        """{"evaluations", "memo_hits", "total_ms", "slow", "never_matched"} for one path."""
+        c = self.paths[path]
+        stats = self.rule_stats(path)
+        slow = sorted((s for s in stats if s["evaluated"]), key=lambda s: (-s["total_ms"], -s["max_ms"]))[:top]
+        never = [s for s in stats if (s["keyword"] or "").strip() and not s["matched"]]
+        return {
+            "evaluations": sum(c.evaluated),
+            "memo_hits": c.memo_hits,
+            "total_ms": round(sum(c.total_s) * 1000, 3),
+            "slow": slow,
+            "never_matched": never,
+        }
+
+    def report(self, top: int = 10) -> Dict[str, Any]:
+        """Per-path reports plus the static shadowed / never_first_match analyses."""
+        out = {"collecting": self.collect, "slow_warnings": sorted(self._warned)}
+        for path in PATHS:
+            out[path] = self.path_report(path, top=top)
+        out["shadowed"] = shadowed_rules(self.rules)
+        out["never_first_match"] = never_first_match_rules(self.rules)
+        return out
+
+
+def _covers(earlier_kw: str, earlier_mt: str, kw: str, mt: str) -> bool:
+    """True if every text that matches (kw, mt) also matches (earlier_kw, earlier_mt)."""
+    if earlier_mt == "regex" or mt == "regex":
+        return earlier_mt == mt and earlier_kw == kw
+    if earlier_mt == "contains":
+        return earlier_kw in kw
+    if earlier_mt in ("prefix", "startswith"):
+        return mt in ("prefix", "startswith", "exact") and kw.startswith(earlier_kw)
+    if earlier_mt == "endswith":
+        return mt in ("endswith", "exact") and kw.endswith(earlier_kw)
+    if earlier_mt == "exact":
+        return mt == "exact" and kw == earlier_kw
+    return False
+
+
+def _norm_match_type(m):
+    mt = (m.get("match_type") or "prefix").strip().lower()
+    # compile_rule_pattern treats any other type as contains
+    return mt if mt in _MATCH_TYPES else "contains"
+
+
+def never_first_match_rules(rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Rules that can never be the first match in mapping_info_for_event because an
+    earlier rule matches every text they match (duplicates, a shorter contains
+    keyword, a shorter prefix, ...). Conservative: regex rules are only compared
+    for exact duplicates. Such a rule may still add icons/tags in apply_event_mapping.
+    """
+    norm = [(fold(str(m.get("keyword") or "").strip()), _norm_match_type(m)) for m in rules]
+    out = []
+    for j, (kw, mt) in enumerate(norm):
+        if not kw:
+            continue
+        for i in range(j):
+            ekw, emt = norm[i]
+            if ekw and _covers(ekw, emt, kw, mt):
+                out.append({
+                    "index": j,
+                    "keyword": rules[j].get("keyword"),
+                    "match_type": mt,
+                    "shadowed_by": i,
+                    "shadowed_by_keyword": rules[i].get("keyword"),
+                })
+                break
+    return out
+
+
+def shadowed_rules(rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Rules apply_event_mapping never uses: an earlier replace_all rule removes
+    every occurrence of its keyword, and this rule's keyword contains it, so the
+    keyword is gone from the working text before this rule is checked.
+    (replace_text / replace_icon only remove the first occurrence, which may be
+    elsewhere in the text, so they do not shadow.)
+    """
+    norm = []
+    for m in rules:
+        kw = str(m.get("keyword") or "").strip().lower()
+        mode = str(m.get("mode") or "").strip().lower()
+        norm.append((kw, mode))
+    out = []
+    for j, (kw, _mode) in enumerate(norm):
+        if not kw:
+            continue
+        for i in range(j):
+            ekw, emode = norm[i]
+            if ekw and emode == "replace_all" and ekw in kw:
+                out.append({
+                    "index": j,
+                    "keyword": rules[j].get("keyword"),
+                    "mode": rules[j].get("mode"),
+                    "shadowed_by": i,
+                    "shadowed_by_keyword": rules[i].get("keyword"),
+                })
+                break
+    return out
+
+
+def format_report(report: Dict[str, Any], limit: Optional[int] = 20) -> str:
+    """Human-readable text for RuleProfiler.report()."""
+    lines = ["=== mapping rule profile ==="]
+    if not report.get("collecting"):
+        lines.append("(counters off, set MAPPINGS_PROFILE=1)")
+    for path, title in ((FIRST_MATCH, "mapping_info_for_event (first match)"),
+                        (APPLY, "apply_event_mapping (keyword contains)")):
+        r = report[path]
+        if not report.get("collecting"):
+            continue
+        memo = f" ({r['memo_hits']} memo hits counted without time)" if r.get("memo_hits") else ""
+        lines.append(f"-- {title}: {r['evaluations']} evaluations{memo}, {r['total_ms']:.1f} ms")
+        if r["slow"]:
+            lines.append("  slowest rules (total / max ms, evaluated, matched):")
+            for s in r["slow"][:limit]:
+                lines.append(f"    #{s['index']:<4} {s['keyword']!r} [{s['match_type']}] "
+                             f"{s['total_ms']:.2f} / {s['max_ms']:.2f} ms, {s['evaluated']}x, {s['matched']} hits")
+        if r["never_matched"]:
+            lines.append(f"  never matched on this path ({len(r['never_matched'])}):")
+            for s in r["never_matched"][:limit]:
+                lines.append(f"    #{s['index']:<4} {s['keyword']!r} [{s['match_type']}] evaluated {s['evaluated']}x")
+    if report.get("slow_warnings"):
+        lines.append("rules over the slow threshold: " + ", ".join(f"#{i}" for i in report["slow_warnings"]))
+    if report["shadowed"]:
+        lines.append(f"never used by apply_event_mapping, keyword removed by an earlier replace_all rule ({len(report['shadowed'])}):")
+        for s in report["shadowed"][:limit]:
+            lines.append(f"  #{s['index']:<4} {s['keyword']!r} [{s['mode']}] <- #{s['shadowed_by']} {s['shadowed_by_keyword']!r}")
+    if report["never_first_match"]:
+        lines.append(f"never first match in mapping_info_for_event (may still apply in apply_event_mapping) "
+                     f"({len(report['never_first_match'])}):")
+        for s in report["never_first_match"][:limit]:
+            lines.append(f"  #{s['index']:<4} {s['keyword']!r} [{s['match_type']}] <- #{s['shadowed_by']} {s['shadowed_by_keyword']!r}")
+    return "\n".join(lines)
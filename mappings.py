@@ -6,15 +6,40 @@ Order of attempts when loading mappings:
   2) Local valid cache (event_mappings_cache.json by default)
   3) Embedded fallback list
 
+Import never touches the network: it loads the local cache (also when it is
+older than the TTL, labelled "cache-stale") or the fallback, and then refreshes
+from the CSV in a background thread. When the download completes the new table
+is swapped in atomically (new EVENT_MAPPINGS list, new version, fresh memo), so
+readers see either the old or the new table, never a mix. Code that uses the
+table must read mappings.EVENT_MAPPINGS at call time, not copy it at import.
+
+Every table has a content id (EVENT_MAPPINGS_CONTENT_ID / mappings_version_id()):
+the sha256 of the CSV body it was parsed from (stored in the cache file), or of
+the normalized rows for the fallback. A fetched CSV that hashes to the current
+id is not parsed, the cache file is not rewritten and the table, matcher and
+memo are kept. Downstream caches (apply_event_mapping memo, render fingerprint)
+key on the id.
+
 Environment variables:
   GS_CSV_URL           -> published CSV URL (optional)
   GS_CACHE_PATH        -> cache path (default: "event_mappings_cache.json")
   GS_CACHE_TTL_SECONDS -> how long cache is valid in seconds (default: 3600)
+  MAPPING_MEMO_SIZE    -> max memoized apply_event_mapping results (default: 2048, 0 = off)
+  MAPPINGS_REFRESH     -> CSV refresh on import: "background" (default), "sync" (old blocking
+                          behaviour) or "off" (only refresh_event_mappings() / reload_event_mappings())
+  MAPPINGS_REFRESH_WAIT-> seconds main.py waits for a running refresh before fetching (default: 5)
   MAPPINGS_DEBUG=1     -> print summary on import
+  MAPPINGS_PROFILE=1   -> count evaluations/matches/time per rule (separately for
+                          mapping_info_for_event and apply_event_mapping) and print the rule
+                          report (slow, never matched, shadowed rules) at exit
+  MAPPINGS_SLOW_RULE_MS-> one rule evaluation slower than this prints a warning, also
+                          without MAPPINGS_PROFILE (default: 50, 0 = off)
 
 Notes:
 - CSV must have headers: keyword, icon, replacement, mode, color, match_type, size_px
 - You can call reload_event_mappings(url="...") to force-load from a specific URL (handy on Windows)
+- refresh_event_mappings() downloads and swaps now; refresh_event_mappings_async() does it
+  in a daemon thread and wait_for_refresh(timeout) waits for that thread
 """
 
 from typing import Optional, Dict, Any, List, Tuple
@@ -22,6 +47,10 @@ import re
 import os
 import time
 import json
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict, deque
 
 # requests is required for CSV mode; fail early with a clear message if missing
 try:
@@ -29,34 +58,27 @@ try:
 except Exception as e:
     requests = None  # we'll raise a clear error if CSV fetch is attempted
 
+import http_fixtures
+from http_cache import cached_get
+from mapping_matcher import MappingMatcher
+from mapping_profiler import RuleProfiler, APPLY as RULE_PATH_APPLY, format_report as format_rule_report
+
 # --- Colors and small helpers ----------------------------------------
-INKY_COLORS = {
-    "black":  (0, 0, 0),
-    "white":  (255, 255, 255),
-    "red":    (255, 0, 0),
-    "yellow": (255, 255, 0),
-    "green":  (0, 128, 0),
-    "blue":   (0, 0, 255),
-    "orange": (255, 128, 0),
-}
+# the palette and name/tuple resolution live in color_registry (shared with
+# data_provider and layout_renderer)
+from color_registry import INKY_COLORS, resolve_color, to_rgb
 
 def color_to_rgb(name: Optional[str]):
+    """Inky palette name, #hex or rgb(...) -> (r, g, b); other names -> None."""
     if not name:
         return None
     k = str(name).strip().lower()
     if k in INKY_COLORS:
         return INKY_COLORS[k]
+    if k.startswith("#"):
+        info = resolve_color(k)
+        return info.rgb if info is not None and len(k) in (4, 7) else None
     try:
-        if k.startswith("#") and (len(k) == 7 or len(k) == 4):
-            if len(k) == 4:
-                r = int(k[1]*2, 16)
-                g = int(k[2]*2, 16)
-                b = int(k[3]*2, 16)
-                return (r, g, b)
-            r = int(k[1:3], 16)
-            g = int(k[3:5], 16)
-            b = int(k[5:7], 16)
-            return (r, g, b)
         if k.startswith("rgb"):
             nums = re.findall(r"[-]?\d+", k)
             if len(nums) >= 3:
@@ -130,6 +152,8 @@ FALLBACK_EVENT_MAPPINGS = [
 GS_CSV_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vTYL3NSfO_r0l9HItyeakQjkqC00XVTgoXrmHgGcSS3HAT_cGGkPmCMibmVKizL33m585mmlHVV0rOV/pub?output=csv"
 GS_CACHE_PATH = os.environ.get("GS_CACHE_PATH", "event_mappings_cache.json")
 GS_CACHE_TTL_SECONDS = int(os.environ.get("GS_CACHE_TTL_SECONDS", "3600"))
+MAPPINGS_REFRESH = os.environ.get("MAPPINGS_REFRESH", "background").strip().lower()
+MAPPINGS_REFRESH_WAIT = float(os.environ.get("MAPPINGS_REFRESH_WAIT", "5"))
 
 EVENT_MAPPINGS: List[Dict[str, Any]] = []
 EVENT_MAPPINGS_LOADED_AT: Optional[float] = None
@@ -169,10 +193,17 @@ def _normalize_row(row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     except Exception:
         return None
 
+def _rows_id(mappings: List[Dict[str, Any]]) -> str:
+    """Content id of a table that did not come from a CSV body (fallback, legacy cache, direct assignment)."""
+    blob = json.dumps(mappings, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
 # --- CSV fetcher (published sheet) -----------------------------------
-def fetch_mappings_from_csv_url(url: Optional[str] = None) -> List[Dict[str, Any]]:
+def fetch_csv_table(url: Optional[str] = None, known_id: Optional[str] = None) -> Tuple[Optional[List[Dict[str, Any]]], str]:
     """
-    Fetch the published CSV; normalize and return mapping dicts.
+    Fetch the published CSV. Returns (normalized mapping dicts, content id), where
+    the id is the sha256 of the body. If the id equals `known_id` nothing is
+    parsed and the rows are None.
     Raises RuntimeError with helpful message if requests is missing or url empty.
     """
     if not url:
@@ -183,8 +214,21 @@ def fetch_mappings_from_csv_url(url: Optional[str] = None) -> List[Dict[str, Any
     if requests is None:
         raise RuntimeError("Python package 'requests' is not installed. Run: pip install requests")
 
-    resp = requests.get(url, timeout=15)
+    resp = cached_get(url)
     resp.raise_for_status()
+    content_id = hashlib.sha256(resp.content).hexdigest()
+    if known_id and content_id == known_id:
+        return None, content_id
+    return _parse_csv_response(resp), content_id
+
+def fetch_mappings_from_csv_url(url: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Fetch the published CSV; normalize and return mapping dicts.
+    Raises RuntimeError with helpful message if requests is missing or url empty.
+    """
+    return fetch_csv_table(url)[0]
+
+def _parse_csv_response(resp) -> List[Dict[str, Any]]:
     content = resp.content.decode("utf-8")
     # parse CSV into dict rows
     import csv, io
@@ -197,50 +241,87 @@ def fetch_mappings_from_csv_url(url: Optional[str] = None) -> List[Dict[str, Any
     return out
 
 # --- Cache helpers ----------------------------------------------------
-def save_cache(mappings: List[Dict[str, Any]]):
+def save_cache(mappings: List[Dict[str, Any]], content_id: Optional[str] = None):
     try:
-        with open(GS_CACHE_PATH, "w", encoding="utf-8") as f:
-            json.dump({"meta": {"fetched_at": int(time.time())}, "mappings": mappings}, f, ensure_ascii=False, indent=2)
+        # write + rename, so a refresh thread killed at exit never leaves a torn file
+        tmp = f"{GS_CACHE_PATH}.tmp"
+        meta = {"fetched_at": int(time.time()), "content_id": content_id or _rows_id(mappings)}
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "mappings": mappings}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, GS_CACHE_PATH)
     except Exception:
         # non-fatal
         pass
 
-def load_cache_if_valid() -> Optional[List[Dict[str, Any]]]:
+def _touch_cache():
+    # the sheet was re-checked and is unchanged: refresh the cache age without rewriting it
+    try:
+        os.utime(GS_CACHE_PATH)
+    except Exception:
+        pass
+
+def _read_cache() -> Tuple[Optional[List[Dict[str, Any]]], float, Optional[str]]:
+    """(rows, checked_at, content_id) from the cache file, or (None, 0, None) if missing/unreadable."""
     if not os.path.exists(GS_CACHE_PATH):
-        return None
+        return None, 0, None
     try:
         with open(GS_CACHE_PATH, "r", encoding="utf-8") as f:
             payload = json.load(f)
-        fetched_at = payload.get("meta", {}).get("fetched_at", 0)
-        if time.time() - fetched_at > GS_CACHE_TTL_SECONDS:
-            return None
+        meta = payload.get("meta", {})
+        # an unchanged re-fetch only touches the file, so its mtime is the last check
+        checked_at = max(meta.get("fetched_at", 0), os.path.getmtime(GS_CACHE_PATH))
         rows = payload.get("mappings", [])
+        content_id = meta.get("content_id")
+        if content_id:
+            # written by save_cache from normalized rows
+            return [r for r in rows if isinstance(r, dict)], checked_at, content_id
         out = []
         for r in rows:
             nr = _normalize_row(r)
             if nr:
                 out.append(nr)
-        return out
+        return out, checked_at, _rows_id(out)
     except Exception:
+        return None, 0, None
+
+def load_cache_if_valid() -> Optional[List[Dict[str, Any]]]:
+    rows, checked_at, _ = _read_cache()
+    if rows is None or time.time() - checked_at > GS_CACHE_TTL_SECONDS:
         return None
+    return rows
+
+def load_local_event_mappings() -> Tuple[List[Dict[str, Any]], str, str]:
+    """
+    Table available without network: the cache ("cache", or "cache-stale" when
+    older than GS_CACHE_TTL_SECONDS), else the embedded fallback.
+    Returns (mappings, source, content_id).
+    """
+    rows, checked_at, content_id = _read_cache()
+    if rows:
+        return rows, "cache" if time.time() - checked_at <= GS_CACHE_TTL_SECONDS else "cache-stale", content_id
+    rows = [dict(m) for m in FALLBACK_EVENT_MAPPINGS]
+    return rows, "fallback", _rows_id(rows)
 
 # --- Main loader -----------------------------------------------------
-def _load_event_mappings(force_refresh: bool = False, csv_url: Optional[str] = None) -> Tuple[List[Dict[str, Any]], str]:
+def _load_event_mappings(force_refresh: bool = False, csv_url: Optional[str] = None) -> Tuple[Optional[List[Dict[str, Any]]], str, str]:
     """
     Order of attempts:
       1) CSV published (if csv_url param provided or GS_CSV_URL set)
       2) cache (if valid and not force_refresh)
       3) fallback
-    Returns (mappings, source)
+    Returns (mappings, source, content_id); mappings is None when the CSV is
+    unchanged from the current table.
     """
     # 1) try CSV (explicit url preferred)
     url_to_try = csv_url or GS_CSV_URL or ""
     if url_to_try and not force_refresh:
         try:
-            mappings = fetch_mappings_from_csv_url(url_to_try)
+            mappings, content_id = fetch_csv_table(url_to_try, known_id=mappings_version_id())
+            if mappings is None:
+                return None, "csv", content_id
             if mappings:
-                save_cache(mappings)
-                return mappings, "csv"
+                save_cache(mappings, content_id)
+                return mappings, "csv", content_id
             # empty result -> continue to cache/fallback
         except Exception as e:
             # don't raise here — return to cache/fallback but print a helpful message
@@ -248,23 +329,102 @@ def _load_event_mappings(force_refresh: bool = False, csv_url: Optional[str] = N
 
     # 2) try cache
     if not force_refresh:
-        cached = load_cache_if_valid()
-        if cached:
-            return cached, "cache"
+        cached, checked_at, content_id = _read_cache()
+        if cached and time.time() - checked_at <= GS_CACHE_TTL_SECONDS:
+            return cached, "cache", content_id
 
     # 3) fallback
-    return [dict(m) for m in FALLBACK_EVENT_MAPPINGS], "fallback"
+    mappings = [dict(m) for m in FALLBACK_EVENT_MAPPINGS]
+    return mappings, "fallback", _rows_id(mappings)
+
+def _install_table(mappings: Optional[List[Dict[str, Any]]], source: str, content_id: Optional[str] = None):
+    """
+    Atomically make `mappings` the current table (new version, memo dropped).
+    A table with the current content id (or mappings=None) only updates the source.
+    """
+    global EVENT_MAPPINGS, EVENT_MAPPINGS_LOADED_AT, EVENT_MAPPINGS_SOURCE, EVENT_MAPPINGS_VERSION
+    global EVENT_MAPPINGS_CONTENT_ID, _INSTALLED_TABLE
+    if mappings is not None and not content_id:
+        content_id = _rows_id(mappings)
+    with _TABLE_LOCK:
+        if mappings is None or (content_id == EVENT_MAPPINGS_CONTENT_ID and EVENT_MAPPINGS is _INSTALLED_TABLE):
+            EVENT_MAPPINGS_SOURCE = source
+            EVENT_MAPPINGS_LOADED_AT = time.time()
+            changed = False
+        else:
+            # one rebinding of EVENT_MAPPINGS: readers hold either the old or the new list
+            EVENT_MAPPINGS = _INSTALLED_TABLE = mappings
+            EVENT_MAPPINGS_CONTENT_ID = content_id
+            EVENT_MAPPINGS_SOURCE = source
+            EVENT_MAPPINGS_LOADED_AT = time.time()
+            # new table -> new version; memoized apply_event_mapping results for the old one are dropped
+            EVENT_MAPPINGS_VERSION += 1
+            changed = True
+    if changed:
+        clear_event_mapping_cache()
+        print(f"[mappings] Loaded {len(mappings)} mappings from {source} ({content_id[:12]})")
+    else:
+        print(f"[mappings] {source} unchanged ({EVENT_MAPPINGS_CONTENT_ID[:12]}), keeping {len(EVENT_MAPPINGS)} mappings")
+    return changed
 
 def reload_event_mappings(force_refresh: bool = False, url: Optional[str] = None):
     """
-    Public reload function.
+    Public reload function (synchronous, may block on the CSV download).
     - url: optional CSV url to load from immediately (overrides GS_CSV_URL).
     - force_refresh: bypass cache (if True).
     """
-    global EVENT_MAPPINGS, EVENT_MAPPINGS_LOADED_AT, EVENT_MAPPINGS_SOURCE
-    EVENT_MAPPINGS, EVENT_MAPPINGS_SOURCE = _load_event_mappings(force_refresh=force_refresh, csv_url=url)
-    EVENT_MAPPINGS_LOADED_AT = time.time()
-    print(f"[mappings] Loaded {len(EVENT_MAPPINGS)} mappings from {EVENT_MAPPINGS_SOURCE}")
+    mappings, source, content_id = _load_event_mappings(force_refresh=force_refresh, csv_url=url)
+    if mappings is None:
+        _touch_cache()
+    _install_table(mappings, source, content_id)
+
+def refresh_event_mappings(url: Optional[str] = None) -> bool:
+    """
+    Download the CSV now and swap it in. On error or an empty sheet the current
+    table is kept; a sheet with the current content id is neither parsed nor
+    re-cached. Returns True if a new table was installed.
+    """
+    with _REFRESH_LOCK:  # one download at a time
+        try:
+            mappings, content_id = fetch_csv_table(url or GS_CSV_URL, known_id=mappings_version_id())
+        except Exception as e:
+            print(f"[mappings] CSV fetch error: {e}")
+            return False
+        if mappings is None:
+            _touch_cache()
+            return _install_table(None, "csv", content_id)
+        if not mappings:
+            print("[mappings] CSV returned no mappings, keeping current table")
+            return False
+        save_cache(mappings, content_id)
+        return _install_table(mappings, "csv", content_id)
+
+def mappings_version_id() -> str:
+    """Content id (sha256 hex) of the table in EVENT_MAPPINGS right now."""
+    table = EVENT_MAPPINGS
+    if table is _INSTALLED_TABLE and EVENT_MAPPINGS_CONTENT_ID:
+        return EVENT_MAPPINGS_CONTENT_ID
+    # assigned directly (tests, benchmark): hash what is there
+    return _rows_id(table)
+
+def refresh_event_mappings_async(url: Optional[str] = None) -> threading.Thread:
+    """Run refresh_event_mappings in a daemon thread (returns the running thread if one is in progress)."""
+    global _REFRESH_THREAD
+    with _TABLE_LOCK:
+        if _REFRESH_THREAD is not None and _REFRESH_THREAD.is_alive():
+            return _REFRESH_THREAD
+        _REFRESH_THREAD = threading.Thread(target=refresh_event_mappings, kwargs={"url": url},
+                                           name="mappings-refresh", daemon=True)
+        _REFRESH_THREAD.start()
+        return _REFRESH_THREAD
+
+def wait_for_refresh(timeout: Optional[float] = None) -> bool:
+    """Wait (at most `timeout` seconds) for a background refresh. True if none is running anymore."""
+    t = _REFRESH_THREAD
+    if t is None:
+        return True
+    t.join(timeout)
+    return not t.is_alive()
 
 # convenience test helper (call from REPL)
 def test_fetch_csv(url: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -274,14 +434,174 @@ def test_fetch_csv(url: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     return fetch_mappings_from_csv_url(url)
 
-# initial load on import (uses env GS_CSV_URL by default)
+# --- apply_event_mapping memo ----------------------------------------
+# Bounded LRU keyed by (summary, EVENT_MAPPINGS_CONTENT_ID). A new table (new
+# content id, new EVENT_MAPPINGS_VERSION) drops the memo, an unchanged sheet keeps
+# it, and the memo is also dropped if EVENT_MAPPINGS is reassigned directly, so a
+# summary is mapped once per mappings table.
+MAPPING_MEMO_SIZE = int(os.environ.get("MAPPING_MEMO_SIZE", "2048"))
+EVENT_MAPPINGS_VERSION = 0
+EVENT_MAPPINGS_CONTENT_ID: Optional[str] = None
+_INSTALLED_TABLE = None  # the list _install_table put in EVENT_MAPPINGS
+_TABLE_LOCK = threading.Lock()
+_REFRESH_LOCK = threading.Lock()
+_REFRESH_THREAD: Optional[threading.Thread] = None
+_MAPPING_MEMO = OrderedDict()
+_MAPPING_MEMO_LOCK = threading.Lock()
+_MAPPING_MEMO_STATS = {"hits": 0, "misses": 0}
+_MAPPING_MEMO_TABLE = None  # the EVENT_MAPPINGS list the memo entries were computed from
+
+def clear_event_mapping_cache():
+    """Drop all memoized apply_event_mapping results (stats are kept)."""
+    with _MAPPING_MEMO_LOCK:
+        _MAPPING_MEMO.clear()
+
+def apply_event_mapping_cache_info() -> Dict[str, Any]:
+    """Return memo stats: hits, misses, size, maxsize, version, content_id."""
+    with _MAPPING_MEMO_LOCK:
+        return {
+            "hits": _MAPPING_MEMO_STATS["hits"],
+            "misses": _MAPPING_MEMO_STATS["misses"],
+            "size": len(_MAPPING_MEMO),
+            "maxsize": MAPPING_MEMO_SIZE,
+            "version": EVENT_MAPPINGS_VERSION,
+            "content_id": EVENT_MAPPINGS_CONTENT_ID,
+        }
+
+# --- compiled matcher ------------------------------------------------
+# One MappingMatcher per EVENT_MAPPINGS table (rebuilt when the list object changes,
+# i.e. on reload or direct reassignment).
+_MATCHER = None
+_MATCHER_TABLE = None
+_MATCHER_LOCK = threading.Lock()
+
+def get_mapping_matcher(table: Optional[List[Dict[str, Any]]] = None) -> MappingMatcher:
+    """Compiled matcher for `table` (default: the current EVENT_MAPPINGS)."""
+    global _MATCHER, _MATCHER_TABLE
+    table = EVENT_MAPPINGS if table is None else table
+    with _MATCHER_LOCK:
+        if _MATCHER is None or _MATCHER_TABLE is not table or _MATCHER.size != len(table):
+            _MATCHER = MappingMatcher(table)
+            _MATCHER_TABLE = table
+        return _MATCHER
+
+# --- rule profiler ---------------------------------------------------
+# One RuleProfiler per EVENT_MAPPINGS table, like the matcher. The slow-rule
+# warning is always on; the per-rule counters only with MAPPINGS_PROFILE=1.
+MAPPINGS_PROFILE = os.environ.get("MAPPINGS_PROFILE", "0") == "1"
+MAPPINGS_SLOW_RULE_MS = float(os.environ.get("MAPPINGS_SLOW_RULE_MS", "50"))
+_PROFILER = None
+_PROFILER_TABLE = None
+_PROFILER_LOCK = threading.Lock()
+
+def get_rule_profiler(table: Optional[List[Dict[str, Any]]] = None) -> RuleProfiler:
+    """Rule profiler for `table` (default: the current EVENT_MAPPINGS)."""
+    global _PROFILER, _PROFILER_TABLE
+    table = EVENT_MAPPINGS if table is None else table
+    with _PROFILER_LOCK:
+        if _PROFILER is None or _PROFILER_TABLE is not table or _PROFILER.size != len(table):
+            _PROFILER = RuleProfiler(table, collect=MAPPINGS_PROFILE, slow_ms=MAPPINGS_SLOW_RULE_MS)
+            _PROFILER_TABLE = table
+        return _PROFILER
+
+def rule_profile_report(top: int = 10) -> Dict[str, Any]:
+    """
+    Per-path (first_match / apply) slow and never-matched rules of the current table
+    (counters need MAPPINGS_PROFILE=1), plus the static shadowed / never_first_match lists.
+    """
+    return get_rule_profiler().report(top=top)
+
+def print_rule_profile_report(top: int = 10):
+    try:
+        print(format_rule_report(rule_profile_report(top=top)))
+    except Exception as ex:
+        print("[mappings] rule report failed:", ex)
+
+if MAPPINGS_PROFILE:
+    atexit.register(print_rule_profile_report)
+
+# --- tag index -------------------------------------------------------
+# casefolded token -> (tag text, rgb) for every keyword/replacement in a table,
+# built once per table and shared by data_provider's tag fallback and the
+# renderer's legacy tag_text parsing (one dict probe per token).
+_TAG_INDEX = None
+_TAG_INDEX_TABLE = None
+_TAG_INDEX_SIZE = 0
+_TAG_INDEX_LOCK = threading.Lock()
+
+def _rule_rgb(m: Dict[str, Any]):
+    raw = m.get("color_rgb")
+    if isinstance(raw, (list, tuple)) and len(raw) >= 3:
+        rgb = to_rgb(tuple(raw[:3]))
+        if rgb is not None:
+            return rgb
+    name = str(m.get("color") or m.get("color_name") or "").strip()
+    if not name:
+        return None
+    return to_rgb(name) or color_to_rgb(name)
+
+def build_tag_index(table) -> Dict[str, Tuple[str, Optional[Tuple[int, int, int]]]]:
+    """
+    Tag index for `table` (EVENT_MAPPINGS list, or a legacy {token: rule} dict).
+    The first rule in table order that gives a token a color wins.
+    """
+    index = {}
+    if isinstance(table, dict):
+        rules = [(str(k), v) for k, v in table.items()]
+    else:
+        rules = [(None, v) for v in (table or [])]
+    for extra_key, m in rules:
+        if not isinstance(m, dict):
+            continue
+        rgb = _rule_rgb(m)
+        text = str(m.get("replacement") or "").strip()
+        candidates = [extra_key] + [m.get(k) for k in ("keyword", "replacement", "token", "name")]
+        for val in candidates:
+            token = str(val or "").strip()
+            key = token.casefold()
+            if not key:
+                continue
+            cur = index.get(key)
+            if cur is None or (cur[1] is None and rgb is not None):
+                index[key] = (text or token, rgb)
+    return index
+
+def get_tag_index(table=None) -> Dict[str, Tuple[str, Optional[Tuple[int, int, int]]]]:
+    """Cached build_tag_index for `table` (default: the current EVENT_MAPPINGS). Do not mutate."""
+    global _TAG_INDEX, _TAG_INDEX_TABLE, _TAG_INDEX_SIZE
+    table = EVENT_MAPPINGS if table is None else table
+    with _TAG_INDEX_LOCK:
+        if _TAG_INDEX is None or _TAG_INDEX_TABLE is not table or _TAG_INDEX_SIZE != len(table):
+            _TAG_INDEX = build_tag_index(table)
+            _TAG_INDEX_TABLE = table
+            _TAG_INDEX_SIZE = len(table)
+        return _TAG_INDEX
+
+def lookup_tag(token: str, table=None):
+    """(tag text, rgb) for `token` (case-insensitive), or None."""
+    return get_tag_index(table).get(str(token or "").strip().casefold())
+
+def _copy_mapping_result(res: Dict[str, Any]) -> Dict[str, Any]:
+    # callers may mutate the result (and its tag dicts), so hand out copies
+    out = dict(res)
+    out["tags"] = [dict(t) for t in (res.get("tags") or [])]
+    return out
+
+# initial load on import: local table now, CSV refresh per MAPPINGS_REFRESH
 try:
-    reload_event_mappings()
+    _install_table(*load_local_event_mappings())
 except Exception as e:
     EVENT_MAPPINGS = [dict(m) for m in FALLBACK_EVENT_MAPPINGS]
     EVENT_MAPPINGS_SOURCE = "fallback"
     EVENT_MAPPINGS_LOADED_AT = time.time()
+    EVENT_MAPPINGS_VERSION += 1
     print(f"[mappings] init failed, using fallback: {e}")
+# fixture record/replay must see the CSV request at the same point every run
+_refresh_mode = "sync" if http_fixtures.active() and MAPPINGS_REFRESH != "off" else MAPPINGS_REFRESH
+if _refresh_mode == "sync":
+    refresh_event_mappings()
+elif _refresh_mode == "background" and (GS_CSV_URL or ""):
+    refresh_event_mappings_async()
 
 # --- matching helpers (unchanged) ------------------------------------
 def _match_text(text: str, keyword: str, match_type: str) -> Optional[re.Match]:
@@ -308,7 +628,39 @@ def _match_text(text: str, keyword: str, match_type: str) -> Optional[re.Match]:
     pattern = re.escape(keyword)
     return re.search(pattern, text, flags=re.IGNORECASE)
 
+def _mapping_info_result(m: Dict[str, Any], tstr: str, mm: re.Match) -> Dict[str, Any]:
+    start, end = mm.span()
+    remaining = (tstr[:start] + tstr[end:]).strip()
+    replacement_text = m.get("replacement") or ""
+    mode = (m.get("mode") or "").strip() or None
+    icon = m.get("icon") or None
+    size_px = int(m.get("size_px") or 18)
+    color_name = (m.get("color") or "").strip()
+    color_rgb = color_to_rgb(color_name) if color_name else None
+    return {
+        "icon": icon,
+        "replacement": replacement_text,
+        "mode": mode,
+        "color": color_name,
+        "color_rgb": color_rgb,
+        "size_px": size_px,
+        "remaining_text": remaining,
+        "match_span": (start, end),
+    }
+
 def mapping_info_for_event(text: str) -> Optional[Dict[str, Any]]:
+    """First mapping (in table order) whose keyword matches `text` under its match_type."""
+    if not text:
+        return None
+    tstr = str(text)
+    table = EVENT_MAPPINGS
+    idx, mm = get_mapping_matcher(table).first_match(tstr, get_rule_profiler(table))
+    if mm is None:
+        return None
+    return _mapping_info_result(table[idx], tstr, mm)
+
+def _mapping_info_for_event_linear(text: str) -> Optional[Dict[str, Any]]:
+    """Reference implementation: try every rule with _match_text (used by benchmark.py)."""
     if not text:
         return None
     tstr = str(text)
@@ -317,24 +669,7 @@ def mapping_info_for_event(text: str) -> Optional[Dict[str, Any]]:
         match_type = m.get("match_type", "prefix")
         mm = _match_text(tstr, kw, match_type)
         if mm:
-            start, end = mm.span()
-            remaining = (tstr[:start] + tstr[end:]).strip()
-            replacement_text = m.get("replacement") or ""
-            mode = (m.get("mode") or "").strip() or None
-            icon = m.get("icon") or None
-            size_px = int(m.get("size_px") or 18)
-            color_name = (m.get("color") or "").strip()
-            color_rgb = color_to_rgb(color_name) if color_name else None
-            return {
-                "icon": icon,
-                "replacement": replacement_text,
-                "mode": mode,
-                "color": color_name,
-                "color_rgb": color_rgb,
-                "size_px": size_px,
-                "remaining_text": remaining,
-                "match_span": (start, end),
-            }
+            return _mapping_info_result(m, tstr, mm)
     return None
 
 # export helper
@@ -354,14 +689,72 @@ def export_mappings_as_table() -> List[Dict[str, Any]]:
 
 # In mappings.py - add this function (one canonical copy)
 import re
-from PIL import ImageColor
 
 def apply_event_mapping(summary: str):
+    """
+    Memoized front for _apply_event_mapping_uncached (see there for the rules).
+    Results are cached per (summary, EVENT_MAPPINGS_CONTENT_ID); each call returns
+    its own copy. With MAPPINGS_PROFILE the rule evaluations are kept with the
+    entry and counted again on a memo hit, so the apply-path counters stay per call.
+    """
+    global _MAPPING_MEMO_TABLE
+    original = (summary or "").strip()
+    if MAPPING_MEMO_SIZE <= 0 or not original:
+        return _apply_event_mapping_uncached(summary)
+
+    table = EVENT_MAPPINGS
+    key = (original, EVENT_MAPPINGS_CONTENT_ID)
+    with _MAPPING_MEMO_LOCK:
+        if _MAPPING_MEMO_TABLE is not table:
+            _MAPPING_MEMO.clear()
+            _MAPPING_MEMO_TABLE = table
+        entry = _MAPPING_MEMO.get(key)
+        if entry is not None:
+            _MAPPING_MEMO.move_to_end(key)
+            _MAPPING_MEMO_STATS["hits"] += 1
+        else:
+            _MAPPING_MEMO_STATS["misses"] += 1
+    if entry is not None:
+        cached, trace = entry
+        if MAPPINGS_PROFILE and trace:
+            get_rule_profiler(table).record_memo_hit(trace, path=RULE_PATH_APPLY)
+        return _copy_mapping_result(cached)
+
+    trace = [] if MAPPINGS_PROFILE else None
+    res = _apply_event_mapping_uncached(original, trace=trace)
+    with _MAPPING_MEMO_LOCK:
+        if _MAPPING_MEMO_TABLE is table:
+            _MAPPING_MEMO[key] = (_copy_mapping_result(res), tuple(trace) if trace else None)
+            while len(_MAPPING_MEMO) > MAPPING_MEMO_SIZE:
+                _MAPPING_MEMO.popitem(last=False)
+    return res
+
+def apply_event_mapping_batch(summaries) -> List[Dict[str, Any]]:
+    """
+    apply_event_mapping for a whole list of summaries. Each distinct (stripped)
+    summary is mapped once; the results are aligned with the input and every
+    position gets its own copy.
+    """
+    keys = [str(s or "").strip() for s in summaries]
+    results = []
+    by_key = {}
+    for key in keys:
+        res = by_key.get(key)
+        if res is None:
+            res = by_key[key] = apply_event_mapping(key)
+            results.append(res)
+        else:
+            results.append(_copy_mapping_result(res))
+    return results
+
+def _apply_event_mapping_uncached(summary: str, use_matcher: bool = True, trace: Optional[list] = None):
     """
     Simple, deterministic mapping application.
 
     Rules:
-      - Iterate EVENT_MAPPINGS in order.
+      - Iterate EVENT_MAPPINGS in order (with use_matcher, only the rules the
+        compiled matcher reports as present; the list is recomputed whenever the
+        working text changes, so the result is the same as a full scan).
       - For each mapping, check if mapping['keyword'] (literal) is contained in the
         current working text (case-insensitive).
       - If mode starts with 'add_' -> collect icon/tag/color but DO NOT modify text.
@@ -369,6 +762,7 @@ def apply_event_mapping(summary: str):
           - 'replace_text' / 'replace_icon' -> remove first occurrence (case-insensitive)
           - 'replace_all' -> remove all occurrences (case-insensitive)
       - Build structured out dict with per-tag colors where possible.
+    trace: optional list that gets (rule index, keyword present) per evaluated rule.
     """
     original = (summary or "").strip()
     out = {
@@ -395,6 +789,9 @@ def apply_event_mapping(summary: str):
         mappings_list = []
 
     working = original
+    matcher = get_mapping_matcher(mappings_list) if use_matcher else None
+    pending = deque(matcher.contains_ids(working.lower()) if matcher else range(len(mappings_list)))
+    profiler = get_rule_profiler(mappings_list) if MAPPINGS_PROFILE else None
     collected_tags = []           # list of {"text":..., "color_name":..., "color_rgb":...}
     first_icon = None
     first_icon_size = None
@@ -403,7 +800,9 @@ def apply_event_mapping(summary: str):
     applied_any = False
     chosen_mode = None
 
-    for m in mappings_list:
+    while pending:
+        rule_idx = pending.popleft()
+        m = mappings_list[rule_idx]
         try:
             kw = (m.get("keyword") or "").strip()
             if not kw:
@@ -422,12 +821,20 @@ def apply_event_mapping(summary: str):
                     color_rgb = (int(color_rgb_raw[0]), int(color_rgb_raw[1]), int(color_rgb_raw[2]))
                 except Exception:
                     color_rgb = None
-            # fallback: if color_name present, will resolve later via ImageColor.getrgb/color_to_rgb
+            # fallback: if color_name present, will resolve later via color_to_rgb/color_registry
         except Exception:
             continue
 
         # case-insensitive contains test
-        if kw.lower() not in working.lower():
+        if profiler is not None:
+            t0 = time.perf_counter()
+            present = kw.lower() in working.lower()
+            profiler.record(rule_idx, time.perf_counter() - t0, present, working, path=RULE_PATH_APPLY)
+        else:
+            present = kw.lower() in working.lower()
+        if trace is not None:
+            trace.append((rule_idx, present))
+        if not present:
             # keyword not present in current working text -> skip
             continue
 
@@ -481,6 +888,9 @@ def apply_event_mapping(summary: str):
             working = new_working.strip()
             applied_any = True
             chosen_mode = chosen_mode or mode_l
+            if matcher:
+                # removing text can create or destroy keyword occurrences: rescan for later rules
+                pending = deque(i for i in matcher.contains_ids(working.lower()) if i > rule_idx)
         else:
             # If nothing changed, still mark applied if mode was replace_all (maybe kw equals casing?)
             if mode_l == "replace_all":
@@ -511,18 +921,11 @@ def apply_event_mapping(summary: str):
                 tag_obj.pop("color_rgb", None)
         elif t.get("color_name"):
             # attempt to convert name to rgb for convenience
-            try:
-                rgb = None
-                # prefer module helper if available
-                if "color_to_rgb" in globals() and callable(color_to_rgb):
-                    try:
-                        rgb = color_to_rgb(t.get("color_name"))
-                    except Exception:
-                        rgb = None
-                if rgb is None:
-                    rgb = ImageColor.getrgb(t.get("color_name"))
-                tag_obj["color_rgb"] = (int(rgb[0]), int(rgb[1]), int(rgb[2]))
-            except Exception:
+            # palette names first (color_to_rgb), then any name the registry knows
+            rgb = color_to_rgb(t.get("color_name")) or to_rgb(t.get("color_name"))
+            if rgb is not None:
+                tag_obj["color_rgb"] = rgb
+            else:
                 tag_obj["color_name"] = t.get("color_name")
         tags_out.append(tag_obj)
 
@@ -566,6 +969,22 @@ __all__ = [
     "reload_event_mappings",
     "test_fetch_csv",
     "mapping_info_for_event",
+    "apply_event_mapping",
+    "apply_event_mapping_batch",
+    "apply_event_mapping_cache_info",
+    "clear_event_mapping_cache",
+    "get_mapping_matcher",
+    "get_rule_profiler",
+    "rule_profile_report",
+    "print_rule_profile_report",
+    "get_tag_index",
+    "lookup_tag",
+    "refresh_event_mappings",
+    "mappings_version_id",
+    "EVENT_MAPPINGS_CONTENT_ID",
+    "refresh_event_mappings_async",
+    "wait_for_refresh",
+    "EVENT_MAPPINGS_VERSION",
     "color_to_rgb",
     "weather_to_icon",
     "export_mappings_as_table",
@@ -0,0 +1,150 @@
+# render_fingerprint.py
+"""
+Fingerprint av det som faktisk vises på skjermen.
+
+main kjører normalt render -> JPEG -> publisering hver gang, og hver ny
+output.jpg gir en treg (~30 s) full e-ink-oppdatering på rammen. Her bygges en
+normalisert "render-modell" av dataene: bare datoene som får en boks, eventene
+i dem, og værtekstene slik headeren tegner dem (samme hjelper,
+layout_renderer._header_weather_texts) pluss periode-ikonene. Hashen av modellen (pluss renderer-
+opsjonene, kildekoden til renderen og innholds-id-en til mapping-tabellen,
+siden renderen slår opp ikoner/tags selv) sammenlignes med siste publiserte
+frame; er den lik, hoppes render, koding og publisering over.
+
+Leser konfig fra miljøvariabler:
+  - RENDER_FINGERPRINT=0        (slå av, alltid render)
+  - RENDER_FINGERPRINT_PATH     (default: last_frame_fingerprint.json ved siden av denne filen)
+"""
+import os
+import json
+import time
+import hashlib
+
+RENDER_FINGERPRINT_ENABLED = os.environ.get("RENDER_FINGERPRINT", "1") != "0"
+RENDER_FINGERPRINT_PATH = os.environ.get("RENDER_FINGERPRINT_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "last_frame_fingerprint.json"))
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+# a code change in these files can change the picture without any data change
+_RENDER_SOURCES = ("layout_renderer.py", "main.py", "color_registry.py")
+_SIMPLE_TYPES = (str, int, float, bool, type(None))
+
+_source_digest = None
+
+
+def _renderer_source_digest():
+    global _source_digest
+    if _source_digest is None:
+        h = hashlib.sha256()
+        for name in _RENDER_SOURCES:
+            try:
+                with open(os.path.join(_HERE, name), "rb") as fh:
+                    h.update(fh.read())
+            except OSError:
+                h.update(name.encode())
+        _source_digest = h.hexdigest()
+    return _source_digest
+
+
+def _mappings_version():
+    try:
+        import mappings
+        return mappings.mappings_version_id()
+    except Exception:
+        return None
+
+
+def _palette_snap():
+    try:
+        import color_registry
+        return color_registry.COLOR_SNAP_TO_PALETTE
+    except Exception:
+        return None
+
+
+def _weather_model(entry, show_periods):
+    """The weather texts the day-box header draws (layout_renderer._header_weather_texts)."""
+    if not entry:
+        return None
+    from layout_renderer import _header_weather_texts, _period_rep_from_summary
+
+    model = _header_weather_texts(entry)
+    if show_periods and entry.get("periods"):
+        reps = {}
+        for name, summary in entry["periods"].items():
+            rep = _period_rep_from_summary(summary)
+            reps[name] = (rep["icon_key"], rep["label"])
+        model["periods"] = reps
+    return model
+
+
+def _event_model(ev):
+    d = ev.as_dict() if hasattr(ev, "as_dict") else dict(ev)
+    return {k: v for k, v in d.items() if v is not None}
+
+
+def render_model(data, days, opts):
+    """
+    Normalized model of what render_calendar draws for `data`: the first `days`
+    event dates (one box each), their events, and the rounded weather values.
+    """
+    data = data or {}
+    groups = {}
+    for ev in data.get("events", []) or []:
+        groups.setdefault(ev.get("date", "unknown"), []).append(ev)
+    weather_by_date = {}
+    for w in data.get("weather", []) or []:
+        weather_by_date.setdefault(w.get("date"), w)
+    show_periods = bool((opts or {}).get("show_period_weather", False))
+    boxes = []
+    for d in sorted(groups.keys())[:days]:
+        boxes.append({
+            "date": d,
+            "events": [_event_model(ev) for ev in groups[d]],
+            "weather": _weather_model(weather_by_date.get(d), show_periods),
+        })
+    simple_opts = {k: v for k, v in (opts or {}).items()
+                   if isinstance(v, _SIMPLE_TYPES) or (isinstance(v, (list, tuple)) and all(isinstance(x, _SIMPLE_TYPES) for x in v))}
+    return {"days": days, "boxes": boxes, "opts": simple_opts, "renderer": _renderer_source_digest(),
+            "mappings": _mappings_version(), "palette_snap": _palette_snap()}
+
+
+def fingerprint(data, days, opts):
+    """sha256 hex digest of render_model(data, days, opts)."""
+    model = render_model(data, days, opts)
+    blob = json.dumps(model, sort_keys=True, ensure_ascii=False, default=str, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def load_last_fingerprint(path=None):
+    """Stored record of the last published frame ({"fingerprint", "published_at", "outputs"}), or {}."""
+    try:
+        with open(path or RENDER_FINGERPRINT_PATH, "r", encoding="utf-8") as fh:
+            return json.load(fh) or {}
+    except Exception:
+        return {}
+
+
+def frame_unchanged(fp, outputs=(), path=None):
+    """True if `fp` matches the last published frame and its output files still exist."""
+    if not RENDER_FINGERPRINT_ENABLED or not fp:
+        return False
+    last = load_last_fingerprint(path)
+    if last.get("fingerprint") != fp:
+        return False
+    return all(os.path.exists(p) for p in (outputs or last.get("outputs") or []))
+
+
+def save_fingerprint(fp, outputs=(), path=None):
+    """Remember `fp` as the published frame. Never raises."""
+    if not RENDER_FINGERPRINT_ENABLED or not fp:
+        return False
+    path = path or RENDER_FINGERPRINT_PATH
+    try:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"fingerprint": fp, "published_at": time.time(), "outputs": list(outputs)}, fh, indent=1)
+        os.replace(tmp, path)
+        return True
+    except Exception as ex:
+        print("[fingerprint] failed to save:", ex)
+        return False
@@ -2,8 +2,9 @@
 # Requires: pip install requests pillow
 import os
 import math
-import requests
 from io import BytesIO
+import http_fixtures
+import http_client
 from PIL import Image, ImageDraw, ImageFont
 
 # ----------------- CONFIG -----------------
@@ -22,6 +23,9 @@ TRICOLOR = True          # True => allow red, False => map to b/w (red -> black)
 if GOOGLE_API_KEY is None or GOOGLE_API_KEY.strip() == "":
     raise SystemExit("Set GOOGLE_API_KEY environment variable or paste key in script.")
 
+# record/replay all map/tile/directions requests when HTTP_FIXTURES_MODE is set
+http_fixtures.install_from_env()
+
 # ---------- polyline decoder (Google/OSM polyline) ----------
 def decode_polyline(polyline_str):
     # returns list of (lat, lon)
@@ -68,7 +72,7 @@ def tilexy_to_pixels(xtile, ytile, tile_size=256):
 # ---------- tile fetching & stitching ----------
 def get_tile(z, x, y):
     url = TILE_URL.format(z=z, x=int(x), y=int(y))
-    r = requests.get(url, timeout=10)
+    r = http_client.get(url)
     r.raise_for_status()
     return Image.open(BytesIO(r.content)).convert("RGBA")
 
@@ -127,7 +131,7 @@ def fetch_directions(origin, destination, api_key):
         "mode": "driving",
         "alternatives": "false"
     }
-    r = requests.get(url, params=params, timeout=10)
+    r = http_client.get(url, params=params)
     r.raise_for_status()
     doc = r.json()
     if doc.get("status") != "OK":
@@ -0,0 +1,91 @@
+# snapshot_store.py
+"""
+Siste gode data per kilde ("last-good snapshots").
+
+Hver gang en kilde (gcal, holidays, movar, weather) henter data uten feil,
+lagres resultatet som en snapshot på disk. Feiler kilden senere, eller
+bruker den lenger enn tidsbudsjettet, kan initial_fetch_all levere den
+siste snapshoten umiddelbart (merket med alder i meta["stale_sources"])
+mens hentingen fortsetter i bakgrunnen og oppdaterer snapshoten når den
+blir ferdig. Slik blir ikke skjermen blank når Google eller MET er nede.
+
+Leser konfig fra miljøvariabler:
+  - SNAPSHOT_DIR             (default: .snapshots ved siden av denne filen)
+  - SNAPSHOT_MAX_AGE_HOURS   (eldre snapshots brukes ikke, default 72)
+  - SNAPSHOTS=0              (slå av snapshots helt)
+"""
+import os
+import re
+import json
+import time
+import threading
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".snapshots"))
+SNAPSHOT_MAX_AGE_HOURS = float(os.environ.get("SNAPSHOT_MAX_AGE_HOURS", "72"))
+SNAPSHOTS_ENABLED = os.environ.get("SNAPSHOTS", "1") != "0"
+
+_lock = threading.Lock()
+
+
+def _path(name):
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(name))
+    return os.path.join(SNAPSHOT_DIR, f"{safe}.json")
+
+
+def _json_default(obj):
+    # Event records (and anything else dict-like with as_dict) are stored as plain dicts
+    if hasattr(obj, "as_dict"):
+        return obj.as_dict()
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    return str(obj)
+
+
+def save_snapshot(name, value):
+    """Store `value` as the last good result for source `name`. Never raises."""
+    if not SNAPSHOTS_ENABLED:
+        return False
+    try:
+        payload = json.dumps({"saved_at": time.time(), "value": value}, ensure_ascii=False, default=_json_default)
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        path = _path(name)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with _lock:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(payload)
+            os.replace(tmp, path)
+        return True
+    except Exception as ex:
+        print(f"[snapshot] failed to save {name}:", ex)
+        return False
+
+
+def load_snapshot(name, max_age=None):
+    """
+    Return (value, age_seconds) for the last good result of `name`, or
+    (None, None) if there is none or it is older than max_age seconds
+    (default SNAPSHOT_MAX_AGE_HOURS). Tuples come back as lists.
+    """
+    if not SNAPSHOTS_ENABLED:
+        return None, None
+    max_age = SNAPSHOT_MAX_AGE_HOURS * 3600 if max_age is None else max_age
+    try:
+        with open(_path(name), "r", encoding="utf-8") as fh:
+            stored = json.load(fh)
+        age = max(0.0, time.time() - float(stored.get("saved_at", 0)))
+        if age > max_age:
+            return None, None
+        return stored.get("value"), age
+    except Exception:
+        return None, None
+
+
+def snapshot_age(name):
+    """Age in seconds of the usable snapshot for `name`, or None."""
+    if not SNAPSHOTS_ENABLED:
+        return None
+    try:
+        age = time.time() - os.path.getmtime(_path(name))
+    except OSError:
+        return None
+    return age if age <= SNAPSHOT_MAX_AGE_HOURS * 3600 else None
@@ -0,0 +1,24 @@
+# tests/conftest.py
+"""
+Felles oppsett for testene: repo-roten på sys.path, og miljøvariabler som
+holder importene borte fra nettverket og fra state-filene ved siden av koden
+(mapping-arket, HTTP-cachen, circuit-breaker- og fingerprint-filene).
+
+Kjør fra repo-roten:
+  python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+_STATE_DIR = tempfile.mkdtemp(prefix="inky_tests_")
+os.environ.setdefault("MAPPINGS_REFRESH", "off")
+os.environ.setdefault("HTTP_FIXTURES_MODE", "")
+os.environ.setdefault("HTTP_CACHE_DIR", os.path.join(_STATE_DIR, "http_cache"))
+os.environ.setdefault("CIRCUIT_STATE_PATH", os.path.join(_STATE_DIR, "circuit_breaker_state.json"))
+os.environ.setdefault("RENDER_FINGERPRINT_PATH", os.path.join(_STATE_DIR, "last_frame_fingerprint.json"))
+os.environ.setdefault("WEATHER_CELL_CACHE_PATH", os.path.join(_STATE_DIR, "weather_cell_cache.json"))
@@ -0,0 +1,110 @@
+# tests/test_circuit_breaker.py
+import json
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(circuit_breaker.time, "time", c.time)
+    return c
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "circuit.json")
+
+
+def _breaker(path, **kw):
+    kw.setdefault("threshold", 2)
+    kw.setdefault("base_cooldown", 60)
+    kw.setdefault("max_cooldown", 200)
+    return CircuitBreaker(path=path, **kw)
+
+
+def test_opens_after_threshold_and_probes_after_cooldown(path, clock):
+    b = _breaker(path)
+    b.record_failure("MET")
+    assert b.allow("MET") and b.state("MET")["state"] == CLOSED
+    b.record_failure("MET")
+    assert b.state("MET")["state"] == OPEN
+    assert not b.allow("MET")
+
+    clock.now += 61
+    assert b.allow("MET")                # the single half-open probe
+    assert b.state("MET")["state"] == HALF_OPEN
+    assert not b.allow("MET")            # no second request while the probe is out
+
+    b.record_success("MET")
+    assert b.state("MET") == {"state": CLOSED, "failures": 0, "cooldown": 0.0, "opened_at": 0.0}
+    assert b.allow("MET")
+
+
+def test_failed_probe_doubles_cooldown_up_to_max(path, clock):
+    b = _breaker(path, threshold=1)
+    b.record_failure("MET")
+    cooldowns = []
+    for _ in range(3):
+        clock.now += 1000
+        assert b.allow("MET")
+        b.record_failure("MET")
+        cooldowns.append(b.state("MET")["cooldown"])
+    assert cooldowns == [120, 200, 200]
+
+
+def test_stuck_probe_is_given_up(path, clock):
+    b = _breaker(path, threshold=1)
+    b.record_failure("MET")
+    clock.now += 61
+    assert b.allow("MET")
+    clock.now += circuit_breaker._PROBE_TIMEOUT + 1
+    assert b.allow("MET")
+
+
+def test_state_is_shared_through_the_file(path, clock):
+    _breaker(path, threshold=1).record_failure("MET")
+    assert not _breaker(path).allow("MET")
+
+
+def test_concurrent_processes_keep_each_others_hosts(path, clock):
+    a = _breaker(path, threshold=1)
+    b = _breaker(path, threshold=1)
+    a.state("X")
+    b.state("X")  # both have loaded the (empty) file
+    a.record_failure("MET")
+    b.record_failure("GOOGLE")
+    with open(path, encoding="utf-8") as fh:
+        hosts = json.load(fh)["hosts"]
+    assert hosts["MET"]["state"] == OPEN and hosts["GOOGLE"]["state"] == OPEN
+
+    a.reset("MET")
+    fresh = _breaker(path)
+    assert fresh.state("MET")["state"] == CLOSED
+    assert fresh.state("GOOGLE")["state"] == OPEN
+    b.reset()
+    assert _breaker(path).state("GOOGLE")["state"] == CLOSED
+
+
+def test_adapter_rejects_while_open(monkeypatch, path, clock):
+    import http_client
+
+    b = _breaker(path, threshold=1)
+    b.record_failure("EXAMPLE_INVALID")
+    monkeypatch.setattr(circuit_breaker, "get_breaker", lambda: b)
+    monkeypatch.setattr(circuit_breaker, "CIRCUIT_BREAKER_ENABLED", True)
+    s = http_client.new_session()
+    with pytest.raises(circuit_breaker.CircuitOpenError):
+        s.get("http://example.invalid/x", timeout=1)
+    s.close()
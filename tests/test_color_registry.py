@@ -0,0 +1,157 @@
+# tests/test_color_registry.py
+import re
+
+import pytest
+from PIL import ImageColor
+
+import color_registry
+import layout_renderer
+import mappings
+from color_registry import (BLACK, INKY_COLORS, INKY_PALETTE_INDEXED, WHITE, contrast_fg_index,
+                            nearest_palette_index, palette_index, resolve_color, to_rgb)
+
+
+# --- the ImageColor-based helpers color_registry replaced (verbatim copies) ---
+def _old_color_to_rgb(name):
+    if not name:
+        return None
+    k = str(name).strip().lower()
+    if k in INKY_COLORS:
+        return INKY_COLORS[k]
+    try:
+        if k.startswith("#") and (len(k) == 7 or len(k) == 4):
+            if len(k) == 4:
+                r = int(k[1]*2, 16)
+                g = int(k[2]*2, 16)
+                b = int(k[3]*2, 16)
+                return (r, g, b)
+            r = int(k[1:3], 16)
+            g = int(k[3:5], 16)
+            b = int(k[5:7], 16)
+            return (r, g, b)
+        if k.startswith("rgb"):
+            nums = re.findall(r"[-]?\d+", k)
+            if len(nums) >= 3:
+                return (int(nums[0]), int(nums[1]), int(nums[2]))
+    except Exception:
+        pass
+    return None
+
+
+def _old_normalize_color_input(col):
+    try:
+        if col is None:
+            return (0, 0, 0)
+        if isinstance(col, int):
+            c = max(0, min(255, col))
+            return (c, c, c)
+        if isinstance(col, (tuple, list)):
+            return (col[0], col[1], col[2])
+        if isinstance(col, str):
+            return ImageColor.getrgb(col)
+    except Exception:
+        pass
+    return (0, 0, 0)
+
+
+def _old_normalize_bg(bg):
+    try:
+        if isinstance(bg, (tuple, list)):
+            if len(bg) == 3:
+                return (bg[0], bg[1], bg[2], 255)
+            if len(bg) == 4:
+                return tuple(bg)
+        if isinstance(bg, int):
+            return (bg, bg, bg, 255)
+        if isinstance(bg, str):
+            rgb = ImageColor.getrgb(bg)
+            return (rgb[0], rgb[1], rgb[2], 255)
+    except Exception:
+        pass
+    return (255, 255, 255, 255)
+
+
+def _old_luminance_from_color(col):
+    try:
+        if isinstance(col, int):
+            return col / 255.0
+        if isinstance(col, (tuple, list)):
+            r = col[0] / 255.0
+            g = col[1] / 255.0
+            b = col[2] / 255.0
+            return 0.299 * r + 0.587 * g + 0.114 * b
+        if isinstance(col, str):
+            rgb = ImageColor.getrgb(col)
+            r = rgb[0] / 255.0
+            g = rgb[1] / 255.0
+            b = rgb[2] / 255.0
+            return 0.299 * r + 0.587 * g + 0.114 * b
+    except Exception:
+        pass
+    return 1.0
+
+
+NAMES = ["red", "Blue", "green", "orange", "yellow", "white", "black", "navy", "lightgray", "#ff0000", "#F80",
+         "#12ab9c", "rgb(10, 20, 30)", "rgb(100%, 0%, 50%)", "hsl(120, 100%, 25%)"]
+BAD = ["", "bogus", "#12345", "rgb(1, 2)"]
+CHIPS = NAMES + [(1, 2, 3), [200, 100, 0], (9, 8, 7, 6), 0, 128, 255]
+
+
+@pytest.mark.parametrize("name", NAMES)
+def test_resolve_matches_imagecolor(name):
+    assert resolve_color(name, snap=False).rgb == ImageColor.getrgb(name)[:3]
+
+
+@pytest.mark.parametrize("value", BAD + [None, True, 1.5, {"r": 1}, ([1], 2, 3)])
+def test_unresolvable_inputs(value):
+    assert resolve_color(value) is None
+    assert to_rgb(value, "dflt") == "dflt"
+
+
+@pytest.mark.parametrize("name", NAMES + BAD + [" red ", "RGB(1,2,3)", "rgb(300, 0, 0)", "#ff0000ff", None])
+def test_color_to_rgb_matches_old(name):
+    assert mappings.color_to_rgb(name) == _old_color_to_rgb(name)
+
+
+@pytest.mark.parametrize("value", CHIPS + BAD + [None, -5, 300])
+def test_normalize_color_input_matches_old(value):
+    assert layout_renderer._normalize_color_input(value) == tuple(_old_normalize_color_input(value))[:3]
+
+
+@pytest.mark.parametrize("value", CHIPS + BAD)
+def test_normalize_bg_matches_old(value):
+    assert layout_renderer._normalize_bg(value) == _old_normalize_bg(value)
+
+
+@pytest.mark.parametrize("value", CHIPS + BAD)
+def test_luminance_matches_old(value):
+    assert layout_renderer._luminance_from_color(value) == pytest.approx(_old_luminance_from_color(value))
+
+
+def test_palette_index_and_snap():
+    for i, rgb in enumerate(INKY_PALETTE_INDEXED):
+        assert nearest_palette_index(rgb) == i
+    assert palette_index("#fa1010") == 2
+    assert palette_index("bogus", default=-1) == -1
+    assert resolve_color((250, 10, 10), snap=True).rgb == (255, 0, 0)
+    assert resolve_color((250, 10, 10), snap=False).rgb == (250, 10, 10)
+    info = resolve_color("red", snap=False)
+    assert info.palette_rgb == (255, 0, 0) and info.index == 2
+
+
+def test_contrast_foreground():
+    assert contrast_fg_index((255, 0, 0)) == WHITE
+    assert contrast_fg_index((0, 0, 255)) == WHITE
+    assert contrast_fg_index((0, 0, 0)) == WHITE
+    assert contrast_fg_index((255, 255, 0)) == BLACK
+    assert contrast_fg_index((255, 255, 255)) == BLACK
+    assert resolve_color("yellow").fg_rgb == (0, 0, 0)
+
+
+def test_results_are_cached():
+    color_registry.clear_color_cache()
+    resolve_color("#123456")
+    resolve_color("#123456")
+    resolve_color([0x12, 0x34, 0x56])
+    info = color_registry.color_cache_info()
+    assert info.misses == 2 and info.hits == 1
@@ -0,0 +1,80 @@
+# tests/test_event_store.py
+import json
+import random
+
+import pytest
+
+from event_store import Event, EventStore, event_key, intern_rgb
+
+
+def _old_dedup(events):
+    # the O(n^2) pattern EventStore replaces
+    out = []
+    for ev in events:
+        if not any(e["date"] == ev["date"] and e["name"] == ev["name"] and e.get("time", "") == ev.get("time", "") for e in out):
+            out.append(ev)
+    return out
+
+
+def test_first_event_with_a_key_wins():
+    store = EventStore()
+    assert store.add({"date": "2026-01-02", "name": "A", "time": "10:00", "icon": "first"})
+    assert not store.add({"date": "2026-01-02", "name": "A", "time": "10:00", "icon": "second"})
+    assert store.add({"date": "2026-01-02", "name": "A", "time": "11:00"})
+    assert len(store) == 2
+    assert store.to_list()[0]["icon"] == "first"
+    assert {"date": "2026-01-02", "name": "A", "time": "10:00"} in store
+
+
+def test_matches_old_dedup_and_sorts_stably():
+    rnd = random.Random(5)
+    events = [{"date": f"2026-01-{rnd.randint(1, 5):02d}", "name": rnd.choice("ABC"),
+               "time": rnd.choice(["", "09:00", "12:00"]), "n": i} for i in range(300)]
+    store = EventStore(events)
+    expected = sorted(_old_dedup(events), key=lambda e: (e["date"], e["time"]))
+    assert store.to_list() == expected
+    assert [e["n"] for e in store] == [e["n"] for e in expected]
+
+
+def test_extend_counts_inserted():
+    store = EventStore()
+    evs = [{"date": "d", "name": "x"}, {"date": "d", "name": "x"}, {"date": "d", "name": "y"}]
+    assert store.extend(evs) == 2
+    assert bool(store) and not EventStore()
+
+
+def test_custom_key():
+    store = EventStore(key=lambda ev: ev["name"])
+    store.add({"date": "1", "name": "a"})
+    store.add({"date": "2", "name": "a"})
+    assert len(store) == 1
+    assert event_key({"date": "1", "name": "a"}) == ("1", "a", "")
+
+
+def test_event_behaves_like_a_dict():
+    d = {"date": "2026-01-02", "name": "Middag", "tags": [], "custom": 1}
+    ev = Event.from_dict(d)
+    assert ev == d and dict(ev.items()) == d
+    assert "tags" in ev and "icon" not in ev
+    assert ev.get("icon") is None and ev.get("icon", "x") == "x"
+    assert ev["custom"] == 1
+    with pytest.raises(KeyError):
+        ev["icon"]
+    ev.update({"icon": "star"}, time="10:00")
+    assert ev.setdefault("icon", "other") == "star"
+    assert ev.pop("custom") == 1 and ev.pop("custom", None) is None
+    cp = ev.copy()
+    cp["name"] = "Annet"
+    assert ev["name"] == "Middag"
+    del ev["icon"]
+    assert "icon" not in ev
+    assert json.loads(json.dumps(ev.as_dict())) == ev.as_dict()
+
+
+def test_colors_and_short_fields_are_interned():
+    a = Event(date="".join(["2026-", "01-02"]), tag_color_rgb=[255, 0, 0])
+    b = Event(date="2026-01-02", tag_color_rgb=(255, 0, 0))
+    assert a["tag_color_rgb"] == (255, 0, 0)
+    assert a["tag_color_rgb"] is b["tag_color_rgb"]
+    assert a["date"] is b["date"]
+    assert intern_rgb("red") == "red" and intern_rgb(None) is None
@@ -0,0 +1,93 @@
+# tests/test_fetch_engine.py
+import time
+
+from fetch_engine import MISSING, missing_sources, run_sources
+
+
+def _after(seconds, value):
+    def fn():
+        time.sleep(seconds)
+        return value
+    return fn
+
+
+def _boom():
+    raise RuntimeError("boom")
+
+
+def test_results_timeouts_and_errors():
+    report = {}
+    t0 = time.monotonic()
+    res = run_sources({
+        "fast": (_after(0.0, 1), 2),
+        "slow": (_after(2.0, 2), 0.2),
+        "broken": _boom,
+    }, deadline=5, report=report)
+    assert time.monotonic() - t0 < 1.5
+    assert res["fast"] == 1
+    assert res["slow"] is MISSING
+    assert res["broken"] is MISSING
+    assert report["fast"]["status"] == "ok"
+    assert report["slow"]["status"] == "timeout"
+    assert report["broken"] == {"status": "error", "elapsed": report["broken"]["elapsed"], "error": "boom"}
+    assert missing_sources(res) == ["broken", "slow"]
+
+
+def test_global_deadline():
+    t0 = time.monotonic()
+    res = run_sources({"a": _after(2.0, "a"), "b": (_after(2.0, "b"), 10)}, deadline=0.3)
+    assert time.monotonic() - t0 < 1.5
+    assert res == {"a": MISSING, "b": MISSING}
+
+
+def test_timeout_counts_from_start_not_from_queueing():
+    # one worker: "second" waits for "first", but still gets its full own timeout
+    res = run_sources({
+        "first": (_after(0.4, 1), 1),
+        "second": (_after(0.4, 2), 0.6),
+    }, max_workers=1, deadline=5)
+    assert res == {"first": 1, "second": 2}
+
+
+def test_grace_only_caps_the_named_sources():
+    report = {}
+    t0 = time.monotonic()
+    res = run_sources({
+        "first": (_after(0.0, "first"), 5),
+        "met": (_after(0.6, "met"), 5),
+        "om": (_after(3.0, "om"), 5),
+    }, deadline=5, report=report, grace=0.2, grace_only=("om",))
+    elapsed = time.monotonic() - t0
+    # met is outside grace_only and is awaited past the grace window; om is cut off
+    assert res["met"] == "met"
+    assert res["om"] is MISSING and report["om"]["status"] == "timeout"
+    assert elapsed < 2.0
+
+
+def test_grace_applies_to_all_without_grace_only():
+    res = run_sources({
+        "first": (_after(0.0, "first"), 5),
+        "late": (_after(2.0, "late"), 5),
+    }, deadline=5, grace=0.2)
+    assert res == {"first": "first", "late": MISSING}
+
+
+def test_grace_per_source():
+    report = {}
+    t0 = time.monotonic()
+    res = run_sources({
+        "om": (_after(0.0, "om"), 5),
+        "met": (_after(0.4, "met"), 5),
+        "slow_met": (_after(3.0, "slow_met"), 5),
+        "other": (_after(0.6, "other"), 5),
+    }, deadline=5, report=report, grace={"met": 1.0, "slow_met": 0.8})
+    # each named source gets its own window after the first answer; unnamed ones are not capped
+    assert res == {"om": "om", "met": "met", "slow_met": MISSING, "other": "other"}
+    assert report["slow_met"]["status"] == "timeout"
+    assert time.monotonic() - t0 < 2.0
+
+
+def test_missing_is_a_falsy_singleton():
+    assert not MISSING
+    assert repr(MISSING) == "MISSING"
+    assert type(MISSING)() is MISSING
@@ -0,0 +1,131 @@
+# tests/test_http_cache.py
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+import http_cache
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    hits = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _count(self, kind):
+        self.hits[kind] = self.hits.get(kind, 0) + 1
+
+    def do_GET(self):
+        if self.path.startswith("/fresh"):
+            self._send(200, b'{"fresh": true}', Expires=formatdate(time.time() + 60, usegmt=True))
+            self._count("full")
+            return
+        if self.path.startswith("/nostore"):
+            self._send(200, b'{"n": 1}', **{"Cache-Control": "no-store"})
+            self._count("full")
+            return
+        if self.path.startswith("/missing"):
+            self._send(404, b"nope")
+            self._count("full")
+            return
+        if self.headers.get("If-None-Match") == '"v1"':
+            self._send(304, b"", ETag='"v1"')
+            self._count("not_modified")
+            return
+        self._send(200, b'{"payload": [1, 2, 3]}', ETag='"v1"', **{"Cache-Control": "no-cache"})
+        self._count("full")
+
+    def _send(self, status, body, **headers):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_cache, "HTTP_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(http_cache, "HTTP_CACHE_ENABLED", True)
+    _StandIn.hits = {}
+    srv = HTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_port}", _StandIn.hits
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def session():
+    s = requests.Session()
+    yield s
+    s.close()
+
+
+def test_fresh_entry_served_from_disk(server, session):
+    base, hits = server
+    r1 = http_cache.cached_get(base + "/fresh", session=session)
+    r2 = http_cache.cached_get(base + "/fresh", session=session)
+    assert r1.json() == r2.json() == {"fresh": True}
+    assert not r1.from_cache and r2.from_cache
+    assert hits == {"full": 1}
+
+
+def test_etag_revalidation_reuses_body_and_parse(server, session):
+    base, hits = server
+    parses = []
+
+    def parse(resp):
+        parses.append(1)
+        return resp.json()
+
+    v1, r1 = http_cache.cached_get_parsed(base + "/etag", parse, "t-v1", session=session)
+    v2, r2 = http_cache.cached_get_parsed(base + "/etag", parse, "t-v1", session=session)
+    assert v1 == v2 == {"payload": [1, 2, 3]}
+    assert r2.revalidated and not r2.from_cache
+    assert len(parses) == 1
+    assert hits == {"full": 1, "not_modified": 1}
+
+    # another parser id parses the cached body again
+    v3, _ = http_cache.cached_get_parsed(base + "/etag", parse, "t-v2", session=session)
+    assert v3 == v1 and len(parses) == 2
+
+
+def test_no_store_and_errors_are_not_cached(server, session):
+    base, hits = server
+    for _ in range(2):
+        assert http_cache.cached_get(base + "/nostore", session=session).json() == {"n": 1}
+    v, r = http_cache.cached_get_parsed(base + "/missing", lambda resp: 1 / 0, "t", session=session)
+    assert v is None and r.status_code == 404 and not r.ok
+    http_cache.cached_get(base + "/missing", session=session)
+    assert hits == {"full": 4}
+
+
+def test_disabled_cache_goes_to_network(server, session, monkeypatch):
+    base, hits = server
+    monkeypatch.setattr(http_cache, "HTTP_CACHE_ENABLED", False)
+    http_cache.cached_get(base + "/fresh", session=session)
+    r = http_cache.cached_get(base + "/fresh", session=session)
+    assert not r.from_cache and hits == {"full": 2}
+
+
+def test_cache_key_ignores_volatile_headers():
+    k = http_cache.cache_key("https://x/y", {"b": 2, "a": 1}, {"User-Agent": "one", "Accept": "json"})
+    assert k == http_cache.cache_key("https://x/y", {"a": 1, "b": 2}, {"user-agent": "two", "accept": "json"})
+    assert k != http_cache.cache_key("https://x/y", {"a": 1, "b": 3}, {"Accept": "json"})
+
+
+def test_expires_at():
+    now = 1_000_000.0
+    assert http_cache._expires_at({"Cache-Control": "no-store"}, now) is None
+    assert http_cache._expires_at({"Cache-Control": "no-cache", "Expires": formatdate(now + 60, usegmt=True)}, now) == 0
+    assert http_cache._expires_at({"Cache-Control": "public, max-age=30"}, now) == now + 30
+    assert http_cache._expires_at({"Expires": formatdate(now + 60, usegmt=True)}, now) == now + 60
+    assert http_cache._expires_at({}, now) == 0
@@ -0,0 +1,102 @@
+# tests/test_mapping_matcher.py
+import random
+
+import pytest
+
+import mappings
+from mapping_matcher import AhoCorasick, MappingMatcher, fold
+
+RULES = [
+    {"keyword": "Middag:", "match_type": "prefix", "mode": "replace_text", "replacement": "Middag", "color": "green"},
+    {"keyword": "Husk", "match_type": "startswith", "mode": "replace_text", "replacement": "Husk", "color": "red"},
+    {"keyword": "G16 IK", "match_type": "contains", "mode": "add_tag", "replacement": "G16"},
+    {"keyword": "Oslo", "match_type": "contains", "mode": "add_icon", "icon": "city"},
+    {"keyword": "tur", "match_type": "endswith", "mode": "add_icon", "icon": "hike"},
+    {"keyword": "Ferie", "match_type": "exact", "mode": "replace_all", "replacement": "Ferie", "color": "#00aa00"},
+    {"keyword": r"uke\s*\d+", "match_type": "regex", "mode": "add_tag", "replacement": "Uke"},
+    {"keyword": "([", "match_type": "regex", "mode": "add_tag", "replacement": "Broken"},
+    {"keyword": "Amalie", "match_type": "contains", "mode": "replace_all", "replacement": "A", "color": "orange"},
+    {"keyword": "amalie bursdag", "match_type": "contains", "mode": "add_tag", "replacement": "Bursdag"},
+    {"keyword": "Straße", "match_type": "contains", "mode": "add_tag", "replacement": "Gate"},
+    {"keyword": "kino", "match_type": "contains", "mode": "add_icon", "icon": "film"},
+    {"keyword": "Skole", "match_type": "weird", "mode": "replace_text", "replacement": "Skole"},
+    {"keyword": "", "match_type": "contains", "mode": "add_tag", "replacement": "never"},
+    {"keyword": "Sigrid", "match_type": "prefix", "mode": "", "replacement": "S", "color_rgb": [1, 2, 3]},
+]
+
+_WORDS = ["Middag:", "middag", "Husk:", "husk", "G16 IK", "g16 ik", "Oslo", "OSLO", "tur", "Ferie", "ferie ",
+          "uke 42", "UKE7", "([", "Amalie", "amalie bursdag", "Straße", "STRASSE", "Kino", "kino", "Skole",
+          "Sigrid", "pasta", "med", "og", "trening", "  ", ":", "æøå", "İstanbul", "\u212aino", "ſkole"]
+
+
+def _texts(n=600, seed=7):
+    rnd = random.Random(seed)
+    out = [w for w in _WORDS]
+    for _ in range(n):
+        out.append(" ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(1, 5))))
+    return out
+
+
+def _linear_first_match(rules, text):
+    for i, m in enumerate(rules):
+        mm = mappings._match_text(text, m.get("keyword", ""), m.get("match_type", "prefix"))
+        if mm:
+            return i, mm.span()
+    return None, None
+
+
+@pytest.fixture
+def table(monkeypatch):
+    rules = [dict(m) for m in RULES]
+    monkeypatch.setattr(mappings, "EVENT_MAPPINGS", rules)
+    mappings.clear_event_mapping_cache()
+    yield rules
+    mappings.clear_event_mapping_cache()
+
+
+def test_first_match_equals_linear_scan():
+    matcher = MappingMatcher(RULES)
+    for text in _texts():
+        idx, mm = matcher.first_match(text)
+        assert (idx, mm.span() if mm else None) == _linear_first_match(RULES, text), text
+
+
+def test_apply_matcher_equals_full_scan(table):
+    for text in _texts():
+        assert mappings._apply_event_mapping_uncached(text, use_matcher=True) == \
+            mappings._apply_event_mapping_uncached(text, use_matcher=False), text
+
+
+def test_mapping_info_equals_linear(table):
+    for text in _texts(200):
+        assert mappings.mapping_info_for_event(text) == mappings._mapping_info_for_event_linear(text), text
+
+
+def test_apply_memo_returns_copies(table):
+    a = mappings.apply_event_mapping("Middag: pasta med Amalie")
+    a["tags"].append({"text": "mutated"})
+    b = mappings.apply_event_mapping("Middag: pasta med Amalie")
+    assert b == mappings._apply_event_mapping_uncached("Middag: pasta med Amalie", use_matcher=False)
+
+
+def test_contains_ids_and_candidates():
+    matcher = MappingMatcher(RULES)
+    assert matcher.contains_ids("middag: pasta med amalie bursdag") == [0, 8, 9]
+    # regex rules are always candidates, the rest only when their keyword occurs
+    assert matcher.candidates("ingenting her") == [6, 7]
+    assert 3 in matcher.candidates("OSLO")
+
+
+def test_aho_corasick_overlapping_patterns():
+    ac = AhoCorasick([("he", "he"), ("she", "she"), ("his", "his"), ("hers", "hers"), ("empty", "")])
+    assert ac.search("ushers") == {"he", "she", "hers"}
+    assert ac.search("this") == {"his"}
+    assert ac.search("") == set()
+
+
+def test_fold_covers_ignorecase_equivalents():
+    assert fold("Kino") == fold("kino")
+    assert fold("OSLO") == fold("oslo")
+    # re.IGNORECASE treats the Kelvin sign as k and the long s as s
+    assert fold("\u212aino") == fold("kino")
+    assert fold("ſkole") == fold("Skole")
@@ -0,0 +1,128 @@
+# tests/test_mapping_profiler.py
+import pytest
+
+import mappings
+from mapping_matcher import MappingMatcher
+from mapping_profiler import (APPLY, FIRST_MATCH, RuleProfiler, format_report, never_first_match_rules,
+                              shadowed_rules)
+
+RULES = [
+    {"keyword": "Middag", "match_type": "contains", "mode": "add_icon", "icon": "food"},           # 0
+    {"keyword": "Middag pasta", "match_type": "contains", "mode": "add_all", "replacement": "Pasta"},  # 1
+    {"keyword": "TODO", "match_type": "contains", "mode": "replace_all"},                          # 2
+    {"keyword": "todo: handle", "match_type": "contains", "mode": "add_tag", "replacement": "Handle"},  # 3
+    {"keyword": "Husk", "match_type": "prefix", "mode": "replace_text"},                           # 4
+    {"keyword": "Husk tannlege", "match_type": "prefix", "mode": "add_tag", "replacement": "Tann"},  # 5
+    {"keyword": r"uke\d+", "match_type": "regex", "mode": "add_tag", "replacement": "Uke"},        # 6
+    {"keyword": r"uke\d+", "match_type": "regex", "mode": "add_tag", "replacement": "Uke2"},       # 7
+    {"keyword": "Oslo", "match_type": "exact", "mode": "add_icon", "icon": "city"},                # 8
+    {"keyword": "Oslo", "match_type": "contains", "mode": "add_icon", "icon": "city2"},            # 9
+]
+
+
+@pytest.fixture
+def table(monkeypatch):
+    rules = [dict(m) for m in RULES]
+    monkeypatch.setattr(mappings, "EVENT_MAPPINGS", rules)
+    mappings.clear_event_mapping_cache()
+    yield rules
+    mappings.clear_event_mapping_cache()
+
+
+def _tags(text):
+    return [t["text"] for t in mappings._apply_event_mapping_uncached(text)["tags"]]
+
+
+def test_shadowed_only_by_earlier_replace_all():
+    assert [(s["index"], s["shadowed_by"]) for s in shadowed_rules(RULES)] == [(3, 2)]
+
+
+def test_shadowed_agrees_with_apply_event_mapping(table):
+    # add_* before a longer keyword does not stop the later rule from applying
+    assert _tags("Middag pasta i kveld") == ["Pasta"]
+    # replace_text only removes the first occurrence, so the later rule can still apply
+    assert _tags("Husk tannlege") == []
+    assert _tags("Husk Husk tannlege") == ["Tann"]
+    # replace_all removes every occurrence, so the shadowed rule never applies
+    assert _tags("TODO: handle it") == []
+    assert _tags("todo: handle todo: handle") == []
+
+
+def test_never_first_match():
+    got = {(s["index"], s["shadowed_by"]) for s in never_first_match_rules(RULES)}
+    assert got == {(1, 0), (3, 2), (5, 4), (7, 6)}
+    # exact "Oslo" does not cover contains "Oslo" ("Oslo tur" only matches the second)
+    assert 9 not in {s["index"] for s in never_first_match_rules(RULES)}
+
+
+def test_never_first_match_agrees_with_mapping_info(table):
+    matcher = MappingMatcher(RULES)
+    for text in ("Middag pasta", "middag pasta med saus", "Husk tannlege", "todo: handle", "uke42", "Oslo", "Oslo tur"):
+        idx, _ = matcher.first_match(text)
+        assert idx not in {s["index"] for s in never_first_match_rules(RULES)}
+
+
+def test_counters_are_kept_per_path(table):
+    prof = RuleProfiler(RULES, collect=True, slow_ms=0)
+    matcher = MappingMatcher(RULES)
+    matcher.first_match("Middag pasta", prof)
+    prof.record(1, 0.002, True, "Middag pasta", path=APPLY)
+    fm = {s["index"]: s for s in prof.rule_stats(FIRST_MATCH)}
+    ap = {s["index"]: s for s in prof.rule_stats(APPLY)}
+    assert fm[0]["evaluated"] == 1 and fm[0]["matched"] == 1
+    assert fm[1]["evaluated"] == 0
+    assert ap[1]["evaluated"] == 1 and ap[0]["evaluated"] == 0
+
+    report = prof.report()
+    assert 1 in {s["index"] for s in report[FIRST_MATCH]["never_matched"]}
+    assert 1 not in {s["index"] for s in report[APPLY]["never_matched"]}
+    assert report[APPLY]["slow"][0]["index"] == 1
+
+
+def test_apply_event_mapping_records_on_the_apply_path(table, monkeypatch):
+    prof = RuleProfiler(table, collect=True, slow_ms=0)
+    monkeypatch.setattr(mappings, "MAPPINGS_PROFILE", True)
+    monkeypatch.setattr(mappings, "get_rule_profiler", lambda t=None: prof)
+    mappings._apply_event_mapping_uncached("Middag pasta")
+    assert prof.paths[APPLY].matched[0] == 1 and prof.paths[APPLY].matched[1] == 1
+    assert sum(prof.paths[FIRST_MATCH].evaluated) == 0
+    mappings.mapping_info_for_event("Middag pasta")
+    assert prof.paths[FIRST_MATCH].matched[0] == 1
+
+
+def test_memo_hits_count_on_the_apply_path(table, monkeypatch):
+    prof = RuleProfiler(table, collect=True, slow_ms=0)
+    monkeypatch.setattr(mappings, "MAPPINGS_PROFILE", True)
+    monkeypatch.setattr(mappings, "get_rule_profiler", lambda t=None: prof)
+    for _ in range(3):
+        mappings.apply_event_mapping("Middag pasta")
+    mappings.apply_event_mapping_batch(["Middag pasta", "Middag pasta"])
+    ap = prof.paths[APPLY]
+    # one real evaluation, three memo hits (the batch maps its repeated summary once)
+    assert ap.matched[0] == 4 and ap.matched[1] == 4
+    assert ap.memo_hits == 3
+    report = prof.report()
+    assert report[APPLY]["memo_hits"] == 3
+    assert "3 memo hits counted without time" in format_report(report)
+
+
+def test_slow_warning_once_per_rule_even_without_counters(capsys):
+    prof = RuleProfiler(RULES, collect=False, slow_ms=10)
+    prof.record(6, 0.5, False, "uke" * 100)
+    prof.record(6, 0.5, False, "uke")
+    prof.record(0, 0.001, True, "Middag")
+    out = capsys.readouterr().out
+    assert out.count("[mappings] slow rule #6") == 1
+    assert "#0" not in out
+    report = prof.report()
+    assert report["slow_warnings"] == [6]
+    assert report[FIRST_MATCH]["evaluations"] == 0
+
+
+def test_format_report_labels():
+    prof = RuleProfiler(RULES, collect=True)
+    text = format_report(prof.report())
+    assert "never used by apply_event_mapping" in text
+    assert "never first match in mapping_info_for_event" in text
+    assert "mapping_info_for_event (first match)" in text and "apply_event_mapping (keyword contains)" in text
+    assert "counters off" in format_report(RuleProfiler(RULES).report())
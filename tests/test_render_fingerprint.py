@@ -0,0 +1,112 @@
+# tests/test_render_fingerprint.py
+import copy
+import hashlib
+import os
+
+import pytest
+
+import layout_renderer
+import render_fingerprint as rf
+
+DAYS = 3
+OPTS = {"show_period_weather": False}
+
+
+def _base():
+    return {
+        "events": [
+            {"date": "2026-10-16", "name": "Middag: pasta", "time": "17:00"},
+            {"date": "2026-10-16", "name": "Husk: tannlege", "time": ""},
+            {"date": "2026-10-17", "name": "Skole", "time": "08:15"},
+            {"date": "2026-10-18", "name": "Fotball G16 IK", "time": "18:00"},
+        ],
+        "weather": [
+            {"date": "2026-10-16", "temp_max": 5.4, "temp_min": -1.2, "precip": 2.33, "wind_max": 4.1, "wind_dir_deg": 200},
+            {"date": "2026-10-17", "temp_max": 7.0, "temp_min": 1.0, "precip": 0.0, "wind_max": 2.0, "wind_dir_deg": 10},
+        ],
+    }
+
+
+def _weather(**changes):
+    def edit(data):
+        data["weather"][0].update(changes)
+    return edit
+
+
+def _add_event(ev):
+    def edit(data):
+        data["events"].append(ev)
+    return edit
+
+
+def _rename(data):
+    data["events"][0]["name"] = "Middag: taco"
+
+
+# (name, edit, whether the drawn picture should change)
+VARIANTS = [
+    ("temp rounds the same", _weather(temp_max=5.3), False),
+    ("precip rounds the same", _weather(precip=2.34), False),
+    ("wind rounds the same", _weather(wind_max=4.14), False),
+    ("same cardinal", _weather(wind_dir_deg=190), False),
+    ("event outside the shown days", _add_event({"date": "2026-10-25", "name": "Ferie", "time": ""}), False),
+    ("weather for a day without a box", lambda d: d["weather"].append({"date": "2026-11-01", "temp_max": 1.0}), False),
+    ("temp changes", _weather(temp_max=6.6), True),
+    ("precip changes", _weather(precip=2.5), True),
+    ("cardinal changes", _weather(wind_dir_deg=250), True),
+    ("event renamed", _rename, True),
+    ("event added", _add_event({"date": "2026-10-17", "name": "Oslo", "time": "12:00"}), True),
+]
+
+
+def _render_digest(data):
+    img = layout_renderer.render_calendar(copy.deepcopy(data), 800, 480, DAYS, dict(OPTS))
+    return hashlib.sha256(img.tobytes()).hexdigest()
+
+
+@pytest.fixture(scope="module")
+def base_render():
+    data = _base()
+    return rf.fingerprint(data, DAYS, OPTS), _render_digest(data)
+
+
+@pytest.mark.parametrize("name,edit,changes", VARIANTS, ids=[v[0] for v in VARIANTS])
+def test_fingerprint_follows_render_output(base_render, name, edit, changes):
+    base_fp, base_img = base_render
+    data = _base()
+    edit(data)
+    same_fp = rf.fingerprint(data, DAYS, OPTS) == base_fp
+    same_img = _render_digest(data) == base_img
+    assert same_img == (not changes)
+    assert same_fp == same_img
+
+
+def test_model_uses_the_header_texts():
+    entry = _base()["weather"][0]
+    model = rf._weather_model(entry, False)
+    assert model == layout_renderer._header_weather_texts(entry)
+    assert model == {"temp": "5° / -1°", "precip": "2.3 mm", "wind": "4.1 m/s S"}
+
+
+def test_opts_and_days_are_part_of_the_fingerprint():
+    data = _base()
+    fp = rf.fingerprint(data, DAYS, OPTS)
+    assert fp == rf.fingerprint(copy.deepcopy(data), DAYS, dict(OPTS))
+    assert fp != rf.fingerprint(data, DAYS - 1, OPTS)
+    assert fp != rf.fingerprint(data, DAYS, dict(OPTS, show_period_weather=True, underline_date=True))
+
+
+def test_save_and_compare(tmp_path, monkeypatch):
+    monkeypatch.setattr(rf, "RENDER_FINGERPRINT_ENABLED", True)
+    state = str(tmp_path / "fp.json")
+    out = tmp_path / "output.jpg"
+    out.write_bytes(b"jpg")
+    assert not rf.frame_unchanged("abc", path=state)
+    assert rf.save_fingerprint("abc", outputs=[str(out)], path=state)
+    assert rf.frame_unchanged("abc", path=state)
+    assert not rf.frame_unchanged("def", path=state)
+    os.remove(out)
+    assert not rf.frame_unchanged("abc", path=state)
+
+    monkeypatch.setattr(rf, "RENDER_FINGERPRINT_ENABLED", False)
+    assert not rf.frame_unchanged("abc", path=state)
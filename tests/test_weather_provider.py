@@ -0,0 +1,290 @@
+# tests/test_weather_provider.py
+import random
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import benchmark
+import weather_provider as wp
+
+
+@pytest.fixture
+def oslo(monkeypatch):
+    # the parsers group rows by the system local time
+    monkeypatch.setenv("TZ", "Europe/Oslo")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def _row(ts, temp, wind, wdir, symbol=None, precip=None):
+    data = {"instant": {"details": {"air_temperature": temp, "wind_speed": wind, "wind_from_direction": wdir}}}
+    if symbol is not None:
+        data["next_1_hours"] = {"summary": {"symbol_code": symbol}, "details": {"precipitation_amount": precip}}
+    return {"time": ts, "data": data}
+
+
+def _met(*rows):
+    return {"properties": {"timeseries": list(rows)}}
+
+
+# 2026-10-16 is CEST (+02:00): 03:00Z is 05:00 local (day before), 04:00Z is 06:00 local
+MET = _met(
+    _row("2026-10-16T02:00:00Z", 0.5, 1.0, 350, "cloudy", 0.5),
+    _row("2026-10-16T03:00:00Z", 1.0, 2.0, 30, "cloudy", 0.1),
+    _row("2026-10-16T04:00:00Z", 3.0, 4.0, 10, "rain", 1.0),
+    _row("2026-10-16T05:00:00Z", 5.0, 1.0, 30, "clearsky_day", 0.0),
+    _row("2026-10-16T06:00:00Z", 4.0, 6.0, None, "clearsky_day", 0.2),
+    _row("2026-10-16T07:00:00Z", 2.0, 3.0, 20, "rain", 0.3),
+)
+
+
+def test_parser_daily_06_to_06(oslo):
+    daily, hourly = wp._parse_met_timeseries_json(MET)
+    assert daily == {
+        # circular mean of 350 and 30 is 10, not 190
+        "2026-10-15": {"temp_max": 1.0, "temp_min": 0.5, "precip": 0.6, "wind_max": 2.0,
+                       "symbol": "cloudy", "wind_dir_deg": 10.0},
+        # rain and clearsky_day tie 2-2: the symbol seen first wins
+        "2026-10-16": {"temp_max": 5.0, "temp_min": 2.0, "precip": 1.5, "wind_max": 6.0,
+                       "symbol": "rain", "wind_dir_deg": 20.0},
+    }
+    assert [h["time"] for h in hourly][:3] == ["2026-10-16T04:00:00+02:00", "2026-10-16T05:00:00+02:00",
+                                               "2026-10-16T06:00:00+02:00"]
+    assert hourly[2] == {"time": "2026-10-16T06:00:00+02:00", "temp": 3.0, "wind_speed": 4.0, "wind_dir": 10,
+                         "precip_next_1h": 1.0, "precip": 1.0, "symbol_code": "rain"}
+
+
+def test_mode_tie_goes_to_the_first_symbol(oslo):
+    rows = MET["properties"]["timeseries"]
+    # same day, clearsky_day seen before rain this time
+    flipped = _met(*rows[:2], rows[3], rows[2], rows[5], rows[4])
+    assert wp._parse_met_timeseries_json(flipped)[0]["2026-10-16"]["symbol"] == "clearsky_day"
+    assert wp._parse_met_timeseries_rowwise(flipped)[0]["2026-10-16"]["symbol"] == "clearsky_day"
+
+
+def test_columnar_equals_rowwise(oslo):
+    # across the 2026-10-25 DST change
+    dst = _met(*(_row(f"2026-10-{24 + (20 + h) // 24:02d}T{(20 + h) % 24:02d}:00:00Z", 5.0 - h * 0.1, 2.0 + h % 3,
+                      (h * 47) % 360, ("rain", "cloudy", "fog")[h % 3], 0.1 * (h % 4)) for h in range(30)))
+    hourly = wp._parse_met_timeseries_json(dst)[1]
+    assert {h["time"][-6:] for h in hourly} == {"+02:00", "+01:00"}
+    payloads = [MET, dst, benchmark.generate_met_timeseries(90), benchmark.generate_met_timeseries(1000)]
+    for payload in payloads:
+        assert wp._parse_met_timeseries_json(payload) == wp._parse_met_timeseries_rowwise(payload)
+
+    # unsorted input takes the row-wise path
+    rows = list(dst["properties"]["timeseries"])
+    random.Random(3).shuffle(rows)
+    shuffled = _met(*rows)
+    assert wp._parse_met_timeseries_json(shuffled) == wp._parse_met_timeseries_rowwise(shuffled)
+    assert wp._parse_met_timeseries_json(shuffled)[1] == wp._parse_met_timeseries_json(dst)[1]
+
+
+def test_missing_values_are_skipped(oslo):
+    daily, hourly = wp._parse_met_timeseries_json(_met(
+        _row("2026-10-16T10:00:00Z", None, None, None),
+        _row("2026-10-16T11:00:00Z", "bogus", 2.0, None, "fog", None),
+        {"data": {}},
+    ))
+    assert daily == {"2026-10-16": {"temp_max": None, "temp_min": None, "precip": 0.0, "wind_max": 2.0,
+                                    "symbol": "fog", "wind_dir_deg": None}}
+    assert len(hourly) == 2
+
+
+def _hour(t, symbol="cloudy", temp=5.0, precip=0.0):
+    return {"time": t, "temp": temp, "symbol_code": symbol, "precip": precip}
+
+
+def test_hourly_store_groups_06_to_06():
+    rows = [_hour("2026-10-31T05:00:00+01:00"), _hour("2026-10-31T06:00:00+01:00"),
+            _hour("2026-11-01T00:00:00+01:00"), _hour("2026-11-01T05:59:00+01:00"),
+            _hour("2026-11-01T06:00:00+01:00"), {"time": None}, {"time": "2026-11"}]
+    store = wp.build_hourly_store(rows)
+    assert list(store) == ["2026-10-30", "2026-10-31", "2026-11-01"]
+    assert [h["time"][:13] for h in store["2026-10-31"]] == ["2026-10-31T06", "2026-11-01T00", "2026-11-01T05"]
+    assert wp.build_hourly_store(None) == {}
+
+
+def test_summarize_period():
+    assert wp.summarize_period([]) is None
+    rows = [_hour("2026-10-16T14:00:00+02:00", "clearsky_day", 12.0),
+            _hour("2026-10-16T15:00:00+02:00", "lightrain", 9.0, 0.4),
+            _hour("2026-10-16T16:00:00+02:00", "rain", 8.0, 0.6),
+            _hour("2026-10-16T17:00:00+02:00", "cloudy", 10.0)]
+    # the most severe hour wins (rain, then more precipitation), precip is the period total
+    assert wp.summarize_period(rows) == {"symbol_code": "rain", "temp": 8.0, "precip": 1.0,
+                                         "time": "2026-10-16T16:00:00+02:00", "hours": 4}
+    # same severity and precip: the warmest hour
+    dry = [_hour("2026-10-16T06:00:00+02:00", "cloudy", 3.0), _hour("2026-10-16T07:00:00+02:00", "fog", 4.0),
+           _hour("2026-10-16T08:00:00+02:00", "cloudy", None)]
+    assert wp.summarize_period(dry)["symbol_code"] == "fog"
+    # heavy beats snow beats rain
+    assert wp.summarize_period([_hour("T", "snow"), _hour("T", "heavyrain"), _hour("T", "rain")])["symbol_code"] == "heavyrain"
+    assert wp.summarize_period([_hour("T", "rain"), _hour("T", "snow")])["symbol_code"] == "snow"
+
+
+def test_periods_by_day():
+    store = wp.build_hourly_store([
+        _hour("2026-10-16T06:00:00+02:00", "fog"),
+        _hour("2026-10-16T12:00:00+02:00", "rain", precip=0.5),
+        _hour("2026-10-16T13:00:00+02:00", "cloudy"),
+        _hour("2026-10-16T20:00:00+02:00", "cloudy", temp=2.0),
+        _hour("2026-10-17T02:00:00+02:00", "snow", temp=-1.0),
+    ])
+    periods = wp.periods_by_day(store)["2026-10-16"]
+    assert list(periods) == ["morning", "lunch", "day", "evening"]
+    assert periods["morning"]["symbol_code"] == "fog" and periods["morning"]["hours"] == 1
+    assert periods["lunch"]["symbol_code"] == "rain" and periods["lunch"]["precip"] == 0.5
+    assert periods["day"] is None
+    # the night up to 06 belongs to the evening of the day before
+    assert periods["evening"] == {"symbol_code": "snow", "temp": -1.0, "precip": 0.0,
+                                  "time": "2026-10-17T02:00:00+02:00", "hours": 2}
+
+
+def _days(n=3):
+    today = datetime.now().date()
+    return [(today + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(n)]
+
+
+def _om_daily(keys):
+    return {k: {"temp_max": 7.5, "temp_min": 1.2, "precip": 0.4, "symbol": 3, "wind_max": 5.0,
+                "wind_dir_deg": 200.0, "source": "OpenMeteo"} for k in keys}
+
+
+def _met_daily(keys):
+    daily = {k: {"temp_max": 9.0, "temp_min": 2.0, "precip": 0.0, "wind_max": 3.0, "symbol": "rain",
+                 "wind_dir_deg": 90.0} for k in keys}
+    hourly = [_hour(f"{k}T{hh:02d}:00:00+02:00", "rain", 9.0, 0.2) for k in keys for hh in (8, 12, 15, 20)]
+    return daily, hourly
+
+
+def test_merge_daily_when_met_is_missing():
+    today = date(2026, 10, 16)
+    merged = wp._merge_daily({}, _om_daily(["2026-10-16", "2026-10-17"]), today, 3)
+    assert [e["source"] for e in merged] == ["OpenMeteo", "OpenMeteo", "none"]
+    assert merged[0]["symbol"] == wp.OM_WEATHERCODE_MAP[3] and merged[0]["temp_max"] == 7.5
+    assert merged[0]["periods"] is None
+    assert merged[2]["temp_max"] is None
+
+
+def test_merge_daily_when_open_meteo_is_missing():
+    today = date(2026, 10, 16)
+    met, _ = _met_daily(["2026-10-16"])
+    merged = wp._merge_daily(met, {}, today, 2, {"2026-10-16": {"morning": None}})
+    assert merged[0]["source"] == "MET" and merged[0]["symbol"] == wp.MET_SYMBOL_MAP["rain"]
+    assert merged[0]["precip"] == 0.0 and merged[0]["periods"] == {"morning": None}
+    assert merged[1]["source"] == "none"
+    # with both, Open-Meteo only fills what MET left empty (and a dry MET day)
+    both = wp._merge_daily(met, _om_daily(["2026-10-16"]), today, 1)[0]
+    assert (both["source"], both["temp_max"], both["precip"]) == ("MET", 9.0, 0.4)
+
+
+@pytest.fixture
+def hedged(monkeypatch):
+    monkeypatch.setattr(wp, "WEATHER_HEDGE_GRACE", 0.2)
+    monkeypatch.setattr(wp, "WEATHER_MET_GRACE", 0.3)
+
+    def install(met_delay=0.0, om=None):
+        def fake_met(lat, lon, user_agent=None, timeout=None):
+            time.sleep(met_delay)
+            return _met_daily(_days())
+        monkeypatch.setattr(wp, "_fetch_met", fake_met)
+        monkeypatch.setattr(wp, "_fetch_open_meteo", om or (lambda lat, lon, days, timeout=None: _om_daily(_days())))
+    return install
+
+
+def test_hedged_late_met_shows_open_meteo_without_periods(hedged):
+    hedged(met_delay=3.0)
+    t0 = time.monotonic()
+    fc = wp.get_forecast_json(days=3, hedged=True)
+    assert time.monotonic() - t0 < 2.0
+    assert fc["meta"]["hedge_status"] == {"om": "ok", "met": "timeout"}
+    assert fc["meta"]["hourly_missing"] is True and "met_error" in fc["meta"]
+    assert [e["source"] for e in fc["daily"]] == ["OpenMeteo"] * 3
+    assert all(e["periods"] is None for e in fc["daily"])
+    assert fc["hourly_today"] == [] and fc["periods_by_day"] == {}
+
+
+def test_hedged_met_within_its_grace(hedged):
+    hedged(met_delay=0.1)
+    fc = wp.get_forecast_json(days=3, hedged=True)
+    assert fc["meta"]["hedge_status"] == {"om": "ok", "met": "ok"}
+    assert fc["meta"]["hourly_missing"] is False
+    assert fc["daily"][0]["source"] == "MET" and fc["daily"][0]["periods"]["lunch"]["symbol_code"] == "rain"
+    assert len(fc["hourly_today"]) == 4
+
+
+def test_hedged_open_meteo_failing(hedged):
+    def broken(lat, lon, days, timeout=None):
+        raise RuntimeError("OpenMeteo HTTP 500")
+    hedged(om=broken)
+    fc = wp.get_forecast_json(days=3, hedged=True)
+    assert fc["meta"]["om_error"] == "OpenMeteo HTTP 500"
+    assert [e["source"] for e in fc["daily"]] == ["MET"] * 3
+    assert fc["daily"][0]["precip"] == 0.0 and fc["daily"][0]["periods"]["morning"]["hours"] == 1
+
+
+@pytest.fixture
+def cells(monkeypatch, tmp_path):
+    monkeypatch.setattr(wp, "WEATHER_CELL_CACHE_PATH", str(tmp_path / "cells.json"))
+    wp.clear_cell_cache()
+    calls = {"met": [], "om": []}
+
+    def fake_met(lat, lon, user_agent=None, timeout=None):
+        calls["met"].append((lat, lon))
+        return _met_daily(_days())
+
+    def fake_om_multi(cells, days, timeout=None):
+        calls["om"].append(list(cells))
+        return {c: _om_daily(_days(days)) for c in cells}
+
+    monkeypatch.setattr(wp, "_fetch_met", fake_met)
+    monkeypatch.setattr(wp, "_fetch_open_meteo_multi", fake_om_multi)
+    yield calls
+    wp.clear_cell_cache()
+
+
+def test_grid_cell():
+    assert wp.grid_cell(59.4376, 10.6432) == (59.44, 10.64)
+    assert wp.grid_cell(59.4376, 10.6432, decimals=1) == (59.4, 10.6)
+    assert wp.grid_cell(59.43761234, 10.64, decimals=9) == (59.4376, 10.64)
+
+
+def test_nearby_locations_share_one_cell(cells):
+    home, neighbour, cabin = (59.4376, 10.6432), (59.4391, 10.6401), (61.1, 9.05)
+    out = wp.get_forecasts_for_locations([home, neighbour, cabin], days=3)
+    assert sorted(cells["met"]) == [(59.44, 10.64), (61.1, 9.05)]
+    assert cells["om"] == [[(59.44, 10.64), (61.1, 9.05)]]
+    assert [o["meta"]["cell"] for o in out] == [[59.44, 10.64], [59.44, 10.64], [61.1, 9.05]]
+    assert out[0] == out[1] and out[0] is not out[1]
+    assert out[0]["daily"][0]["source"] == "MET" and len(out[0]["hourly_today"]) == 4
+    # each location gets its own copy
+    out[0]["daily"][0]["temp_max"] = -99
+    assert out[1]["daily"][0]["temp_max"] == 9.0
+
+
+def test_cell_cache_is_reused(cells):
+    wp.get_forecasts_for_locations([(59.4376, 10.6432)], days=3)
+    assert len(cells["met"]) == 1 and len(cells["om"]) == 1
+
+    # another location in the same cell, same process
+    again = wp.get_forecasts_for_locations([(59.4412, 10.6398)], days=3)
+    assert len(cells["met"]) == 1 and len(cells["om"]) == 1
+    assert again[0]["daily"][0]["source"] == "MET"
+
+    # a fresh process only has the file
+    wp._cell_cache.clear()
+    from_file = wp.get_forecasts_for_locations([(59.4376, 10.6432)], days=3)
+    assert len(cells["met"]) == 1 and len(cells["om"]) == 1
+    assert from_file[0]["daily"] == again[0]["daily"]
+
+    # Open-Meteo entries are per days, MET per cell
+    wp.get_forecasts_for_locations([(59.4376, 10.6432)], days=2)
+    assert len(cells["met"]) == 1 and len(cells["om"]) == 2
+
+    wp.clear_cell_cache()
+    wp.get_forecasts_for_locations([(59.4376, 10.6432)], days=3)
+    assert len(cells["met"]) == 2 and len(cells["om"]) == 3
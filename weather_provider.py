@@ -1,21 +1,54 @@
 # weather_provider.py
 # Henter og slår sammen MET (api.met.no) og Open-Meteo.
 # Returnerer JSON-serialiserbart dict med 'daily' og 'hourly_today'.
+# MET og Open-Meteo hentes parallelt (hedged): den som svarer sist får en
+# begrenset ekstratid etter den første - Open-Meteo WEATHER_HEDGE_GRACE sekunder
+# for å fylle hull, MET (eneste kilde for timedata og perioder) den lengre
+# WEATHER_MET_GRACE. Kommer ikke MET i tide vises Open-Meteo sine dagsverdier,
+# med perioder/timedata markert som manglende (WEATHER_HEDGED=0 gir gammel
+# sekvensiell henting).
+# get_forecasts_for_locations() henter for mange rammer samtidig: koordinatene
+# rundes til grid-celler (WEATHER_GRID_DECIMALS), hver celle hentes én gang og
+# caches i en JSON-fil (WEATHER_CELL_TTL, WEATHER_CELL_CACHE_PATH) som deles av
+# alle rammeprosessene, og Open-Meteo spørres om alle cellene i ett kall.
+# data_provider bruker denne veien med WEATHER_GRID_CELLS=1.
 #
 # Requires: requests
 # pip install requests
 
-import requests
+import os
+import copy
+import json
+import time
+import calendar
+import threading
+from array import array
+from collections import Counter
 from datetime import datetime, timedelta, timezone
 import math
 
+from http_cache import cached_get_parsed
+from fetch_engine import run_sources, MISSING
+import http_fixtures
+
 # Default config (kan overskrives ved kall)
 DEFAULT_LAT = 59.4376
 DEFAULT_LON = 10.6432
 DEFAULT_DAYS = 14
-MET_URL = "https://api.met.no/weatherapi/locationforecast/2.0/complete"
-OM_URL = "https://api.open-meteo.com/v1/forecast"
+MET_URL = os.environ.get("MET_URL", "https://api.met.no/weatherapi/locationforecast/2.0/complete")
+OM_URL = os.environ.get("OM_URL", "https://api.open-meteo.com/v1/forecast")
 DEFAULT_USER_AGENT = "InkyFrameCalendar/1.0 (contact: youremail@example.com)"
+# hedged fetch: MET and Open-Meteo in parallel, merge when both answered or the late one's grace ran out
+WEATHER_HEDGED = os.environ.get("WEATHER_HEDGED", "1") != "0"
+WEATHER_HEDGE_GRACE = float(os.environ.get("WEATHER_HEDGE_GRACE", "2"))        # seconds Open-Meteo may still fill gaps after MET
+WEATHER_MET_GRACE = float(os.environ.get("WEATHER_MET_GRACE", "6"))            # seconds MET may still answer after Open-Meteo
+WEATHER_FETCH_DEADLINE = float(os.environ.get("WEATHER_FETCH_DEADLINE", "25"))  # hard cap for the hedged fetch
+# batched multi-location fetch (get_forecasts_for_locations)
+WEATHER_GRID_DECIMALS = int(os.environ.get("WEATHER_GRID_DECIMALS", "2"))   # 2 decimals ~ 1.1 km cells
+WEATHER_CELL_TTL = float(os.environ.get("WEATHER_CELL_TTL", "1800"))         # seconds a cell's forecast is reused
+WEATHER_CELL_CACHE_PATH = os.environ.get("WEATHER_CELL_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "weather_cell_cache.json"))
+WEATHER_OM_BATCH_SIZE = int(os.environ.get("WEATHER_OM_BATCH_SIZE", "50"))   # locations per Open-Meteo request
+WEATHER_BATCH_WORKERS = int(os.environ.get("WEATHER_BATCH_WORKERS", "4"))
 
 # Simple mappings
 MET_SYMBOL_MAP = {
@@ -58,12 +91,253 @@ def _deg_to_cardinal(deg):
     ix = int((deg % 360) / 22.5 + 0.5) % 16
     return dirs[ix]
 
-# ---------------- parse MET timeseries -------------------------------------
+# ---------------- parse MET timeseries (columnar) ---------------------------
+_NAN = float("nan")
+_HOUR_SECONDS = {f"{h:02d}": h * 3600 for h in range(24)}
+
+
+def _met_float(v):
+    if v is None:
+        return _NAN
+    try:
+        return float(v)
+    except Exception:
+        return _NAN
+
+
+def _local_offsets(epochs):
+    """
+    UTC offset (seconds) of the system local time for each (sorted) epoch.
+    The offset only changes at DST transitions, so ranges whose ends agree
+    and that span less than a month are filled without calling localtime;
+    other ranges are bisected.
+    """
+    n = len(epochs)
+    out = [0] * n
+    if not n:
+        return out
+
+    def offset(i):
+        return time.localtime(epochs[i]).tm_gmtoff
+
+    stack = [(0, n - 1, offset(0), offset(n - 1))]
+    while stack:
+        lo, hi, olo, ohi = stack.pop()
+        if olo == ohi and epochs[hi] - epochs[lo] < 30 * 86400:
+            out[lo:hi + 1] = [olo] * (hi - lo + 1)
+        elif hi - lo <= 1:
+            out[lo], out[hi] = olo, ohi
+        else:
+            mid = (lo + hi) // 2
+            omid = offset(mid)
+            stack.append((lo, mid, olo, omid))
+            stack.append((mid, hi, omid, ohi))
+    return out
+
+
+def _offset_suffix(off):
+    sign = "+" if off >= 0 else "-"
+    off = abs(off)
+    return f"{sign}{off // 3600:02d}:{(off % 3600) // 60:02d}"
+
+
+def _hourly_precip_symbol(p1, p6, p12, h1):
+    """
+    (precip, symbol_code) for one hourly row: the shortest period MET gives
+    (next_1_hours, then next_6_hours for the 6-hourly tail of the forecast).
+    """
+    precip = h1
+    if precip is None and p6 and "details" in p6:
+        precip = p6["details"].get("precipitation_amount")
+    symbol = None
+    for p in (p1, p6, p12):
+        if p and "summary" in p:
+            symbol = p["summary"].get("symbol_code")
+            if symbol:
+                break
+    return precip, symbol
+
+
+def _decode_met_columns(timeseries):
+    """
+    Decode MET timeseries rows into compact columns. Returns a dict with
+    array columns epoch/temp/wind/dir (NaN = missing), symbol ids (-1 = none)
+    and the symbol table, plus the flat precipitation column (every present
+    next_1/6/12_hours amount in row order, indexed by precip_end) and the raw
+    values the hourly view passes through unchanged.
+    """
+    epochs = array("q")
+    temps = array("d")
+    winds = array("d")
+    dirs = array("d")
+    sym_ids = array("h")
+    precip = array("d")
+    precip_end = array("l")  # precip[precip_end[i-1]:precip_end[i]] belongs to row i
+    raw = []                 # (temp, wind_speed, wind_dir, precip_next_1h, precip, symbol_code) for the hourly view
+    sym_names = []
+    sym_index = {}
+    midnight = {}            # "YYYY-MM-DD" -> epoch at 00:00 UTC
+    to_float = _met_float
+
+    for t in timeseries:
+        ts = t.get("time")
+        if not ts:
+            continue
+        try:
+            if len(ts) == 20 and ts[19] == "Z":
+                d0 = midnight.get(ts[:10])
+                if d0 is None:
+                    d0 = midnight[ts[:10]] = calendar.timegm((int(ts[0:4]), int(ts[5:7]), int(ts[8:10]), 0, 0, 0))
+                ep = d0 + _HOUR_SECONDS[ts[11:13]]
+                if ts[14:19] != "00:00":  # MET is whole hours
+                    ep += int(ts[14:16]) * 60 + int(ts[17:19])
+            else:
+                dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+                if dt.tzinfo is None:
+                    dt = dt.replace(tzinfo=timezone.utc)
+                ep = int(dt.timestamp())
+        except Exception:
+            continue
+
+        data = t.get("data", {})
+        instant = data.get("instant", {}).get("details", {})
+        temp = instant.get("air_temperature")
+        wind = instant.get("wind_speed")
+        wdir = instant.get("wind_from_direction")
+        epochs.append(ep)
+        temps.append(temp if temp.__class__ is float else to_float(temp))
+        winds.append(wind if wind.__class__ is float else to_float(wind))
+        dirs.append(wdir if wdir.__class__ is float else to_float(wdir))
+
+        p1 = data.get("next_1_hours")
+        p6 = data.get("next_6_hours")
+        p12 = data.get("next_12_hours")
+        h1 = None
+        for p in (p1, p6, p12):
+            if p and isinstance(p, dict):
+                amt = p.get("details", {}).get("precipitation_amount")
+                if amt is not None:
+                    amt = to_float(amt)
+                    if amt == amt:
+                        precip.append(amt)
+        if p1 and "details" in p1:
+            h1 = p1["details"].get("precipitation_amount")
+        precip_end.append(len(precip))
+
+        # symbol: prefer next_6_hours, then next_1_hours, then next_12_hours
+        symbol = None
+        for p in (p6, p1, p12):
+            if p and "summary" in p:
+                symbol = p["summary"].get("symbol_code")
+                if symbol:
+                    break
+        raw.append((temp, wind, wdir, h1, *_hourly_precip_symbol(p1, p6, p12, h1)))
+        if symbol:
+            sid = sym_index.get(symbol)
+            if sid is None:
+                sid = sym_index[symbol] = len(sym_names)
+                sym_names.append(symbol)
+            sym_ids.append(sid)
+        else:
+            sym_ids.append(-1)
+
+    return {
+        "epoch": epochs, "temp": temps, "wind": winds, "dir": dirs,
+        "symbol": sym_ids, "symbols": sym_names,
+        "precip": precip, "precip_end": precip_end, "raw": raw,
+    }
+
+
+def _nan_free(seg):
+    # sum() propagates NaN, so one C-level pass tells whether filtering is needed
+    if math.isnan(sum(seg)):
+        return [v for v in seg if v == v]
+    return seg
+
+
 def _parse_met_timeseries_json(j):
+    """
+    Columnar MET parser: decode the timeseries into compact arrays
+    (_decode_met_columns) and aggregate each 06-06 local day from array
+    slices with builtin min/max/sum/Counter (no per-row datetime objects).
+    Returns the same (daily, hourly_today) as _parse_met_timeseries_rowwise.
+    """
+    timeseries = (j.get("properties", {}) or {}).get("timeseries", []) or []
+    cols = _decode_met_columns(timeseries)
+    epochs = cols["epoch"]
+    n = len(epochs)
+    if any(epochs[i] < epochs[i - 1] for i in range(1, n)):
+        # day runs must be contiguous; MET is always sorted, anything else takes the slow path
+        return _parse_met_timeseries_rowwise(j)
+
+    offsets = _local_offsets(epochs)
+    local = [e + o for e, o in zip(epochs, offsets)]
+    day_idx = [(lt - 6 * 3600) // 86400 for lt in local]
+
+    temps, winds, dirs = cols["temp"], cols["wind"], cols["dir"]
+    sym_ids, sym_names = cols["symbol"], cols["symbols"]
+    precip, precip_end = cols["precip"], cols["precip_end"]
+    radians, sin, cos = math.radians, math.sin, math.cos
+
+    out = {}
+    lo = 0
+    while lo < n:
+        di = day_idx[lo]
+        hi = lo + 1
+        while hi < n and day_idx[hi] == di:
+            hi += 1
+        t = _nan_free(temps[lo:hi])
+        w = _nan_free(winds[lo:hi])
+        d = _nan_free(dirs[lo:hi])
+        wind_dir_deg = None
+        if d:
+            rad = list(map(radians, d))
+            mean_angle = math.degrees(math.atan2(sum(map(sin, rad)) / len(d), sum(map(cos, rad)) / len(d)))
+            wind_dir_deg = round((mean_angle + 360) % 360, 1)
+        counts = Counter(sym_ids[lo:hi])
+        counts.pop(-1, None)
+        # Counter keeps first-seen order, so ties go to the symbol seen first
+        symbol = sym_names[counts.most_common(1)[0][0]] if counts else None
+        p_lo = precip_end[lo - 1] if lo else 0
+        out[time.strftime("%Y-%m-%d", time.gmtime(di * 86400))] = {
+            "temp_max": max(t) if t else None, "temp_min": min(t) if t else None,
+            "precip": round(sum(precip[p_lo:precip_end[hi - 1]], 0.0), 2),
+            "wind_max": max(w) if w else None, "symbol": symbol, "wind_dir_deg": wind_dir_deg,
+        }
+        lo = hi
+
+    # hourly view: ISO local time strings built from the epoch columns
+    dates = {}
+    suffixes = {}
+    hourly_today = []
+    for i, (lt, off, (temp, wind, wdir, h1, hp, hsym)) in enumerate(zip(local, offsets, cols["raw"])):
+        ld, sec = divmod(lt, 86400)
+        date = dates.get(ld)
+        if date is None:
+            date = dates[ld] = time.strftime("%Y-%m-%d", time.gmtime(ld * 86400))
+        suf = suffixes.get(off)
+        if suf is None:
+            suf = suffixes[off] = _offset_suffix(off)
+        hourly_today.append({
+            "time": f"{date}T{sec // 3600:02d}:{sec % 3600 // 60:02d}:{sec % 60:02d}{suf}",
+            "temp": temp, "wind_speed": wind, "wind_dir": wdir, "precip_next_1h": h1,
+            "precip": hp, "symbol_code": hsym,
+        })
+    hourly_today.sort(key=lambda x: x["time"])
+    return out, hourly_today
+
+
+# ---------------- parse MET timeseries (row-wise reference) ----------------
+def _parse_met_timeseries_rowwise(j):
+    """
+    Original per-row parser (datetime parse + astimezone per row, per-day lists).
+    Kept as the reference for _parse_met_timeseries_json and for benchmark.py.
+    """
     out = {}
     hourly_today = []  # detailed hour-for-hour for current day (06-06 grouping we will slice later)
     props = j.get("properties", {})
     timeseries = props.get("timeseries", [])
+    day_keys = {}
     for t in timeseries:
         time_str = t.get("time")
         if not time_str:
@@ -73,7 +347,11 @@ def _parse_met_timeseries_json(j):
         except Exception:
             continue
         dt_local = _to_local(dt)
-        day_key = _day_key_06_to_06(dt_local)
+        # one day key per (date, before 06) instead of date arithmetic + strftime per row
+        dk = (dt_local.date(), dt_local.hour < 6)
+        day_key = day_keys.get(dk)
+        if day_key is None:
+            day_key = day_keys[dk] = _day_key_06_to_06(dt_local)
 
         # init day dict
         day = out.setdefault(day_key, {
@@ -148,13 +426,16 @@ def _parse_met_timeseries_json(j):
         # attempt to fill precipit next_1_hours
         if "next_1_hours" in data and data["next_1_hours"] and "details" in data["next_1_hours"]:
             hourly_detail["precip_next_1h"] = data["next_1_hours"]["details"].get("precipitation_amount")
+        hourly_detail["precip"], hourly_detail["symbol_code"] = _hourly_precip_symbol(
+            data.get("next_1_hours"), data.get("next_6_hours"), data.get("next_12_hours"), hourly_detail["precip_next_1h"])
         hourly_today.append(hourly_detail)
 
     # finalize daily entries: compute symbol (most common) and dominant wind dir
     for k, v in out.items():
         v["symbol"] = None
         if v.get("symbols"):
-            v["symbol"] = max(set(v["symbols"]), key=v["symbols"].count)
+            # Counter keeps first-seen order, so ties go to the symbol seen first
+            v["symbol"] = Counter(v["symbols"]).most_common(1)[0][0]
         # wind dir mean
         if v.get("wind_dirs"):
             sin_sum = sum(math.sin(math.radians(d)) for d in v["wind_dirs"])
@@ -173,26 +454,32 @@ def _parse_met_timeseries_json(j):
     return out, hourly_today
 
 # ---------------- fetch MET & OM ------------------------------------------------
-def _fetch_met(lat, lon, user_agent=DEFAULT_USER_AGENT, timeout=20):
+def _fetch_met(lat, lon, user_agent=DEFAULT_USER_AGENT, timeout=None):
     headers = {"User-Agent": user_agent, "Accept": "application/json"}
     params = {"lat": str(lat), "lon": str(lon)}
-    r = requests.get(MET_URL, headers=headers, params=params, timeout=timeout)
+    # MET sends Expires/Last-Modified: the cache answers from disk while fresh and
+    # a 304 reuses the stored parse as well
+    parsed, r = cached_get_parsed(MET_URL, lambda resp: _parse_met_timeseries_json(resp.json()), "met-v3",
+                                  headers=headers, params=params, timeout=timeout)
     if r.status_code != 200:
         raise RuntimeError(f"MET HTTP {r.status_code}: {r.text[:400]}")
-    j = r.json()
-    return _parse_met_timeseries_json(j)
+    daily, hourly = parsed
+    return daily, hourly
 
-def _fetch_open_meteo(lat, lon, days, timeout=15):
+def _fetch_open_meteo(lat, lon, days, timeout=None):
     params = {
         "latitude": lat, "longitude": lon,
         "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum,weathercode,windspeed_10m_max,winddirection_10m_dominant",
         "forecast_days": days,
         "timezone": "auto"
     }
-    r = requests.get(OM_URL, params=params, timeout=timeout)
+    out, r = cached_get_parsed(OM_URL, lambda resp: _parse_open_meteo_json(resp.json()), "om-v1",
+                               params=params, timeout=timeout)
     if r.status_code != 200:
         raise RuntimeError(f"OpenMeteo HTTP {r.status_code}: {r.text[:400]}")
-    j = r.json()
+    return out
+
+def _parse_open_meteo_json(j):
     out = {}
     daily = j.get("daily", {})
     dates = daily.get("time", [])
@@ -214,116 +501,434 @@ def _fetch_open_meteo(lat, lon, days, timeout=15):
         }
     return out
 
-# ---------------- merge & return JSON -----------------------------------------
-def get_forecast_json(lat=DEFAULT_LAT, lon=DEFAULT_LON, days=DEFAULT_DAYS, user_agent=DEFAULT_USER_AGENT, keep_debug_hourly=False):
+# ---------------- hourly store & period summaries -------------------------------
+# (name, first hour, last hour) in local time; evening also takes the night up to 06
+PERIODS = (("morning", 6, 10), ("lunch", 11, 13), ("day", 14, 17), ("evening", 18, 23))
+
+
+def _period_for_hour(hour):
+    for name, first, last in PERIODS:
+        if first <= hour <= last:
+            return name
+    return "evening"
+
+
+def _period_severity(symbol, precip):
+    """Same ranking the renderer uses: heavy/precip first, then rain, snow, the rest."""
+    sym = str(symbol or "")
+    if "heavy" in sym or precip >= 2.5:
+        return 5
+    if "rain" in sym or precip > 0.1:
+        return 3
+    if "snow" in sym:
+        return 4
+    return 1
+
+
+def summarize_period(rows):
     """
-    Return dict:
-      { 'daily': [ {date, temp_max, temp_min, precip, symbol, wind_max, wind_dir_deg, source}, ... ],
-        'hourly_today': [ {time, temp, wind_speed, wind_dir, precip_next_1h}, ... ],
-        'meta': { 'met_days': n, 'om_days': n }
-      }
+    Representative weather for one period: the most severe hour (then most
+    precipitation, then warmest) gives symbol_code/temp/time, precip is the
+    period total. None for an empty period.
     """
-    result = {"daily": [], "hourly_today": [], "meta": {}}
-    met_dict = {}
-    hourly_today = []
-    om_dict = {}
-    # try MET
+    best = None
+    best_rank = None
+    total = 0.0
+    for h in rows:
+        try:
+            precip = float(h.get("precip") or 0.0)
+        except Exception:
+            precip = 0.0
+        total += precip
+        temp = h.get("temp")
+        rank = (_period_severity(h.get("symbol_code"), precip), precip, temp if temp is not None else -9999)
+        if best_rank is None or rank > best_rank:
+            best, best_rank = h, rank
+    if best is None:
+        return None
+    return {"symbol_code": best.get("symbol_code"), "temp": best.get("temp"),
+            "precip": round(total, 1), "time": best.get("time"), "hours": len(rows)}
+
+
+def build_hourly_store(hourly_rows):
+    """
+    Group parsed hourly rows (local ISO time strings) by 06-06 day key
+    without datetime parsing: {"YYYY-MM-DD": [row, ...]} in time order.
+    """
+    by_day = {}
+    prev_day = {}
+    for h in hourly_rows or []:
+        t = h.get("time")
+        if not isinstance(t, str) or len(t) < 13:
+            continue
+        key = t[:10]
+        if int(t[11:13]) < 6:
+            prev = prev_day.get(key)
+            if prev is None:
+                try:
+                    prev = prev_day[key] = (datetime.strptime(key, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+                except Exception:
+                    continue
+            key = prev
+        by_day.setdefault(key, []).append(h)
+    return by_day
+
+
+def periods_by_day(hourly_by_day):
+    """{day: {period: summarize_period(...)}} for every day in the hourly store (computed once)."""
+    out = {}
+    for day, rows in hourly_by_day.items():
+        split = {name: [] for name, _, _ in PERIODS}
+        for h in rows:
+            split[_period_for_hour(int(h["time"][11:13]))].append(h)
+        out[day] = {name: summarize_period(split[name]) for name, _, _ in PERIODS}
+    return out
+
+# ---------------- merge & return JSON -----------------------------------------
+def _merge_day(ks, m, o):
+    """Merged daily entry for day `ks` from the MET (m) and Open-Meteo (o) day dicts (either may be None)."""
+    entry = {"date": ks, "temp_max": None, "temp_min": None, "precip": None,
+             "symbol": None, "wind_max": None, "wind_dir_deg": None, "source": "none"}
+    if m:
+        entry.update({
+            "temp_max": m.get("temp_max"),
+            "temp_min": m.get("temp_min"),
+            "precip": m.get("precip"),
+            "symbol": m.get("symbol"),
+            "wind_max": m.get("wind_max"),
+            "wind_dir_deg": m.get("wind_dir_deg"),
+            "source": "MET"
+        })
+    if o:
+        if entry["temp_max"] is None:
+            entry["temp_max"] = o.get("temp_max")
+        if entry["temp_min"] is None:
+            entry["temp_min"] = o.get("temp_min")
+        if entry["precip"] is None or entry["precip"] == 0:
+            entry["precip"] = o.get("precip")
+        if entry["symbol"] is None:
+            # map Open-Meteo weathercode to label
+            entry["symbol"] = OM_WEATHERCODE_MAP.get(o.get("symbol"))
+        if entry["wind_max"] is None:
+            entry["wind_max"] = o.get("wind_max")
+        if entry["wind_dir_deg"] is None:
+            entry["wind_dir_deg"] = o.get("wind_dir_deg")
+        if entry["source"] == "none":
+            entry["source"] = "OpenMeteo"
+    # normalize MET symbol to human label if string
+    sym = entry.get("symbol")
+    if isinstance(sym, str):
+        label = MET_SYMBOL_MAP.get(sym)
+        if not label and "_" in sym:
+            base = sym.split("_")[0]
+            label = MET_SYMBOL_MAP.get(base)
+        entry["symbol"] = label if label else sym
+    # rounding
+    try:
+        if entry["precip"] is not None:
+            entry["precip"] = round(float(entry["precip"]), 2)
+    except Exception:
+        pass
     try:
-        met_dict, hourly_today = _fetch_met(lat, lon, user_agent=user_agent)
+        if entry["temp_max"] is not None:
+            entry["temp_max"] = round(float(entry["temp_max"]), 1)
+        if entry["temp_min"] is not None:
+            entry["temp_min"] = round(float(entry["temp_min"]), 1)
+        if entry["wind_max"] is not None:
+            entry["wind_max"] = round(float(entry["wind_max"]), 1)
+    except Exception:
+        pass
+    return entry
+
+
+def _merge_daily(met_dict, om_dict, today, days, periods=None):
+    """Merged daily list for today..today+days-1: MET first, Open-Meteo fills the gaps."""
+    out = []
+    periods = periods or {}
+    for i in range(days):
+        ks = (today + timedelta(days=i)).strftime("%Y-%m-%d")
+        entry = _merge_day(ks, met_dict.get(ks), om_dict.get(ks))
+        entry["periods"] = periods.get(ks)
+        out.append(entry)
+    return out
+
+
+def _fetch_sequential(lat, lon, days, user_agent, meta):
+    """MET, then Open-Meteo. Returns (met_dict, hourly, om_dict); errors go to meta."""
+    met_dict, hourly, om_dict = {}, [], {}
+    try:
+        met_dict, hourly = _fetch_met(lat, lon, user_agent=user_agent)
     except Exception as e:
-        met_dict = {}
-        hourly_today = []
-        result["meta"]["met_error"] = str(e)
-    # try Open-Meteo
+        meta["met_error"] = str(e)
     try:
         om_dict = _fetch_open_meteo(lat, lon, days)
     except Exception as e:
-        om_dict = {}
-        result["meta"]["om_error"] = str(e)
+        meta["om_error"] = str(e)
+    return met_dict, hourly, om_dict
 
-    # build merged daily list for requested days (today..today+days-1)
-    today = datetime.now().date()
-    for i in range(days):
-        d = today + timedelta(days=i)
-        ks = d.strftime("%Y-%m-%d")
-        m = met_dict.get(ks)
-        o = om_dict.get(ks)
-        entry = {"date": ks, "temp_max": None, "temp_min": None, "precip": None,
-                 "symbol": None, "wind_max": None, "wind_dir_deg": None, "source": "none"}
-        if m:
-            entry.update({
-                "temp_max": m.get("temp_max"),
-                "temp_min": m.get("temp_min"),
-                "precip": m.get("precip"),
-                "symbol": m.get("symbol"),
-                "wind_max": m.get("wind_max"),
-                "wind_dir_deg": m.get("wind_dir_deg"),
-                "source": "MET"
-            })
-        if o:
-            if entry["temp_max"] is None:
-                entry["temp_max"] = o.get("temp_max")
-            if entry["temp_min"] is None:
-                entry["temp_min"] = o.get("temp_min")
-            if entry["precip"] is None or entry["precip"] == 0:
-                entry["precip"] = o.get("precip")
-            if entry["symbol"] is None:
-                # map Open-Meteo weathercode to label
-                entry["symbol"] = OM_WEATHERCODE_MAP.get(o.get("symbol"))
-            if entry["wind_max"] is None:
-                entry["wind_max"] = o.get("wind_max")
-            if entry["wind_dir_deg"] is None:
-                entry["wind_dir_deg"] = o.get("wind_dir_deg")
-            if entry["source"] == "none":
-                entry["source"] = "OpenMeteo"
-        # normalize MET symbol to human label if string
-        sym = entry.get("symbol")
-        if isinstance(sym, str):
-            label = MET_SYMBOL_MAP.get(sym)
-            if not label and "_" in sym:
-                base = sym.split("_")[0]
-                label = MET_SYMBOL_MAP.get(base)
-            entry["symbol"] = label if label else sym
-        # rounding
-        try:
-            if entry["precip"] is not None:
-                entry["precip"] = round(float(entry["precip"]), 2)
-        except Exception:
-            pass
-        try:
-            if entry["temp_max"] is not None:
-                entry["temp_max"] = round(float(entry["temp_max"]), 1)
-            if entry["temp_min"] is not None:
-                entry["temp_min"] = round(float(entry["temp_min"]), 1)
-            if entry["wind_max"] is not None:
-                entry["wind_max"] = round(float(entry["wind_max"]), 1)
-        except Exception:
-            pass
 
-        result["daily"].append(entry)
+def _fetch_hedged(lat, lon, days, user_agent, meta):
+    """
+    MET and Open-Meteo in parallel; once one has answered the other gets a
+    bounded grace. Open-Meteo only fills daily gaps, so after MET it gets
+    WEATHER_HEDGE_GRACE seconds. MET is the only source of the hourly rows and
+    the period summaries, so after Open-Meteo it gets the longer
+    WEATHER_MET_GRACE; if it is still late the frame shows Open-Meteo's daily
+    values with periods/hourly missing instead of blocking up to
+    WEATHER_FETCH_DEADLINE. A late answer is dropped for this run (it still
+    lands in the HTTP cache for the next one).
+    """
+    report = {}
+    sources = {
+        "met": lambda: _fetch_met(lat, lon, user_agent=user_agent),
+        "om": lambda: _fetch_open_meteo(lat, lon, days),
+    }
+    # under HTTP fixtures both answers are awaited so record and replay merge the same data
+    grace = None if http_fixtures.active() else {"om": WEATHER_HEDGE_GRACE, "met": WEATHER_MET_GRACE}
+    results = run_sources(sources, max_workers=2, deadline=WEATHER_FETCH_DEADLINE, report=report, grace=grace)
+    met_dict, hourly, om_dict = {}, [], {}
+    if results.get("met") is not MISSING:
+        met_dict, hourly = results["met"]
+    else:
+        meta["met_error"] = report.get("met", {}).get("error") or "MET missed the hedge deadline"
+    if results.get("om") is not MISSING:
+        om_dict = results["om"]
+    else:
+        meta["om_error"] = report.get("om", {}).get("error") or "Open-Meteo missed the hedge deadline"
+    meta["hedge_status"] = {name: r.get("status") for name, r in report.items()}
+    return met_dict, hourly, om_dict
 
-    # hourly_today: filter hourly_today list to entries that belong to today (06-06 rule)
-    if hourly_today:
-        filtered = []
-        for h in hourly_today:
-            try:
-                dt = datetime.fromisoformat(h["time"])
-            except Exception:
-                continue
-            dt_local = _to_local = dt.astimezone()
-            day_key = _day_key_06_to_06(dt_local)
-            if day_key == today.strftime("%Y-%m-%d"):
-                filtered.append(h)
-        # optionally trim/convert values to simple types
-        result["hourly_today"] = filtered if keep_debug_hourly else filtered
 
+def get_forecast_json(lat=DEFAULT_LAT, lon=DEFAULT_LON, days=DEFAULT_DAYS, user_agent=DEFAULT_USER_AGENT, keep_debug_hourly=False,
+                      hedged=None):
+    """
+    Return dict:
+      { 'daily': [ {date, temp_max, temp_min, precip, symbol, wind_max, wind_dir_deg, source, periods}, ... ],
+        'hourly_today': [ {time, temp, wind_speed, wind_dir, precip_next_1h, precip, symbol_code}, ... ],
+        'hourly_by_day': { 'YYYY-MM-DD': [hourly rows, 06-06], ... },
+        'periods_by_day': { 'YYYY-MM-DD': {morning|lunch|day|evening: {symbol_code, temp, precip, time, hours} or None}, ... },
+        'meta': { 'met_days': n, 'om_days': n, 'hedged': bool, 'hourly_missing': bool }
+      }
+    Period summaries are computed once here; 'periods' on each daily entry is the same dict.
+    Without MET rows 'hourly_missing' is True, 'periods' is None and the daily
+    values come from Open-Meteo.
+    hedged (default WEATHER_HEDGED): fetch MET and Open-Meteo in parallel instead of
+    one after the other, with bounded grace for the later one (see _fetch_hedged).
+    """
+    meta = {}
+    hedged = WEATHER_HEDGED if hedged is None else bool(hedged)
+    fetch = _fetch_hedged if hedged else _fetch_sequential
+    met_dict, hourly, om_dict = fetch(lat, lon, days, user_agent, meta)
+    meta["hedged"] = hedged
+    return _assemble_forecast(met_dict, hourly, om_dict, days, meta, lat, lon)
+
+
+def _assemble_forecast(met_dict, hourly, om_dict, days, meta, lat, lon):
+    """Build the get_forecast_json dict from already fetched provider data."""
+    result = {"daily": [], "hourly_today": [], "hourly_by_day": {}, "periods_by_day": {}, "meta": meta}
+
+    # build merged daily list for requested days (today..today+days-1)
+    # frozen at the recording time while HTTP fixtures record/replay
+    now = http_fixtures.fixture_now() or datetime.now()
+    today = now.date()
+    hourly_by_day = build_hourly_store(hourly)
+    wanted = {(today + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)}
+    hourly_by_day = {k: v for k, v in hourly_by_day.items() if k in wanted}
+    periods = periods_by_day(hourly_by_day)
+    result["daily"] = _merge_daily(met_dict, om_dict, today, days, periods)
+
+    # hourly_today: today's rows (06-06 rule) straight from the hourly store
+    result["hourly_today"] = hourly_by_day.get(today.strftime("%Y-%m-%d"), [])
+    result["hourly_by_day"] = hourly_by_day
+    result["periods_by_day"] = periods
+
+    # no MET rows: daily values are Open-Meteo's, periods (None) and hourly are missing
+    result["meta"]["hourly_missing"] = not hourly
     result["meta"]["met_days"] = len(met_dict)
     result["meta"]["om_days"] = len(om_dict)
-    result["meta"]["generated_at"] = datetime.now().isoformat()
+    result["meta"]["generated_at"] = now.isoformat()
     result["meta"]["lat"] = lat
     result["meta"]["lon"] = lon
     return result
 
+# ---------------- batched multi-location fetch (grid cells) -------------------
+def grid_cell(lat, lon, decimals=None):
+    """
+    Snap a coordinate to its weather grid cell. MET asks for at most 4
+    decimals; WEATHER_GRID_DECIMALS (default 2, ~1 km) decides how close
+    frames must be to share one forecast.
+    """
+    d = WEATHER_GRID_DECIMALS if decimals is None else int(decimals)
+    d = max(0, min(4, d))
+    return round(float(lat), d), round(float(lon), d)
+
+
+# Cell cache: key -> (expires epoch, value), mirrored to WEATHER_CELL_CACHE_PATH so
+# frames running as separate processes share it. MET keys are per cell (its answer
+# does not depend on days), Open-Meteo keys per cell and days.
+_cell_cache = {}
+_cell_cache_lock = threading.Lock()
+
+
+def _cell_key(source, cell, days=None):
+    key = f"{source}|{cell[0]},{cell[1]}"
+    return key if days is None else f"{key}|{days}"
+
+
+def _load_cell_cache():
+    """Merge live entries from the cell cache file (written by other processes) into memory."""
+    try:
+        with open(WEATHER_CELL_CACHE_PATH, "r", encoding="utf-8") as fh:
+            stored = json.load(fh).get("cells", {}) or {}
+    except Exception:
+        return
+    now = time.time()
+    with _cell_cache_lock:
+        for key, entry in stored.items():
+            try:
+                expires, value = float(entry[0]), entry[1]
+            except Exception:
+                continue
+            if expires > now and (key not in _cell_cache or _cell_cache[key][0] < expires):
+                _cell_cache[key] = (expires, value)
+
+
+def _save_cell_cache():
+    """Re-read, merge and atomically rewrite the cell cache file (tmp + os.replace)."""
+    _load_cell_cache()
+    now = time.time()
+    with _cell_cache_lock:
+        live = {k: [exp, val] for k, (exp, val) in _cell_cache.items() if exp > now}
+    path = WEATHER_CELL_CACHE_PATH
+    try:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"cells": live}, fh, ensure_ascii=False)
+        os.replace(tmp, path)
+    except Exception as ex:
+        print("[weather] failed to save cell cache:", ex)
+
+
+def _cell_cache_get(key):
+    with _cell_cache_lock:
+        hit = _cell_cache.get(key)
+        if hit and hit[0] > time.time():
+            return hit[1]
+    return None
+
+
+def _cell_cache_put(key, value):
+    with _cell_cache_lock:
+        _cell_cache[key] = (time.time() + WEATHER_CELL_TTL, value)
+
+
+def clear_cell_cache():
+    with _cell_cache_lock:
+        _cell_cache.clear()
+    try:
+        os.remove(WEATHER_CELL_CACHE_PATH)
+    except OSError:
+        pass
+
+
+def _fetch_open_meteo_multi(cells, days, timeout=None):
+    """
+    One Open-Meteo request for several cells (comma separated latitude /
+    longitude lists). Returns {cell: parsed daily dict}; Open-Meteo answers
+    with a list in request order (a single object for one location).
+    """
+    params = {
+        "latitude": ",".join(str(c[0]) for c in cells),
+        "longitude": ",".join(str(c[1]) for c in cells),
+        "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum,weathercode,windspeed_10m_max,winddirection_10m_dominant",
+        "forecast_days": days,
+        "timezone": "auto"
+    }
+
+    def _parse(resp):
+        j = resp.json()
+        items = j if isinstance(j, list) else [j]
+        return [_parse_open_meteo_json(item) for item in items]
+
+    parsed, r = cached_get_parsed(OM_URL, _parse, "om-multi-v1", params=params, timeout=timeout)
+    if r.status_code != 200:
+        raise RuntimeError(f"OpenMeteo HTTP {r.status_code}: {r.text[:400]}")
+    if len(parsed) != len(cells):
+        raise RuntimeError(f"OpenMeteo returned {len(parsed)} locations for {len(cells)} requested")
+    return dict(zip(cells, parsed))
+
+
+def get_forecasts_for_locations(locations, days=DEFAULT_DAYS, user_agent=DEFAULT_USER_AGENT):
+    """
+    Forecasts for many (lat, lon) pairs with as few upstream calls as possible.
+
+    Locations are snapped to grid cells (grid_cell); each cell is fetched once
+    and kept for WEATHER_CELL_TTL seconds in the cell cache file, so frames
+    running as separate processes share it. Open-Meteo is asked for all
+    uncached cells in one multi-coordinate request (chunks of
+    WEATHER_OM_BATCH_SIZE), MET once per cell (it has no batch API; the HTTP
+    cache still answers repeat calls). Returns one get_forecast_json-shaped
+    dict per input location, in input order (meta has the cell used); each
+    location gets its own copy.
+    """
+    locations = list(locations)
+    cells = list(dict.fromkeys(grid_cell(lat, lon) for lat, lon in locations))
+    # fixture record/replay must see every request
+    use_cache = not http_fixtures.active()
+    if use_cache:
+        _load_cell_cache()
+
+    met_by_cell, om_by_cell = {}, {}
+    sources = {}
+    for cell in cells:
+        cached = _cell_cache_get(_cell_key("met", cell)) if use_cache else None
+        if cached is not None:
+            met_by_cell[cell] = cached
+        else:
+            sources[f"met:{cell[0]},{cell[1]}"] = (lambda c=cell: (c, _fetch_met(c[0], c[1], user_agent=user_agent)))
+        cached = _cell_cache_get(_cell_key("om", cell, days)) if use_cache else None
+        if cached is not None:
+            om_by_cell[cell] = cached
+    om_missing = [c for c in cells if c not in om_by_cell]
+    size = max(1, WEATHER_OM_BATCH_SIZE)
+    for i in range(0, len(om_missing), size):
+        chunk = om_missing[i:i + size]
+        sources[f"om:{i // size}"] = (lambda ch=chunk: _fetch_open_meteo_multi(ch, days))
+
+    report = {}
+    if sources:
+        results = run_sources(sources, max_workers=min(len(sources), WEATHER_BATCH_WORKERS),
+                              deadline=WEATHER_FETCH_DEADLINE, report=report)
+        fetched = False
+        for name, value in results.items():
+            if value is MISSING:
+                continue
+            fetched = True
+            if name.startswith("met:"):
+                cell, met = value
+                met_by_cell[cell] = met
+                _cell_cache_put(_cell_key("met", cell), list(met))
+            else:
+                for cell, om in value.items():
+                    om_by_cell[cell] = om
+                    _cell_cache_put(_cell_key("om", cell, days), om)
+        if fetched and use_cache:
+            _save_cell_cache()
+
+    errors = {name: r.get("error") or r.get("status") for name, r in report.items() if r.get("status") != "ok"}
+    by_cell = {}
+    for cell in cells:
+        met_dict, hourly = met_by_cell.get(cell) or ({}, [])
+        meta = {"cell": list(cell), "batched": True}
+        if cell not in met_by_cell:
+            meta["met_error"] = errors.get(f"met:{cell[0]},{cell[1]}") or "MET fetch failed"
+        if cell not in om_by_cell:
+            meta["om_error"] = next((e for n, e in errors.items() if n.startswith("om:")), None) or "Open-Meteo fetch failed"
+        by_cell[cell] = _assemble_forecast(met_dict, hourly, om_by_cell.get(cell) or {}, days, meta, cell[0], cell[1])
+    print(f"[weather] {len(locations)} locations -> {len(cells)} cells, {len(sources)} upstream fetches")
+    # locations in the same cell must not share one mutable dict (nor the cache entries)
+    return [copy.deepcopy(by_cell[grid_cell(lat, lon)]) for lat, lon in locations]
+
 # ---------------- debug print (same stil som tidligere) -----------------------
 def debug_print(forecast_json):
     daily = forecast_json.get("daily", [])